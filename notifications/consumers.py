@@ -1,6 +1,8 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from snicko import metrics
+
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         # Get user_id from the URL parameter (passed in WebSocket URL)
@@ -15,6 +17,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
         # Accept the WebSocket connection
         await self.accept()
+        metrics.inc("channels_connections")
         print(f"[DEBUG] WebSocket connection accepted for user_id: {self.user_id}")
 
         # Send a "connected" message to the WebSocket client
@@ -26,6 +29,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         print(f"[DEBUG] Sent connected message to WebSocket: {connected_message}")
 
     async def disconnect(self, close_code):
+        metrics.inc("channels_connections", -1)
         print(f"[DEBUG] Disconnecting WebSocket for user_id: {self.user_id}, close_code: {close_code}")
 
         # Leave the user-specific group when the WebSocket disconnects
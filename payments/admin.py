@@ -1,6 +1,19 @@
 from django.contrib import admin
-from .models import Payment
+from .models import OwnerEarning, Payment, WebhookEvent
 
 admin.site.register(Payment)
 
 # Register your models here.
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'event', 'received_at', 'processed_at')
+    list_filter = ('event',)
+    search_fields = ('event_id',)
+
+
+@admin.register(OwnerEarning)
+class OwnerEarningAdmin(admin.ModelAdmin):
+    list_display = ('owner', 'item', 'day', 'amount', 'payments_count')
+    list_filter = ('day',)
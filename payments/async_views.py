@@ -0,0 +1,59 @@
+"""
+Async variant of order creation, so waiting on Razorpay does not hold a
+worker thread under ASGI.
+"""
+import json
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from rentals.models import Booking
+from users.authentication import aauthenticate
+from .models import Payment
+from .services.gateway import get_gateway
+
+
+@csrf_exempt
+@require_POST
+async def create_order(request):
+    """
+    Async counterpart of CreateOrderAPIView.post.
+    """
+    user = await aauthenticate(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=401)
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    booking_id = data.get('booking_id')
+    amount = data.get('amount')
+
+    if not (booking_id and amount):
+        return JsonResponse({'error': 'booking_id and amount are required'}, status=400)
+
+    try:
+        booking = await Booking.objects.aget(id=booking_id)
+    except Booking.DoesNotExist:
+        return JsonResponse({'error': 'Booking not found'}, status=404)
+
+    amount_paise = int(float(amount) * 100)
+    order_id = await get_gateway().acreate_order(amount_paise)
+
+    await Payment.objects.acreate(
+        user_id=user.id,
+        booking=booking,
+        amount=amount,
+        razorpay_order_id=order_id,
+        status='PENDING'
+    )
+
+    return JsonResponse({
+        'order_id': order_id,
+        'razorpay_key': settings.RAZORPAY_KEY_ID,
+        'amount': amount_paise,
+        'currency': 'INR'
+    }, status=201)
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.services.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Apply queued Razorpay webhook events to payments and bookings in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--forever', action='store_true',
+            help="Keep polling the inbox instead of exiting once it is drained.",
+        )
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep when the inbox is empty.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = process_pending_events(batch_size=options['batch_size'])
+            total += processed
+            if processed:
+                continue
+            if not options['forever']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} webhook events"))
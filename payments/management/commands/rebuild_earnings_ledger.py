@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from payments.services.ledger import rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = "Rebuild the owner earnings ledger from successful payments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owner', type=int, help="Only rebuild the ledger of this owner id.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild_ledger(owner_id=options['owner'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} ledger buckets"))
@@ -0,0 +1,43 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from payments.services.gateway import get_gateway
+from payments.services.reconciliation import reconcile_payments
+
+
+class Command(BaseCommand):
+    help = "Reconcile PENDING and recent payments against the payment gateway."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help="Also re-check payments created in the last N days.")
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent gateway requests per chunk.")
+        parser.add_argument('--gateway', help="Dotted path of a gateway class to use instead of PAYMENT_GATEWAY_CLASS.")
+        parser.add_argument('--dry-run', action='store_true', help="Report differences without updating payments.")
+        parser.add_argument('--report', help="Write the JSON summary report to this path.")
+
+    def handle(self, *args, **options):
+        gateway = import_string(options['gateway'])() if options['gateway'] else get_gateway()
+        since = timezone.now() - timedelta(days=options['days'])
+
+        report = reconcile_payments(
+            gateway,
+            since,
+            chunk_size=options['chunk_size'],
+            concurrency=options['concurrency'],
+            dry_run=options['dry_run'],
+        )
+
+        summary = report.as_dict()
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(summary, f, indent=2)
+
+        for outcome, count in sorted(summary['counts'].items()):
+            self.stdout.write(f"{outcome}: {count}")
+        style = self.style.WARNING if report.counts['mismatched'] or report.counts['errors'] else self.style.SUCCESS
+        self.stdout.write(style("Reconciliation finished" + (" (dry run)" if options['dry_run'] else "")))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-19 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_payment_paid_at_ownerearning'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['booking', 'status'], name='payment_booking_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['created_at'], name='payment_pending_created_idx'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from django.conf import settings
-from rentals.models import Booking  # or wherever your Booking model is
+from rentals.models import Booking, Item  # or wherever your Booking model is
 
 class Payment(models.Model):
     STATUS_CHOICES = (
@@ -20,6 +20,17 @@ class Payment(models.Model):
     razorpay_signature = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(auto_now_add=True)
+    paid_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['booking', 'status'], name='payment_booking_status_idx'),
+            # Reconciliation scans only the payments still waiting on the gateway.
+            models.Index(fields=['created_at'], condition=models.Q(status='PENDING'), name='payment_pending_created_idx'),
+            # Delta sync: a user's payments changed since a watermark.
+            models.Index(fields=['user', 'updated_at'], name='payment_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.status} - {self.amount}"
@@ -30,3 +41,51 @@ class Payment(models.Model):
             self.save()
         else:
             raise ValueError("Invalid status provided")
+
+
+class WebhookEvent(models.Model):
+    """
+    Inbox of raw Razorpay webhook events, keyed by the event id so that
+    retries and duplicate deliveries collapse into a single row.
+    """
+    event_id = models.CharField(max_length=100, unique=True)
+    event = models.CharField(max_length=50)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['received_at'],
+                condition=models.Q(processed_at__isnull=True),
+                name='webhook_unprocessed_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event} ({self.event_id})"
+
+
+class OwnerEarning(models.Model):
+    """
+    Daily rollup of successful payments per owner and item, maintained
+    incrementally as payments settle.
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='earnings')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='earnings')
+    day = models.DateField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payments_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'item', 'day'], name='unique_owner_item_day'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'day'], name='earning_owner_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} - {self.item_id} - {self.day}: {self.amount}"
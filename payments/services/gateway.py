@@ -0,0 +1,108 @@
+import uuid
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from snicko.metrics import timed_call
+
+
+class RazorpayGateway:
+    """
+    Thin wrapper around the Razorpay SDK exposing only what we use.
+
+    The SDK is blocking; async callers use the a-prefixed methods, which talk
+    to the REST API through a shared httpx.AsyncClient instead.
+    """
+    API_URL = 'https://api.razorpay.com/v1'
+
+    def __init__(self, key_id=None, key_secret=None):
+        import razorpay
+
+        self.auth = (
+            key_id or settings.RAZORPAY_KEY_ID,
+            key_secret or settings.RAZORPAY_KEY_SECRET,
+        )
+        self.client = razorpay.Client(auth=self.auth)
+        self._async_client = None
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            import httpx
+
+            self._async_client = httpx.AsyncClient(base_url=self.API_URL, auth=self.auth, timeout=10)
+        return self._async_client
+
+    def create_order(self, amount_paise, currency='INR'):
+        """
+        Create an order and return its id.
+        """
+        with timed_call('razorpay'):
+            order = self.client.order.create({
+                'amount': amount_paise,
+                'currency': currency,
+                'payment_capture': '1',
+            })
+        return order['id']
+
+    async def acreate_order(self, amount_paise, currency='INR'):
+        with timed_call('razorpay'):
+            response = await self.async_client.post('/orders', json={
+                'amount': amount_paise,
+                'currency': currency,
+                'payment_capture': 1,
+            })
+        response.raise_for_status()
+        return response.json()['id']
+
+    def fetch_order_status(self, order_id):
+        """
+        Return (status, payment_id) for an order, using our Payment statuses.
+        """
+        with timed_call('razorpay'):
+            attempts = self.client.order.payments(order_id).get('items', [])
+        for attempt in attempts:
+            if attempt.get('status') == 'captured':
+                return 'SUCCESS', attempt.get('id')
+        if attempts and all(attempt.get('status') == 'failed' for attempt in attempts):
+            return 'FAILED', attempts[-1].get('id')
+        return 'PENDING', None
+
+
+class FakeGateway:
+    """
+    In-memory gateway for tests and local runs. Orders are PENDING until
+    set_status() is called for them.
+    """
+
+    def __init__(self, statuses=None):
+        self.statuses = dict(statuses or {})
+
+    def create_order(self, amount_paise, currency='INR'):
+        order_id = f"order_{uuid.uuid4().hex[:14]}"
+        self.statuses[order_id] = ('PENDING', None)
+        return order_id
+
+    async def acreate_order(self, amount_paise, currency='INR'):
+        return self.create_order(amount_paise, currency)
+
+    def set_status(self, order_id, status, payment_id=None):
+        self.statuses[order_id] = (status, payment_id)
+
+    def fetch_order_status(self, order_id):
+        return self.statuses.get(order_id, ('PENDING', None))
+
+
+_gateways = {}
+
+
+def get_gateway():
+    """
+    Return the gateway configured by PAYMENT_GATEWAY_CLASS.
+
+    Instances are reused per process so the SDK's HTTP session is pooled.
+    """
+    path = settings.PAYMENT_GATEWAY_CLASS
+    if path not in _gateways:
+        _gateways[path] = import_string(path)()
+    return _gateways[path]
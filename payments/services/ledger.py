@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+from payments.models import OwnerEarning, Payment
+
+ZERO = Value(0, output_field=DecimalField(max_digits=10, decimal_places=2))
+
+# What the owner earns from a payment: the rental charge when it was split
+# out at checkout, otherwise the amount minus deposit and platform fee.
+OWNER_SHARE = Coalesce(
+    'rental_charge',
+    ExpressionWrapper(
+        F('amount') - Coalesce('deposit_amount', ZERO) - Coalesce('platform_fee', ZERO),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    ),
+)
+
+
+def _bucketed(payments):
+    return (
+        payments.values(
+            owner_id=F('booking__item__owner_id'),
+            item_id=F('booking__item_id'),
+            day=TruncDate(Coalesce('paid_at', 'created_at')),
+        )
+        .annotate(total=Sum(OWNER_SHARE), count=Count('id'))
+        .order_by()
+    )
+
+
+def record_earnings(payment_ids):
+    """
+    Add newly successful payments to the owner ledger.
+
+    Must be called once per payment, in the transaction that marks it as
+    SUCCESS. Buckets are created if missing and then incremented in place,
+    so concurrent workers never overwrite each other's totals.
+    """
+    if not payment_ids:
+        return
+    buckets = list(_bucketed(Payment.objects.filter(id__in=payment_ids)))
+    OwnerEarning.objects.bulk_create(
+        [OwnerEarning(owner_id=b['owner_id'], item_id=b['item_id'], day=b['day']) for b in buckets],
+        ignore_conflicts=True,
+    )
+    for bucket in buckets:
+        OwnerEarning.objects.filter(
+            owner_id=bucket['owner_id'], item_id=bucket['item_id'], day=bucket['day']
+        ).update(
+            amount=F('amount') + bucket['total'],
+            payments_count=F('payments_count') + bucket['count'],
+        )
+
+
+def owner_earnings(owner, month_start):
+    """
+    Summarise an owner's ledger for the month starting at `month_start`:
+    the total, a per-item breakdown and a daily series.
+    """
+    next_month = (month_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    buckets = OwnerEarning.objects.filter(owner=owner, day__gte=month_start, day__lt=next_month)
+
+    per_item = (
+        buckets.values('item_id', item_name=F('item__name'))
+        .annotate(total=Sum('amount'), payments=Sum('payments_count'))
+        .order_by('-total')
+    )
+    per_day = buckets.values('day').annotate(total=Sum('amount')).order_by('day')
+    totals = buckets.aggregate(total=Sum('amount'), payments=Sum('payments_count'))
+
+    return {
+        'month': month_start.strftime('%Y-%m'),
+        'total': totals['total'] or 0,
+        'payments': totals['payments'] or 0,
+        'items': list(per_item),
+        'days': list(per_day),
+    }
+
+
+def rebuild_ledger(owner_id=None, batch_size=1000):
+    """
+    Recompute the ledger from the payments table.
+
+    Returns the number of buckets written.
+    """
+    payments = Payment.objects.filter(status='SUCCESS')
+    ledger = OwnerEarning.objects.all()
+    if owner_id is not None:
+        payments = payments.filter(booking__item__owner_id=owner_id)
+        ledger = ledger.filter(owner_id=owner_id)
+
+    written = 0
+    with transaction.atomic():
+        ledger.delete()
+        batch = []
+        for bucket in _bucketed(payments).iterator(chunk_size=batch_size):
+            batch.append(OwnerEarning(
+                owner_id=bucket['owner_id'],
+                item_id=bucket['item_id'],
+                day=bucket['day'],
+                amount=bucket['total'],
+                payments_count=bucket['count'],
+            ))
+            if len(batch) >= batch_size:
+                OwnerEarning.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        OwnerEarning.objects.bulk_create(batch)
+        written += len(batch)
+    return written
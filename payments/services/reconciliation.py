@@ -0,0 +1,91 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
+from django.db.models import Q
+
+from payments.models import Payment
+from payments.services.settlement import settle_payments
+
+# Cap on the number of order ids kept per category in the report, so the
+# report stays small no matter how many rows are scanned.
+REPORT_SAMPLE_SIZE = 50
+
+
+class ReconciliationReport:
+    def __init__(self):
+        self.counts = Counter()
+        self.samples = {}
+
+    def add(self, outcome, order_id):
+        self.counts[outcome] += 1
+        sample = self.samples.setdefault(outcome, [])
+        if len(sample) < REPORT_SAMPLE_SIZE:
+            sample.append(order_id)
+
+    def as_dict(self):
+        return {'counts': dict(self.counts), 'samples': self.samples}
+
+
+def _fetch(gateway, order_id):
+    try:
+        return gateway.fetch_order_status(order_id)
+    except Exception as exc:
+        return 'ERROR', str(exc)
+
+
+def reconcile_batch(gateway, executor, payments, report, dry_run=False):
+    """
+    Compare one batch of payments against the gateway and settle the ones
+    the gateway has moved on from.
+    """
+    results = executor.map(lambda p: _fetch(gateway, p.razorpay_order_id), payments)
+    changed = []
+    for payment, (remote_status, payment_id) in zip(payments, results):
+        report.counts['scanned'] += 1
+        if remote_status == 'ERROR':
+            report.add('errors', payment.razorpay_order_id)
+        elif remote_status == payment.status == 'PENDING':
+            report.add('still_pending', payment.razorpay_order_id)
+        elif remote_status == payment.status:
+            report.counts['matched'] += 1
+        elif payment.status == 'SUCCESS':
+            # Never downgrade a captured payment; surface it for a human instead.
+            report.add('mismatched', payment.razorpay_order_id)
+        elif remote_status == 'PENDING':
+            report.add('mismatched', payment.razorpay_order_id)
+        else:
+            payment.status = remote_status
+            payment.razorpay_payment_id = payment_id or payment.razorpay_payment_id
+            changed.append(payment)
+            report.add(f"updated_{remote_status.lower()}", payment.razorpay_order_id)
+
+    if changed and not dry_run:
+        with transaction.atomic():
+            settle_payments(changed)
+
+
+def reconcile_payments(gateway, since, chunk_size=500, concurrency=8, dry_run=False):
+    """
+    Stream PENDING payments and payments created after `since` through the
+    gateway, `chunk_size` rows at a time.
+
+    Rows are read with a server-side cursor and at most one chunk is held in
+    memory, so memory use does not grow with the table.
+    """
+    report = ReconciliationReport()
+    payments = (
+        Payment.objects.filter(Q(status='PENDING') | Q(created_at__gte=since))
+        .only('id', 'booking_id', 'status', 'razorpay_order_id', 'razorpay_payment_id', 'paid_at')
+        .order_by('id')
+    )
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        batch = []
+        for payment in payments.iterator(chunk_size=chunk_size):
+            batch.append(payment)
+            if len(batch) >= chunk_size:
+                reconcile_batch(gateway, executor, batch, report, dry_run=dry_run)
+                batch = []
+        if batch:
+            reconcile_batch(gateway, executor, batch, report, dry_run=dry_run)
+    return report
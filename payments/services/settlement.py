@@ -0,0 +1,44 @@
+from django.utils import timezone
+
+from payments.models import Payment
+from payments.services.ledger import record_earnings
+from rentals.models import Booking
+from rentals.services import dashboard
+
+
+def settle_payments(payments):
+    """
+    Persist status changes for a batch of payments.
+
+    The payments must already carry their new status. Must be called inside
+    a transaction: rows are re-read under a lock and skipped if another
+    worker already settled them, so webhooks and reconciliation can race
+    safely. Bookings whose payment succeeded are moved from APPROVED to
+    ACTIVE and the payments are added to the owner earnings ledger in the
+    same transaction. Returns the payments actually changed.
+    """
+    if not payments:
+        return []
+    current = dict(
+        Payment.objects.select_for_update()
+        .filter(id__in=[p.id for p in payments])
+        .values_list('id', 'status')
+    )
+    payments = [p for p in payments if current.get(p.id) not in (None, 'SUCCESS', p.status)]
+    if not payments:
+        return []
+    now = timezone.now()
+    for payment in payments:
+        payment.updated_at = now
+        if payment.status == 'SUCCESS':
+            payment.paid_at = now
+    Payment.objects.bulk_update(payments, ['status', 'razorpay_payment_id', 'paid_at', 'updated_at'])
+
+    paid = [p for p in payments if p.status == 'SUCCESS']
+    if paid:
+        activated = Booking.objects.filter(id__in=[p.booking_id for p in paid], status='APPROVED')
+        owner_ids = list(activated.values_list('item__owner_id', flat=True))
+        activated.update(status='ACTIVE', updated_at=now)
+        dashboard.invalidate(*owner_ids)
+        record_earnings([p.id for p in paid])
+    return payments
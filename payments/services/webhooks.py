@@ -0,0 +1,162 @@
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from payments.models import Payment, WebhookEvent
+from payments.services.settlement import settle_payments
+
+# Razorpay events we know how to apply, mapped to the resulting Payment status.
+EVENT_STATUS = {
+    'payment.captured': 'SUCCESS',
+    'order.paid': 'SUCCESS',
+    'payment.failed': 'FAILED',
+}
+
+
+def compute_signature(body, secret=None):
+    """
+    Return the hex HMAC-SHA256 of a raw webhook body, as Razorpay sends it in
+    the X-Razorpay-Signature header.
+    """
+    secret = secret if secret is not None else settings.RAZORPAY_WEBHOOK_SECRET
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body, signature, secret=None):
+    """
+    Check a webhook signature in constant time.
+    """
+    if not signature or not (secret or settings.RAZORPAY_WEBHOOK_SECRET):
+        return False
+    return hmac.compare_digest(compute_signature(body, secret), signature)
+
+
+def build_signed_event(event, order_id, payment_id=None, amount=0, secret=None, event_id=None):
+    """
+    Build a signed webhook delivery the way Razorpay would send it.
+
+    Used by tests and local tooling in place of the real gateway. Returns the
+    raw body and the headers to send along with it.
+    """
+    payment_id = payment_id or f"pay_{uuid.uuid4().hex[:14]}"
+    status = 'failed' if event == 'payment.failed' else 'captured'
+    payload = {
+        'entity': 'event',
+        'event': event,
+        'contains': ['payment'],
+        'payload': {
+            'payment': {
+                'entity': {
+                    'id': payment_id,
+                    'entity': 'payment',
+                    'order_id': order_id,
+                    'amount': int(amount * 100),
+                    'currency': 'INR',
+                    'status': status,
+                },
+            },
+        },
+        'created_at': int(time.time()),
+    }
+    body = json.dumps(payload).encode()
+    headers = {
+        'HTTP_X_RAZORPAY_SIGNATURE': compute_signature(body, secret),
+        'HTTP_X_RAZORPAY_EVENT_ID': event_id or f"evt_{uuid.uuid4().hex[:14]}",
+    }
+    return body, headers
+
+
+def store_event(body, event_id=None):
+    """
+    Append a verified webhook body to the inbox.
+
+    Duplicate deliveries of the same event id are dropped by the unique
+    constraint, so this is a single INSERT regardless of how often Razorpay
+    retries. Returns False if the body is not a valid event.
+    """
+    try:
+        payload = json.loads(body)
+        event = payload['event']
+    except (ValueError, KeyError, TypeError):
+        return False
+
+    event_id = event_id or hashlib.sha256(body).hexdigest()
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(event_id=event_id, event=event, payload=payload)],
+        ignore_conflicts=True,
+    )
+    return True
+
+
+def _payment_entity(payload):
+    return payload.get('payload', {}).get('payment', {}).get('entity', {})
+
+
+def apply_events(events):
+    """
+    Apply a batch of inbox events to Payment and Booking rows.
+
+    Must be called inside a transaction. Payments for the whole batch are
+    locked and settled together with their bookings.
+    """
+    updates = {}
+    for event in events:
+        entity = _payment_entity(event.payload)
+        order_id = entity.get('order_id')
+        if event.event not in EVENT_STATUS or not order_id:
+            event.error = f"Unsupported event: {event.event}"
+            continue
+        # A later event for the same order wins; a success is never downgraded.
+        previous = updates.get(order_id)
+        if previous and previous[0] == 'SUCCESS':
+            continue
+        updates[order_id] = (EVENT_STATUS[event.event], entity.get('id'), event)
+
+    payments = Payment.objects.select_for_update().filter(razorpay_order_id__in=updates.keys())
+    changed = []
+    found = set()
+    for payment in payments:
+        found.add(payment.razorpay_order_id)
+        new_status, payment_id, _ = updates[payment.razorpay_order_id]
+        if payment.status == 'SUCCESS' or payment.status == new_status:
+            continue
+        payment.status = new_status
+        payment.razorpay_payment_id = payment_id or payment.razorpay_payment_id
+        changed.append(payment)
+
+    for order_id, (_, _, event) in updates.items():
+        if order_id not in found:
+            event.error = f"Payment record not found for order {order_id}"
+
+    return settle_payments(changed)
+
+
+def process_pending_events(batch_size=100):
+    """
+    Claim and apply one batch of unprocessed events.
+
+    Rows are claimed with SKIP LOCKED so several workers can drain the inbox
+    concurrently. Returns the number of events processed.
+    """
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .order_by('received_at')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        apply_events(events)
+
+        now = timezone.now()
+        for event in events:
+            event.processed_at = now
+        WebhookEvent.objects.bulk_update(events, ['processed_at', 'error'])
+    return len(events)
@@ -1,3 +1,133 @@
-from django.test import TestCase
+from django.db import transaction
+from django.test import TestCase, Client, override_settings
+from django.utils import timezone
+from rentals.models import Item, Booking
+from users.models import CustomUser
+from .models import OwnerEarning, Payment, WebhookEvent
+from .services.gateway import FakeGateway
+from .services.ledger import rebuild_ledger
+from .services.reconciliation import reconcile_payments
+from .services.settlement import settle_payments
+from .services.webhooks import build_signed_event, process_pending_events
 
-# Create your tests here.
+
+@override_settings(RAZORPAY_WEBHOOK_SECRET='test-secret')
+class RazorpayWebhookTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.webhook_url = '/api/payments/webhook/'
+        owner = CustomUser.objects.create_user(email='owner@example.com', password='password123')
+        renter = CustomUser.objects.create_user(email='renter@example.com', password='password123')
+        item = Item.objects.create(
+            owner=owner, name='Drill', description='Cordless drill',
+            price_per_day=100, image='item_images/drill.jpg',
+        )
+        self.booking = Booking.objects.create(
+            renter=renter, item=item, start_date='2030-01-01', end_date='2030-01-03', status='APPROVED',
+        )
+        self.payment = Payment.objects.create(
+            user=renter, booking=self.booking, amount=300, razorpay_order_id='order_test1',
+        )
+
+    def post_event(self, body, headers):
+        return self.client.post(self.webhook_url, body, content_type='application/json', **headers)
+
+    def test_duplicate_deliveries_are_stored_once(self):
+        body, headers = build_signed_event('payment.captured', 'order_test1', amount=300)
+        self.assertEqual(self.post_event(body, headers).status_code, 200)
+        self.assertEqual(self.post_event(body, headers).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_invalid_signature_is_rejected(self):
+        body, headers = build_signed_event('payment.captured', 'order_test1', secret='wrong-secret')
+        response = self.post_event(body, headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(WebhookEvent.objects.count(), 0)
+
+    def test_worker_updates_payment_and_booking(self):
+        body, headers = build_signed_event('payment.captured', 'order_test1', payment_id='pay_test1')
+        self.post_event(body, headers)
+
+        self.assertEqual(process_pending_events(), 1)
+
+        self.payment.refresh_from_db()
+        self.booking.refresh_from_db()
+        self.assertEqual(self.payment.status, 'SUCCESS')
+        self.assertEqual(self.payment.razorpay_payment_id, 'pay_test1')
+        self.assertEqual(self.booking.status, 'ACTIVE')
+        self.assertIsNotNone(WebhookEvent.objects.get().processed_at)
+
+
+class ReconcilePaymentsTestCase(TestCase):
+    def setUp(self):
+        owner = CustomUser.objects.create_user(email='owner@example.com', password='password123')
+        renter = CustomUser.objects.create_user(email='renter@example.com', password='password123')
+        item = Item.objects.create(
+            owner=owner, name='Tent', description='Two person tent',
+            price_per_day=50, image='item_images/tent.jpg',
+        )
+        self.booking = Booking.objects.create(
+            renter=renter, item=item, start_date='2030-01-01', end_date='2030-01-02', status='APPROVED',
+        )
+        for order_id in ('order_paid', 'order_failed', 'order_open'):
+            Payment.objects.create(user=renter, booking=self.booking, amount=100, razorpay_order_id=order_id)
+
+    def test_pending_payments_follow_the_gateway(self):
+        gateway = FakeGateway({
+            'order_paid': ('SUCCESS', 'pay_1'),
+            'order_failed': ('FAILED', 'pay_2'),
+        })
+
+        report = reconcile_payments(gateway, since=timezone.now(), chunk_size=2, concurrency=2)
+
+        self.assertEqual(report.counts['scanned'], 3)
+        self.assertEqual(report.counts['updated_success'], 1)
+        self.assertEqual(report.counts['updated_failed'], 1)
+        self.assertEqual(report.counts['still_pending'], 1)
+        self.assertEqual(Payment.objects.get(razorpay_order_id='order_paid').status, 'SUCCESS')
+        self.assertEqual(Payment.objects.get(razorpay_order_id='order_failed').status, 'FAILED')
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'ACTIVE')
+
+
+class OwnerEarningsLedgerTestCase(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(email='owner@example.com', password='password123')
+        renter = CustomUser.objects.create_user(email='renter@example.com', password='password123')
+        item = Item.objects.create(
+            owner=self.owner, name='Camera', description='Mirrorless camera',
+            price_per_day=500, image='item_images/camera.jpg',
+        )
+        booking = Booking.objects.create(
+            renter=renter, item=item, start_date='2030-01-01', end_date='2030-01-02', status='APPROVED',
+        )
+        self.payments = [
+            Payment.objects.create(
+                user=renter, booking=booking, amount=1200, deposit_amount=200,
+                razorpay_order_id=f'order_{i}',
+            )
+            for i in range(2)
+        ]
+
+    def settle(self, payment):
+        with transaction.atomic():
+            payment.status = 'SUCCESS'
+            settle_payments([payment])
+
+    def test_successful_payments_are_added_to_the_ledger_once(self):
+        self.settle(self.payments[0])
+        self.settle(self.payments[1])
+        self.settle(self.payments[1])
+
+        earning = OwnerEarning.objects.get()
+        self.assertEqual(earning.amount, 2000)
+        self.assertEqual(earning.payments_count, 2)
+
+    def test_rebuild_matches_incremental_ledger(self):
+        for payment in self.payments:
+            self.settle(payment)
+
+        self.assertEqual(rebuild_ledger(), 1)
+        earning = OwnerEarning.objects.get()
+        self.assertEqual(earning.amount, 2000)
+        self.assertEqual(earning.payments_count, 2)
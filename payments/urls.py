@@ -1,7 +1,11 @@
 from django.urls import path
-from .views import CreateOrderAPIView, VerifyPaymentAPIView
+from . import async_views
+from .views import CreateOrderAPIView, VerifyPaymentAPIView, RazorpayWebhookAPIView, OwnerEarningsAPIView
 
 urlpatterns = [
     path('create-order/', CreateOrderAPIView.as_view(), name='create-order'),
     path('verify/', VerifyPaymentAPIView.as_view(), name='verify-payment'),
+    path('webhook/', RazorpayWebhookAPIView.as_view(), name='razorpay-webhook'),
+    path('earnings/', OwnerEarningsAPIView.as_view(), name='owner-earnings'),
+    path('async/create-order/', async_views.create_order, name='async-create-order'),
 ]
\ No newline at end of file
@@ -1,11 +1,18 @@
+from datetime import datetime
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 import razorpay
 from .models import Payment
 from rentals.models import Booking
 from .serializers import PaymentSerializer
+from .services.gateway import get_gateway
+from .services.ledger import owner_earnings
+from .services.settlement import settle_payments
+from .services.webhooks import store_event, verify_signature
 
 client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
 
@@ -26,23 +33,19 @@ class CreateOrderAPIView(APIView):
             return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
 
         # Create Razorpay Order
-        razorpay_order = client.order.create({
-            'amount': int(float(amount) * 100),  # Convert to float first, then to int
-            'currency': 'INR',
-            'payment_capture': '1'
-        })
+        order_id = get_gateway().create_order(int(float(amount) * 100))  # Convert to float first, then to int
 
         # Save in DB
         payment = Payment.objects.create(
             user=request.user,
             booking=booking,
             amount=amount,
-            razorpay_order_id=razorpay_order['id'],
+            razorpay_order_id=order_id,
             status='PENDING'
         )
 
         return Response({
-            'order_id': razorpay_order['id'],
+            'order_id': order_id,
             'razorpay_key': settings.RAZORPAY_KEY_ID,
             'amount': int(float(amount) * 100),  # Convert to float first, then to int
             'currency': 'INR'
@@ -68,9 +71,52 @@ class VerifyPaymentAPIView(APIView):
         except Payment.DoesNotExist:
             return Response({'error': 'Payment record not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        payment.status = 'SUCCESS'
-        payment.razorpay_payment_id = data['razorpay_payment_id']
-        payment.razorpay_signature = data['razorpay_signature']
-        payment.save()
+        with transaction.atomic():
+            payment.status = 'SUCCESS'
+            payment.razorpay_payment_id = data['razorpay_payment_id']
+            settle_payments([payment])
+            Payment.objects.filter(pk=payment.pk).update(
+                razorpay_signature=data['razorpay_signature'], updated_at=timezone.now()
+            )
 
         return Response({'status': 'Payment verified successfully'})
+
+
+class RazorpayWebhookAPIView(APIView):
+    """
+    Receive Razorpay webhooks.
+
+    The body is only verified and appended to the inbox here; the
+    process_webhooks worker applies events to payments and bookings in batches.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        body = request.body
+        if not verify_signature(body, request.headers.get('X-Razorpay-Signature')):
+            return Response({'error': 'Signature verification failed'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not store_event(body, request.headers.get('X-Razorpay-Event-Id')):
+            return Response({'error': 'Invalid event payload'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'status': 'ok'})
+
+
+class OwnerEarningsAPIView(APIView):
+    """
+    Earnings of the authenticated owner for a month, read from the ledger.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        month = request.query_params.get('month')
+        try:
+            if month:
+                start = datetime.strptime(month, '%Y-%m').date()
+            else:
+                start = timezone.localdate().replace(day=1)
+        except ValueError:
+            return Response({'error': 'month must be in YYYY-MM format'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(owner_earnings(request.user, start))
@@ -1,9 +1,15 @@
 from django.contrib import admin
-from .models import Booking, Category, DamageReport, Item
+from .models import (
+    Booking, Category, DamageReport, Item, ItemPopularity, ItemRecommendation, MediaBlob, Tombstone, UploadSession,
+)
 
 # Register your models here.
 admin.site.register(Item)
 admin.site.register(Category)
 admin.site.register(Booking)
 admin.site.register(DamageReport)
-
+admin.site.register(Tombstone)
+admin.site.register(UploadSession)
+admin.site.register(MediaBlob)
+admin.site.register(ItemRecommendation)
+admin.site.register(ItemPopularity)
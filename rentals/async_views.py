@@ -0,0 +1,196 @@
+"""
+Async variants of the hot read endpoints and of the booking writes that
+send push notifications.
+
+These run directly on the event loop under ASGI: queries go through the
+async ORM and slow external calls are awaited, so a worker is not pinned to
+a thread while a request waits. Responses match their sync counterparts.
+"""
+import json
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.db import models
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from snicko.routers import read_replica
+from snicko.throttling import CatalogThrottle, SearchThrottle, aprotect
+from users.authentication import aauthenticate
+from .models import Booking, Item
+from .serializers import BookingSerializer, ItemGetSerializer, ItemSerializer
+from .services.bookings import (
+    STATUS_ACTIONS, booking_request_message, booking_status_message, create_booking, update_status,
+)
+
+
+def _error(message, status):
+    return JsonResponse({"error": message}, status=status)
+
+
+def _parse_location(params):
+    """
+    Return (point, radius_km) from the query string, or raise ValueError
+    with the message to send back.
+    """
+    try:
+        latitude = float(params["latitude"])
+        longitude = float(params["longitude"])
+        radius = float(params["radius"])
+    except (KeyError, ValueError):
+        raise ValueError("Latitude, longitude, and radius must be valid numbers.")
+    if not (-90 <= latitude <= 90):
+        raise ValueError("Latitude must be between -90 and 90.")
+    if not (-180 <= longitude <= 180):
+        raise ValueError("Longitude must be between -180 and 180.")
+    return Point(longitude, latitude), radius
+
+
+@read_replica
+@require_GET
+async def item_list(request, pk=None):
+    """
+    Async counterpart of ItemView.get.
+    """
+    refused = await aprotect(request, CatalogThrottle)
+    if refused is not None:
+        return refused
+    items = Item.objects.select_related("owner")
+    if pk:
+        try:
+            item = await items.aget(pk=pk)
+        except Item.DoesNotExist:
+            return _error("Item not found", 404)
+        return JsonResponse(ItemGetSerializer(item).data)
+
+    return JsonResponse(ItemGetSerializer([item async for item in items], many=True).data, safe=False)
+
+
+@read_replica
+@require_GET
+async def search_items(request):
+    """
+    Async counterpart of SearchItemView.get.
+    """
+    refused = await aprotect(request, SearchThrottle)
+    if refused is not None:
+        return refused
+    params = request.GET
+    if not params.get("latitude") or not params.get("longitude") or not params.get("radius"):
+        return _error("Latitude, longitude, and radius are required.", 400)
+    try:
+        location, radius = _parse_location(params)
+    except ValueError as exc:
+        return _error(str(exc), 400)
+
+    items = Item.objects.filter(location__distance_lte=(location, D(km=radius)))
+    search_query = params.get("query", "").strip()
+    if search_query:
+        items = items.filter(
+            models.Q(name__icontains=search_query)
+            | models.Q(description__icontains=search_query)
+        )
+
+    results = [item async for item in items]
+    if not results:
+        return JsonResponse({"message": "No items found matching the criteria."}, status=404)
+    return JsonResponse(ItemSerializer(results, many=True).data, safe=False)
+
+
+@read_replica
+@require_GET
+async def user_items(request):
+    """
+    Async counterpart of UserItemView.get.
+    """
+    user = await aauthenticate(request)
+    if user is None:
+        return _error("Authentication credentials were not provided.", 401)
+
+    items = Item.objects.filter(owner_id=user.id).select_related("owner")
+    return JsonResponse(ItemGetSerializer([item async for item in items], many=True).data, safe=False)
+
+
+@read_replica
+@require_GET
+async def booking_list(request):
+    """
+    Async counterpart of BookingView.get for the renter's booking list.
+    """
+    user = await aauthenticate(request)
+    if user is None:
+        return _error("Authentication credentials were not provided.", 401)
+
+    bookings = Booking.objects.filter(renter_id=user.id).select_related("item__owner")
+    return JsonResponse(BookingSerializer([b async for b in bookings], many=True).data, safe=False)
+
+
+async def _notify(user, title, body, data):
+    # Imported here as firebase is initialised when the module loads.
+    from rentals.services.notifications import asend_fcm_notification
+
+    if user.fcm_token:
+        await asend_fcm_notification(user.fcm_token, title, body, data)
+    else:
+        print(f"[DEBUG] User {user.id} does not have an FCM token.")
+
+
+@csrf_exempt
+@require_POST
+async def book_item(request, pk):
+    """
+    Async counterpart of BookingView.post.
+    """
+    user = await aauthenticate(request)
+    if user is None:
+        return _error("Authentication credentials were not provided.", 401)
+
+    try:
+        data = json.loads(request.body)
+        start_date = datetime.fromisoformat(data.get("start_date")).date()
+        end_date = datetime.fromisoformat(data.get("end_date")).date()
+    except (TypeError, ValueError):
+        return _error("Invalid date format. Use ISO 8601 format.", 400)
+
+    try:
+        item = await Item.objects.select_related("owner").aget(pk=pk)
+    except Item.DoesNotExist:
+        return _error("Item not found", 404)
+
+    booking = await sync_to_async(create_booking)(item, user.id, start_date, end_date)
+    await _notify(item.owner, *booking_request_message(booking))
+    return JsonResponse({"message": "Item rented successfully", "booking_id": booking.id}, status=201)
+
+
+@csrf_exempt
+@require_POST
+async def manage_booking_status(request, pk):
+    """
+    Async counterpart of ManageBookingStatusView.post. Only the item owner
+    and the renter may change a booking.
+    """
+    user = await aauthenticate(request)
+    if user is None:
+        return _error("Authentication credentials were not provided.", 401)
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return _error("Invalid JSON body", 400)
+    action = data.get("status")
+    if action not in STATUS_ACTIONS:
+        return _error("Invalid action. Use 'APPROVED' or 'REJECTED'.", 400)
+
+    try:
+        booking = await Booking.objects.select_related("item__owner", "renter").aget(pk=pk)
+    except Booking.DoesNotExist:
+        return _error("Booking not found", 404)
+    if user.id not in (booking.item.owner_id, booking.renter_id):
+        return _error("You do not have permission to manage this booking.", 403)
+
+    await sync_to_async(update_status)(booking, action, data.get("rejection_reason", ""))
+    await _notify(booking.renter, *booking_status_message(booking, action))
+    return JsonResponse({"message": f"Booking status updated to {action} successfully"})
@@ -0,0 +1,72 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+# (name, sync path, async path, needs auth)
+ENDPOINTS = [
+    ('item list', '/api/rentals/items/', '/api/rentals/async/items/', False),
+    ('item search', '/api/rentals/items/search/?{location}', '/api/rentals/async/items/search/?{location}', False),
+    ('my items', '/api/rentals/my-items/', '/api/rentals/async/my-items/', True),
+    ('bookings', '/api/rentals/bookings/', '/api/rentals/async/bookings/', True),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of the sync and async read endpoints against a running "
+        "ASGI server (e.g. uvicorn snicko.asgi:application --workers 1)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--token', help="Access token for the authenticated endpoints.")
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and variant.")
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--location', default='latitude=18.52&longitude=73.85&radius=10')
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        import httpx
+
+        headers = {'Authorization': f"Bearer {options['token']}"} if options['token'] else {}
+        limits = httpx.Limits(max_connections=options['concurrency'])
+        async with httpx.AsyncClient(base_url=options['base_url'], headers=headers, limits=limits, timeout=60) as client:
+            for name, sync_path, async_path, needs_auth in ENDPOINTS:
+                if needs_auth and not options['token']:
+                    self.stdout.write(f"{name}: skipped (no --token)")
+                    continue
+                for variant, path in (('sync', sync_path), ('async', async_path)):
+                    path = path.format(location=options['location'])
+                    result = await self.measure(client, path, options['requests'], options['concurrency'])
+                    self.stdout.write(
+                        f"{name:<12} {variant:<5} {result['rps']:8.1f} req/s  "
+                        f"p50 {result['p50']:7.1f} ms  p95 {result['p95']:7.1f} ms  errors {result['errors']}"
+                    )
+
+    async def measure(self, client, path, total, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        errors = 0
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 500:
+                        errors += 1
+                except Exception:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        return {'rps': total / elapsed, 'p50': quantiles[49], 'p95': quantiles[94], 'errors': errors}
@@ -0,0 +1,69 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from rentals.models import Category, Item
+from rentals.serializers import ItemGetSerializer
+from snicko.renderers import MessagePackRenderer, ORJSONRenderer
+from users.models import CustomUser
+
+
+def sample_items(count, seed=42):
+    """
+    Unsaved items shaped like real listings, so no database is needed.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    owners = [CustomUser(id=n, name=f'Owner {n}') for n in range(1, 51)]
+    category = Category(id=1, name='Tools')
+    return [
+        Item(
+            id=n, owner=rng.choice(owners), category=category, name=f'Cordless drill #{n}',
+            description='Cordless drill with two batteries, charger and a set of bits. ' * 3,
+            condition_notes='Minor scratches on the casing.',
+            price_per_day=Decimal(rng.randrange(50, 5000, 10)), deposit_amount=Decimal('500.00'),
+            image=f'item_images/drill_{n}.jpg',
+            location=Point(73.8567 + rng.uniform(-0.1, 0.1), 18.5204 + rng.uniform(-0.1, 0.1), srid=4326),
+            created_at=now, updated_at=now,
+        )
+        for n in range(1, count + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compare CPU time and payload size of the JSON and MessagePack renderers on ItemGetSerializer data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000, help="Items per payload.")
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--from-db', action='store_true', help="Serialize stored items instead of generated ones.")
+
+    def handle(self, *args, **options):
+        if options['from_db']:
+            items = list(Item.objects.select_related('owner')[:options['items']])
+        else:
+            items = sample_items(options['items'])
+        data = ItemGetSerializer(items, many=True).data
+
+        renderers = [
+            ('drf json', JSONRenderer()),
+            ('orjson', ORJSONRenderer()),
+            ('msgpack', MessagePackRenderer()),
+        ]
+
+        baseline = None
+        for name, renderer in renderers:
+            started = time.process_time()
+            for _ in range(options['repeat']):
+                body = renderer.render(data)
+            cpu_ms = (time.process_time() - started) * 1000 / options['repeat']
+            baseline = baseline or (cpu_ms, len(body))
+            self.stdout.write(
+                f"{name:<9} {cpu_ms:8.2f} ms cpu/render ({baseline[0] / cpu_ms:4.1f}x)  "
+                f"{len(body):9d} bytes ({len(body) / baseline[1]:5.1%})"
+            )
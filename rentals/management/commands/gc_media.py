@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from rentals.storage import recount_references, sweep_unreferenced_files
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount media blob references, delete blobs no photo field refers to "
+        "and sweep blob files left without a row by rolled back saves."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours", type=float, default=24,
+            help="Keep unreferenced files newer than this, which may belong to a save in progress.",
+        )
+
+    def handle(self, *args, **options):
+        fixed, deleted = recount_references()
+        swept = sweep_unreferenced_files(timedelta(hours=options["grace_hours"]))
+        self.stdout.write(self.style.SUCCESS(
+            f"Fixed {fixed} reference counts, deleted {deleted} blobs and {swept} unreferenced files"
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from rentals.services.marketplace import clear_marketplace, generate_marketplace
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic marketplace (users, geolocated items, bookings) for benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--items', type=int, default=200000)
+        parser.add_argument('--bookings', type=int, default=2000000)
+        parser.add_argument('--seed', type=int, default=41)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--clear', action='store_true', help="Delete previously generated data first.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_marketplace()
+
+        def progress(label, done, total):
+            if done == total or done % (options['batch_size'] * 20) == 0:
+                self.stdout.write(f"{label}: {done}/{total}")
+
+        counts = generate_marketplace(
+            users=options['users'], items=options['items'], bookings=options['bookings'],
+            seed=options['seed'], batch_size=options['batch_size'], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts['users']} users, {counts['items']} items and {counts['bookings']} bookings"
+        ))
@@ -0,0 +1,36 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from rentals.services.inventory import ItemImporter, detect_format, parse_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import items for an owner from a CSV or JSONL file and a zip archive of images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help="CSV or JSONL file with one item per line.")
+        parser.add_argument('--owner', required=True, help="Email of the owning user.")
+        parser.add_argument('--images', help="Zip archive containing the images referenced by the rows.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            owner = get_user_model().objects.get(email=options['owner'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['owner']}")
+
+        images = open(options['images'], 'rb') if options['images'] else None
+        try:
+            importer = ItemImporter(owner, images=images, batch_size=options['batch_size'])
+            with open(options['file'], 'rb') as f:
+                result = importer.run(parse_rows(f, options['format'] or detect_format(options['file'])))
+        finally:
+            if images:
+                images.close()
+
+        for error in result['errors']:
+            self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(f"Created {result['created']} items, {result['failed']} rows failed"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from rentals.services.uploads import purge_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete upload sessions idle for UPLOAD_SESSION_TTL_HOURS and their partial files."
+
+    def handle(self, *args, **options):
+        deleted = purge_uploads()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} upload sessions"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from rentals.services.recommendations import process_queue, rebuild
+
+
+class Command(BaseCommand):
+    help = "Refresh similar-item recommendations for queued items, or rebuild all of them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recompute every item, e.g. after a bulk load.")
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        if options['all']:
+            count = rebuild(batch_size=options['batch_size'])
+        else:
+            count = process_queue(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed recommendations for {count} items"))
@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rentals.services.benchmarks import build_scenarios, compare, failures, run_benchmarks, to_json
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure p50/p95/p99 latency and queries per request of the hot endpoints against "
+        "the generate_marketplace dataset, and compare them with a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', nargs='*', help="Scenario names to run, e.g. 'item search'.")
+        parser.add_argument('--baseline', default='benchmarks/baseline.json')
+        parser.add_argument('--save-baseline', action='store_true', help="Write this run as the new baseline.")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed latency regression, as a fraction.")
+
+    def handle(self, *args, **options):
+        try:
+            scenarios = build_scenarios()
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['only']:
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['only']]
+
+        results = run_benchmarks(scenarios, iterations=options['iterations'], warmup=options['warmup'])
+        for result in results:
+            self.stdout.write(
+                f"{result.name:<17} p50 {result.p50_ms:8.1f} ms  p95 {result.p95_ms:8.1f} ms  "
+                f"p99 {result.p99_ms:8.1f} ms  {result.queries_per_request:6.1f} queries/req  errors {result.errors}"
+            )
+        failed = failures(results)
+        if failed:
+            raise CommandError("Requests failed:\n" + "\n".join(failed))
+
+        path = Path(options['baseline'])
+        if options['save_baseline']:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(to_json(results, iterations=options['iterations']), indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {path}"))
+            return
+        if not path.exists():
+            self.stdout.write(f"No baseline at {path}; run with --save-baseline to create one.")
+            return
+
+        regressions = compare(results, json.loads(path.read_text()), tolerance=options['tolerance'])
+        if regressions:
+            raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-19 14:45
+
+import rentals.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0005_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('dhash', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='image',
+            field=models.ImageField(storage=rentals.storage.media_storage, upload_to='item_images/'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='pickup_photo',
+            field=models.ImageField(blank=True, null=True, storage=rentals.storage.media_storage, upload_to='pickup_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='return_photo',
+            field=models.ImageField(blank=True, null=True, storage=rentals.storage.media_storage, upload_to='return_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='damagereport',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=rentals.storage.media_storage, upload_to='damage_reports/'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-19 15:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0006_mediablob_and_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='rentals.item')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_in', to='rentals.item')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('item', 'rank'), name='recommendation_item_rank_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StaleRecommendation',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='rentals.item')),
+                ('changed', models.BooleanField(default=False)),
+                ('queued_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['queued_at'], name='stale_recommendation_queue_idx')],
+            },
+        ),
+    ]
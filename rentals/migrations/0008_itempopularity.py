@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-19 15:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0007_itemrecommendation_stalerecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemPopularity',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='rentals.item')),
+                ('views', models.FloatField()),
+                ('requests', models.FloatField()),
+                ('completions', models.FloatField()),
+                ('score', models.FloatField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score'], name='item_popularity_score_idx')],
+            },
+        ),
+    ]
@@ -3,7 +3,9 @@ from django.conf import settings
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.contrib.gis.db import models as gis_models
+import uuid
 from datetime import datetime, date
+from .storage import media_storage
 
 User = settings.AUTH_USER_MODEL
 
@@ -23,12 +25,22 @@ class Item(models.Model):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
     price_per_day = models.DecimalField(max_digits=8, decimal_places=2)
     deposit_amount = models.DecimalField(max_digits=8, decimal_places=2, default=0)
-    image = models.ImageField(upload_to='item_images/')
+    image = models.ImageField(upload_to='item_images/', storage=media_storage)
     is_available = models.BooleanField(default=True)
     location = gis_models.PointField(geography=True, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', '-created_at'], name='item_owner_created_idx'),
+            # Delta sync: an owner's items changed since a watermark.
+            models.Index(fields=['owner', 'updated_at'], name='item_owner_updated_idx'),
+            # Search filters: a category with a price range, or a price range alone.
+            models.Index(fields=['category', 'price_per_day'], name='item_category_price_idx'),
+            models.Index(fields=['price_per_day'], name='item_price_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.category.name if self.category else 'No Category'}"
 
@@ -48,8 +60,8 @@ class Booking(models.Model):
     end_date = models.DateField()
     total_price = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
-    pickup_photo = models.ImageField(upload_to='pickup_photos/', null=True, blank=True)
-    return_photo = models.ImageField(upload_to='return_photos/', null=True, blank=True)
+    pickup_photo = models.ImageField(upload_to='pickup_photos/', storage=media_storage, null=True, blank=True)
+    return_photo = models.ImageField(upload_to='return_photos/', storage=media_storage, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     rejection_reason = models.TextField(blank=True, null=True)
@@ -58,6 +70,17 @@ class Booking(models.Model):
         verbose_name = "Booking"
         verbose_name_plural = "Bookings"
         ordering = ['-created_at']
+        indexes = [
+            # Availability checks and approval ("reject other pending requests").
+            models.Index(fields=['item', 'status'], name='booking_item_status_idx'),
+            # A renter's bookings, newest first.
+            models.Index(fields=['renter', '-created_at'], name='booking_renter_created_idx'),
+            # Owner inbox of pending requests; pending rows are a small share of the table.
+            models.Index(fields=['item'], condition=models.Q(status='PENDING'), name='booking_pending_item_idx'),
+            # Delta sync, for the renter and for the item's owner.
+            models.Index(fields=['renter', 'updated_at'], name='booking_renter_updated_idx'),
+            models.Index(fields=['item', 'updated_at'], name='booking_item_updated_idx'),
+        ]
 
     def duration(self):
         # Ensure start_date and end_date are datetime.date objects
@@ -86,7 +109,7 @@ class DamageReport(models.Model):
     booking = models.OneToOneField(Booking, on_delete=models.CASCADE, related_name='damage_report')
     reported_by = models.ForeignKey(User, on_delete=models.CASCADE)
     description = models.TextField()
-    photo = models.ImageField(upload_to='damage_reports/', null=True, blank=True)
+    photo = models.ImageField(upload_to='damage_reports/', storage=media_storage, null=True, blank=True)
     reported_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -98,3 +121,135 @@ class DamageReport(models.Model):
 
     def __str__(self):
         return f"Damage report for {self.booking.item.name}"
+
+
+class Tombstone(models.Model):
+    """
+    Records a deleted item, booking or payment for each user who may hold a
+    copy of it, so delta sync can tell their clients to drop it.
+    """
+    KIND_CHOICES = [
+        ('item', 'Item'),
+        ('booking', 'Booking'),
+        ('payment', 'Payment'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tombstones')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted for {self.user}"
+
+
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload of a photo for one of the TARGETS in
+    rentals/services/uploads.py. Received bytes are kept in a temporary
+    file until the upload is completed and attached.
+    """
+    STATUS_CHOICES = [
+        ('OPEN', 'Open'),
+        ('COMPLETE', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    target = models.CharField(max_length=30)
+    object_id = models.PositiveBigIntegerField()
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='OPEN')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Purging abandoned sessions.
+            models.Index(fields=['updated_at'], condition=models.Q(status='OPEN'), name='upload_open_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.target} {self.object_id}: {self.received}/{self.size} bytes"
+
+
+class MediaBlob(models.Model):
+    """
+    One stored photo file, shared by every field that holds the same
+    content; see rentals/storage.py.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=100, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    # Perceptual difference hash, for near-duplicate detection.
+    dhash = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} references)"
+
+
+class ItemRecommendation(models.Model):
+    """
+    Precomputed top-K similar items for an item, best first; see
+    rentals/services/recommendations.py.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='recommended_in')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            # Also the index the similar-items endpoint reads.
+            models.UniqueConstraint(fields=['item', 'rank'], name='recommendation_item_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} -> {self.recommended_id} (#{self.rank})"
+
+
+class StaleRecommendation(models.Model):
+    """
+    Queue of items whose recommendations need recomputing. `changed` means
+    the item itself changed, so other items' lists may need it added or
+    removed as well.
+    """
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True)
+    changed = models.BooleanField(default=False)
+    queued_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['queued_at'], name='stale_recommendation_queue_idx'),
+        ]
+
+
+class ItemPopularity(models.Model):
+    """
+    Time-decayed popularity counters, stored as logs so they never need
+    rewriting as they decay; see rentals/services/popularity.py.
+    """
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name='popularity')
+    views = models.FloatField()
+    requests = models.FloatField()
+    completions = models.FloatField()
+    # Weighted combination of the three; sort=popular orders by it.
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='item_popularity_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id}: {self.score}"
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+
+from snicko.fieldsets import SparseFieldsetMixin
 from .models import Item, Booking
 
 class ItemSerializer(serializers.ModelSerializer):
@@ -6,13 +8,13 @@ class ItemSerializer(serializers.ModelSerializer):
         model = Item
         fields = ['id', 'name', 'description', 'condition_notes', 'price_per_day', 'deposit_amount', 'location', 'image']
 
-class ItemGetSerializer(serializers.ModelSerializer):
+class ItemGetSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     owner_name = serializers.CharField(source='owner.name')
     class Meta:
         model = Item
         fields = "__all__"
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     item = ItemGetSerializer()  # Use ItemSerializer to make 'item' an object
 
     class Meta:
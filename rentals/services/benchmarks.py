@@ -0,0 +1,161 @@
+"""
+In-process endpoint benchmarks.
+
+Each scenario sends requests through the Django test client, so the numbers
+cover URL routing, middleware, views, serializers and the database, but not
+the network or the ASGI server. Write scenarios run inside a transaction
+that is rolled back after every request, so repeated runs see the same data.
+"""
+import json
+import statistics
+import time
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from rentals.models import Booking
+from rentals.services.marketplace import CITIES, bench_users
+from users.models import CustomUser
+from users.tokens import ClaimsRefreshToken
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    user_id: int = None
+    data: dict = None
+    writes: bool = False
+
+
+@dataclass
+class Result:
+    name: str
+    requests: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    queries_per_request: float
+
+
+def build_scenarios(radius_km=5):
+    """
+    Pick the users and bookings the scenarios act on from the generated data.
+    """
+    _, latitude, longitude = CITIES[0]
+    inbox = (
+        Booking.objects.filter(status='PENDING', item__owner__in=bench_users())
+        .values('item__owner').annotate(pending=Count('id')).order_by('-pending', 'item__owner')
+        .first()
+    )
+    if inbox is None:
+        raise ValueError("No generated marketplace data; run generate_marketplace first.")
+    owner_id = inbox['item__owner']
+    pending = Booking.objects.filter(item__owner_id=owner_id, status='PENDING').order_by('id').first()
+    approved = Booking.objects.filter(status='APPROVED', renter__in=bench_users()).order_by('id').first()
+
+    return [
+        Scenario('item list', 'get', '/api/rentals/items/'),
+        Scenario(
+            'item search', 'get',
+            f'/api/rentals/items/search/?latitude={latitude}&longitude={longitude}&radius={radius_km}&query=drill',
+        ),
+        Scenario('booking inbox', 'get', '/api/rentals/booking/requests/', user_id=owner_id),
+        Scenario(
+            'booking approval', 'post', f'/api/rentals/booking/update-status/{pending.id}/',
+            user_id=owner_id, data={'status': 'APPROVED'}, writes=True,
+        ),
+        Scenario(
+            'payment order', 'post', '/api/payments/create-order/',
+            user_id=approved.renter_id, data={'booking_id': approved.id, 'amount': str(approved.total_price)},
+            writes=True,
+        ),
+    ]
+
+
+def _percentile(quantiles, n):
+    return round(quantiles[n - 1], 2)
+
+
+def run_scenario(scenario, iterations=50, warmup=3):
+    client = Client()
+    headers = {}
+    if scenario.user_id is not None:
+        # A real token, so requests carry the claims the authentication expects.
+        token = ClaimsRefreshToken.for_user(CustomUser.objects.get(pk=scenario.user_id)).access_token
+        headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+
+    latencies, query_counts, errors = [], [], 0
+    for attempt in range(warmup + iterations):
+        context = transaction.atomic() if scenario.writes else nullcontext()
+        with context, CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, scenario.method)(
+                scenario.path, data=json.dumps(scenario.data) if scenario.data else None,
+                content_type='application/json', **headers,
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+            if scenario.writes:
+                transaction.set_rollback(True)
+        if attempt < warmup:
+            continue
+        latencies.append(elapsed)
+        query_counts.append(len(queries))
+        errors += response.status_code >= 400
+
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return Result(
+        name=scenario.name, requests=iterations, errors=errors,
+        p50_ms=_percentile(quantiles, 50), p95_ms=_percentile(quantiles, 95), p99_ms=_percentile(quantiles, 99),
+        queries_per_request=round(statistics.mean(query_counts), 2),
+    )
+
+
+def run_benchmarks(scenarios, iterations=50, warmup=3):
+    # Benchmarks measure the endpoints, not the rate limiter, and never call
+    # the real payment gateway.
+    with override_settings(
+        THROTTLE_ENABLED=False, DEBUG=False,
+        PAYMENT_GATEWAY_CLASS='payments.services.gateway.FakeGateway',
+    ):
+        return [run_scenario(scenario, iterations, warmup) for scenario in scenarios]
+
+
+def failures(results):
+    """
+    Return a list of scenarios with failed requests, whose timings measure
+    error responses rather than the endpoint.
+    """
+    return [f"{result.name}: {result.errors}/{result.requests} requests failed" for result in results if result.errors]
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Return a list of regressions against `baseline`: latency percentiles more
+    than `tolerance` slower, or more queries per request than before.
+    """
+    regressions = []
+    previous = {entry['name']: entry for entry in baseline['results']}
+    for result in results:
+        before = previous.get(result.name)
+        if before is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            now, then = getattr(result, metric), before[metric]
+            if now > then * (1 + tolerance):
+                regressions.append(f"{result.name}: {metric} {then} -> {now}")
+        if result.queries_per_request > before['queries_per_request']:
+            regressions.append(
+                f"{result.name}: queries/request {before['queries_per_request']} -> {result.queries_per_request}"
+            )
+    return regressions
+
+
+def to_json(results, **meta):
+    return {**meta, 'results': [asdict(result) for result in results]}
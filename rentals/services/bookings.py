@@ -0,0 +1,101 @@
+"""
+Booking writes and notification messages shared by the sync views and their
+async counterparts.
+"""
+from django.utils import timezone
+
+from rentals.models import Booking
+from rentals.services import dashboard, popularity
+
+STATUS_ACTIONS = ["APPROVED", "REJECTED", "ACTIVE", "COMPLETED"]
+
+
+def create_booking(item, renter_id, start_date, end_date):
+    booking = Booking.objects.create(
+        item=item,
+        renter_id=renter_id,
+        start_date=start_date,
+        end_date=end_date,
+        status="PENDING",
+    )
+    popularity.record(item.id, "requests")
+    return booking
+
+
+def update_status(booking, action, rejection_reason=""):
+    """
+    Move `booking` to `action`, one of STATUS_ACTIONS. Approving a booking
+    rejects the other pending requests for the item.
+    """
+    if action == "APPROVED":
+        booking.status = "APPROVED"
+        booking.item.is_available = False
+        booking.save()
+
+        # Reject other pending bookings for the same item
+        Booking.objects.filter(item=booking.item, status="PENDING").exclude(
+            pk=booking.pk
+        ).update(status="REJECTED", updated_at=timezone.now())
+        dashboard.invalidate(booking.item.owner_id)
+
+    elif action == "REJECTED":
+        booking.status = "REJECTED"
+        booking.rejection_reason = rejection_reason
+        booking.save()
+
+    elif action == "ACTIVE":
+        booking.status = "ACTIVE"
+        booking.save()
+
+    elif action == "COMPLETED":
+        booking.status = "COMPLETED"
+        booking.save()
+        popularity.record(booking.item_id, "completions")
+
+
+def booking_request_message(booking):
+    """
+    Return (title, body, data) telling the owner about `booking`.
+    """
+    if booking.status == "PENDING":
+        title = "Booking Request Received"
+        body = f"Your booking request for {booking.item.name} from {booking.start_date} to {booking.end_date} is pending approval."
+    elif booking.status == "APPROVED":
+        title = "Booking Approved"
+        body = f"Your booking for {booking.item.name} from {booking.start_date} to {booking.end_date} has been approved."
+    elif booking.status == "REJECTED":
+        title = "Booking Rejected"
+        body = f"Your booking request for {booking.item.name} from {booking.start_date} to {booking.end_date} has been rejected."
+    elif booking.status == "ACTIVE":
+        title = "Booking Active"
+        body = f"Your booking for {booking.item.name} is now active from {booking.start_date} to {booking.end_date}."
+    elif booking.status == "COMPLETED":
+        title = "Booking Completed"
+        body = f"Your booking for {booking.item.name} from {booking.start_date} to {booking.end_date} has been completed."
+    else:
+        title = "Booking Update"
+        body = f"Your booking for {booking.item.name} has been updated."
+    return title, body, {"redirectTo": "requestpage"}
+
+
+def booking_status_message(booking, status):
+    """
+    Return (title, body, data) telling the renter `booking` moved to `status`.
+    """
+    if status == "APPROVED":
+        title = "Booking Status Updated"
+        body = f"The status of your booking for {booking.item.name} has been updated to {booking.status}."
+        data = {"redirectTo": "paymentpage", "booking_id": str(booking.id)}  # Ensure values are strings
+    elif status == "REJECTED":
+        title = "Booking Request Rejected"
+        body = f"Your booking request for {booking.item.name} from {booking.start_date} to {booking.end_date} has been rejected."
+        data = {}
+    elif status == "ACTIVE":
+        title = "Booking Active"
+        body = f"Your booking for {booking.item.name} is now active from {booking.start_date} to {booking.end_date}."
+        data = {}
+    elif status == "COMPLETED":
+        title = "Booking Completed"
+        body = f"Your booking for {booking.item.name} from {booking.start_date} to {booking.end_date} has been completed."
+        data = {}
+    return title, body, data
@@ -0,0 +1,115 @@
+"""
+Owner dashboard: booking counts per item and status, pending requests,
+upcoming pickups and utilisation, from two queries.
+
+Results are cached per owner for DASHBOARD_CACHE_SECONDS. Item and booking
+writes invalidate them after commit (rentals/signals.py, plus the bulk
+updates that bypass signals). Utilisation is the share of the last
+DASHBOARD_UTILISATION_DAYS days, today included, covered by approved,
+active or completed bookings.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from rentals.models import Booking, Item
+
+BOOKED_STATUSES = ['APPROVED', 'ACTIVE', 'COMPLETED']
+
+
+def cache_key(owner_id, today=None):
+    # Upcoming pickups and utilisation depend on the date.
+    return f"owner-dashboard:{owner_id}:{(today or timezone.now().date()).isoformat()}"
+
+
+def invalidate(*owner_ids):
+    """
+    Drop cached dashboards once the current transaction commits, so a
+    concurrent read cannot cache the data from before the write.
+    """
+    keys = [cache_key(owner_id) for owner_id in set(owner_ids) if owner_id is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _item_rows(owner, today, window_start):
+    overlaps = Q(
+        bookings__status__in=BOOKED_STATUSES,
+        bookings__start_date__lte=today,
+        bookings__end_date__gte=window_start,
+    )
+    booked = ExpressionWrapper(
+        Least(F('bookings__end_date'), Value(today)) - Greatest(F('bookings__start_date'), Value(window_start)),
+        output_field=DurationField(),
+    )
+    counts = {
+        status.lower(): Count('bookings', filter=Q(bookings__status=status))
+        for status, _ in Booking.STATUS_CHOICES
+    }
+    return (
+        Item.objects.filter(owner=owner)
+        .values('id', 'name')
+        .annotate(**counts, booked_span=Sum(booked, filter=overlaps), booked_count=Count('bookings', filter=overlaps))
+        .order_by('id')
+    )
+
+
+def build_dashboard(owner, today=None):
+    today = today or timezone.now().date()
+    window = settings.DASHBOARD_UTILISATION_DAYS
+    window_start = today - timedelta(days=window - 1)
+
+    items, pending = [], 0
+    for row in _item_rows(owner, today, window_start):
+        # Booking dates are inclusive, so each overlapping booking adds a day.
+        booked_days = (row['booked_span'] or timedelta()).days + row['booked_count']
+        pending += row['pending']
+        items.append({
+            'id': row['id'],
+            'name': row['name'],
+            'bookings': {status: row[status.lower()] for status, _ in Booking.STATUS_CHOICES},
+            'booked_days': booked_days,
+            'utilisation': round(min(booked_days / window, 1.0), 4),
+        })
+
+    upcoming = (
+        Booking.objects.filter(
+            item__owner=owner, status='APPROVED',
+            start_date__gte=today, start_date__lte=today + timedelta(days=settings.DASHBOARD_UPCOMING_DAYS),
+        )
+        .select_related('item', 'renter')
+        .only('id', 'start_date', 'end_date', 'item__id', 'item__name', 'renter__id', 'renter__name')
+        .order_by('start_date', 'id')
+    )
+    booked_days = sum(item['booked_days'] for item in items)
+    return {
+        'items': items,
+        'pending_requests': pending,
+        'upcoming_pickups': [
+            {
+                'booking_id': booking.id,
+                'item_id': booking.item.id,
+                'item_name': booking.item.name,
+                'renter_name': booking.renter.name,
+                'start_date': booking.start_date.isoformat(),
+                'end_date': booking.end_date.isoformat(),
+            }
+            for booking in upcoming
+        ],
+        'utilisation': round(min(booked_days / (window * len(items)), 1.0), 4) if items else 0.0,
+        'utilisation_days': window,
+    }
+
+
+def owner_dashboard(owner):
+    key = cache_key(owner.id)
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = build_dashboard(owner)
+        cache.set(key, dashboard, settings.DASHBOARD_CACHE_SECONDS)
+    return dashboard
@@ -0,0 +1,224 @@
+import csv
+import json
+import os
+import zipfile
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.contrib.gis.geos import Point
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+
+from rentals.models import Booking, Category, Item
+from rentals.services import dashboard
+from rentals.services.recommendations import enqueue
+from rentals.serializers import ItemSerializer
+
+IMPORT_FIELDS = ['name', 'description', 'condition_notes', 'price_per_day', 'deposit_amount', 'image']
+
+
+def _decoded_lines(fileobj):
+    # Decoded a line at a time rather than through a TextIOWrapper, which
+    # decodes whole chunks, so rows before an invalid byte are still read.
+    for n, line in enumerate(fileobj):
+        yield line.decode('utf-8-sig' if n == 0 else 'utf-8')
+
+
+def parse_rows(fileobj, file_format):
+    """
+    Yield dicts from a CSV or JSONL upload, one per line. Lines that are not
+    valid JSON objects are yielded as None so the importer can report them.
+    Iterating raises UnicodeDecodeError or csv.Error when the file itself
+    cannot be read.
+    """
+    text = _decoded_lines(fileobj)
+    if file_format == 'csv':
+        yield from csv.DictReader(text)
+    elif file_format == 'jsonl':
+        for line in text:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f"Unsupported format: {file_format}")
+
+
+def detect_format(filename):
+    return 'jsonl' if os.path.splitext(filename)[1].lower() in ('.jsonl', '.ndjson') else 'csv'
+
+
+class ItemImporter:
+    """
+    Validate and insert items for one owner in batches.
+
+    Each row is validated with ItemSerializer, images are looked up by file
+    name in an optional zip archive, and valid rows are inserted with one
+    bulk_create per batch. Errors are collected per row rather than aborting
+    the whole import.
+    """
+
+    def __init__(self, owner, images=None, batch_size=200):
+        self.owner = owner
+        self.archive = zipfile.ZipFile(images) if images else None
+        self.batch_size = batch_size
+        self.categories = {c.name.lower(): c for c in Category.objects.all()}
+        self.created = 0
+        self.errors = []
+
+    def _image(self, name):
+        if not isinstance(name, str) or not name or not self.archive:
+            return None
+        try:
+            content = self.archive.read(name)
+        except KeyError:
+            return None
+        return SimpleUploadedFile(os.path.basename(name), content)
+
+    def _location(self, row):
+        latitude, longitude = row.get('latitude'), row.get('longitude')
+        if latitude in (None, '') or longitude in (None, ''):
+            return None
+        try:
+            latitude, longitude = float(latitude), float(longitude)
+        except TypeError:
+            # JSONL rows can carry lists or objects here.
+            raise ValueError("Latitude and longitude must be numbers.")
+        if not (-90 <= latitude <= 90) or not (-180 <= longitude <= 180):
+            raise ValueError("Latitude must be between -90 and 90 and longitude between -180 and 180.")
+        return Point(longitude, latitude)
+
+    def _build(self, line, row):
+        if row is None:
+            self.errors.append({'row': line, 'errors': {'non_field_errors': ["Invalid JSON object."]}})
+            return None
+        data = {field: row.get(field) for field in IMPORT_FIELDS if row.get(field) not in (None, '')}
+        image = self._image(data.get('image'))
+        if image is None:
+            self.errors.append({'row': line, 'errors': {'image': ["Image not found in the archive."]}})
+            return None
+        data['image'] = image
+
+        serializer = ItemSerializer(data=data)
+        if not serializer.is_valid():
+            self.errors.append({'row': line, 'errors': serializer.errors})
+            return None
+        try:
+            location = self._location(row)
+        except ValueError as exc:
+            self.errors.append({'row': line, 'errors': {'location': [str(exc)]}})
+            return None
+
+        category = row.get('category')
+        if isinstance(category, (int, float)) and not isinstance(category, bool):
+            category = str(category)
+        elif category is not None and not isinstance(category, str):
+            self.errors.append({'row': line, 'errors': {'category': ["Category must be a name."]}})
+            return None
+        category = self.categories.get((category or '').strip().lower())
+        return Item(owner=self.owner, category=category, location=location, **serializer.validated_data)
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        # bulk_create runs FileField.pre_save, which writes the images to storage.
+        with transaction.atomic():
+            Item.objects.bulk_create(batch, batch_size=self.batch_size)
+            # bulk_create sends no post_save, so queue the recommendations and
+            # drop the owner's cached dashboard here.
+            enqueue((item.id for item in batch), changed=True)
+            dashboard.invalidate(self.owner.id)
+        self.created += len(batch)
+
+    def run(self, rows):
+        """
+        Import `rows`, usually from parse_rows(). A file that is not UTF-8 or
+        not valid CSV stops the import at the line that could not be read;
+        rows before it are still imported and the line is reported as an
+        error.
+        """
+        batch, line = [], 0
+        try:
+            for line, row in enumerate(rows, start=1):
+                item = self._build(line, row)
+                if item is not None:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+        except UnicodeDecodeError:
+            self.errors.append({'row': line + 1, 'errors': {'file': ["The file must be UTF-8 encoded."]}})
+        except csv.Error as exc:
+            self.errors.append({'row': line + 1, 'errors': {'file': [f"Invalid CSV: {exc}"]}})
+        self._flush(batch)
+        return {'created': self.created, 'failed': len(self.errors), 'errors': self.errors}
+
+
+class Echo:
+    """
+    File-like object whose write() returns the value, so csv.writer can be
+    used to produce streamed rows.
+    """
+
+    def write(self, value):
+        return value
+
+
+EXPORTS = {
+    'items': [
+        'id', 'name', 'description', 'condition_notes', 'category__name',
+        'price_per_day', 'deposit_amount', 'image', 'is_available', 'created_at', 'updated_at',
+    ],
+    'bookings': [
+        'id', 'item_id', 'item__name', 'renter_id', 'start_date', 'end_date',
+        'total_price', 'status', 'created_at', 'updated_at',
+    ],
+}
+
+
+def export_queryset(resource, user):
+    if resource == 'items':
+        queryset = Item.objects.filter(owner=user)
+    else:
+        queryset = Booking.objects.filter(Q(renter=user) | Q(item__owner=user))
+    return queryset.order_by('id').values_list(*EXPORTS[resource])
+
+
+def stream_export(resource, user, file_format='jsonl', chunk_size=1000):
+    """
+    Yield an export of a user's items or bookings line by line.
+
+    Rows are read with a server-side cursor, so memory use does not depend on
+    how many rows the user has.
+    """
+    columns = EXPORTS[resource]
+    rows = export_queryset(resource, user).iterator(chunk_size=chunk_size)
+    if file_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+async def astream_export(resource, user, file_format='jsonl', chunk_size=1000):
+    """
+    stream_export() for ASGI, which would otherwise read a sync iterator into
+    a list before sending it. Each batch of lines is read in a worker thread;
+    thread_sensitive keeps every batch on the same thread, and so on the
+    same connection and server-side cursor.
+    """
+    lines = stream_export(resource, user, file_format, chunk_size)
+    read = sync_to_async(lambda: list(islice(lines, chunk_size)), thread_sensitive=True)
+    while True:
+        batch = await read()
+        if not batch:
+            return
+        yield ''.join(batch)
@@ -0,0 +1,123 @@
+"""
+Deterministic synthetic marketplace data for benchmarks.
+
+The same seed and sizes always produce the same users, items and bookings,
+so benchmark baselines taken on different machines or days compare like
+with like. Rows are written with bulk_create in batches and bookings are
+generated batch by batch, so memory use does not grow with their number.
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import Point
+from django.db import connection, transaction
+
+from rentals.models import Booking, Category, Item
+from users.models import CustomUser
+
+EMAIL_DOMAIN = 'bench.snicko.test'
+
+# (name, latitude, longitude)
+CITIES = [
+    ('Pune', 18.5204, 73.8567),
+    ('Mumbai', 19.0760, 72.8777),
+    ('Bengaluru', 12.9716, 77.5946),
+    ('New Delhi', 28.6139, 77.2090),
+    ('Hyderabad', 17.3850, 78.4867),
+    ('Chennai', 13.0827, 80.2707),
+    ('Kolkata', 22.5726, 88.3639),
+    ('Ahmedabad', 23.0225, 72.5714),
+]
+CATEGORIES = ['Tools', 'Camping', 'Electronics', 'Sports', 'Party', 'Photography', 'Music', 'Travel']
+NOUNS = ['drill', 'tent', 'camera', 'speaker', 'bicycle', 'ladder', 'projector', 'guitar', 'kayak', 'suitcase']
+ADJECTIVES = ['compact', 'heavy duty', 'portable', 'professional', 'family', 'lightweight', 'cordless', 'vintage']
+STATUSES = ['COMPLETED'] * 12 + ['REJECTED'] * 4 + ['APPROVED'] * 2 + ['ACTIVE', 'PENDING', 'PENDING']
+
+# Jitter around a city centre, in degrees (about 15 km).
+SPREAD = 0.15
+
+
+def bench_users():
+    return CustomUser.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}')
+
+
+def clear_marketplace():
+    """
+    Delete previously generated data; items and bookings cascade.
+    """
+    return bench_users().delete()
+
+
+def _batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(batch_size, total - start)
+
+
+def generate_marketplace(users=10000, items=200000, bookings=2000000, seed=41,
+                         batch_size=5000, password='benchmark', progress=None):
+    """
+    Create the dataset and return the number of rows of each kind.
+    `progress`, if given, is called with (label, done, total) after each batch.
+    """
+    rng = random.Random(seed)
+    report = progress or (lambda label, done, total: None)
+    hashed = make_password(password)
+    start_day = date.today() + timedelta(days=1)
+
+    categories = [Category.objects.get_or_create(name=name)[0] for name in CATEGORIES]
+
+    user_ids = []
+    for offset, size in _batches(users, batch_size):
+        with transaction.atomic():
+            created = CustomUser.objects.bulk_create(
+                CustomUser(email=f'user{offset + n}@{EMAIL_DOMAIN}', name=f'Bench User {offset + n}', password=hashed)
+                for n in range(size)
+            )
+        user_ids.extend(user.id for user in created)
+        report('users', len(user_ids), users)
+
+    item_rows = []
+    for offset, size in _batches(items, batch_size):
+        batch = []
+        for n in range(size):
+            city, latitude, longitude = rng.choice(CITIES)
+            noun = rng.choice(NOUNS)
+            batch.append(Item(
+                owner_id=rng.choice(user_ids),
+                name=f'{rng.choice(ADJECTIVES).title()} {noun} #{offset + n}',
+                description=f'A {rng.choice(ADJECTIVES)} {noun} available for rent in {city}.',
+                category=rng.choice(categories),
+                price_per_day=Decimal(rng.randrange(50, 5000, 10)),
+                deposit_amount=Decimal(rng.randrange(0, 10000, 100)),
+                image=f'item_images/bench/{noun}.jpg',
+                location=Point(
+                    longitude + rng.uniform(-SPREAD, SPREAD), latitude + rng.uniform(-SPREAD, SPREAD), srid=4326,
+                ),
+            ))
+        with transaction.atomic():
+            created = Item.objects.bulk_create(batch)
+        item_rows.extend((item.id, item.price_per_day) for item in created)
+        report('items', len(item_rows), items)
+
+    done = 0
+    for offset, size in _batches(bookings, batch_size):
+        batch = []
+        for n in range(size):
+            item_id, price = rng.choice(item_rows)
+            start = start_day + timedelta(days=rng.randrange(-365, 90))
+            days = rng.randrange(1, 8)
+            batch.append(Booking(
+                renter_id=rng.choice(user_ids), item_id=item_id, status=rng.choice(STATUSES),
+                start_date=start, end_date=start + timedelta(days=days), total_price=price * days,
+            ))
+        with transaction.atomic():
+            Booking.objects.bulk_create(batch)
+        done += size
+        report('bookings', done, bookings)
+
+    with connection.cursor() as cursor:
+        for model in (CustomUser, Item, Booking):
+            cursor.execute(f'ANALYZE "{model._meta.db_table}"')
+    return {'users': len(user_ids), 'items': len(item_rows), 'bookings': done}
@@ -1,7 +1,10 @@
+from asgiref.sync import sync_to_async
 from firebase_admin import messaging
 import firebase_admin
 from firebase_admin import credentials
 
+from snicko.metrics import timed_call
+
 cred = credentials.Certificate("serviceAccountKey.json")
 firebase_admin.initialize_app(cred)
 
@@ -15,5 +18,18 @@ def send_fcm_notification(token, title, body, data=None):
         data=data or {},  # Optional custom payload
     )
 
-    response = messaging.send(message)
+    with timed_call("fcm"):
+        response = messaging.send(message)
     return response
+
+
+
+async def asend_fcm_notification(token, title, body, data=None):
+    """
+    Send a notification from async code.
+
+    firebase_admin only has a blocking client, so the call runs on a worker
+    thread that is not shared with the ORM, keeping the event loop free.
+    """
+    return await sync_to_async(send_fcm_notification, thread_sensitive=False)(token, title, body, data)
+
@@ -0,0 +1,195 @@
+"""
+Time-decayed item popularity.
+
+Views, booking requests and completions are counted in memory by each
+worker. A background thread flushes them to ItemPopularity every
+POPULARITY_FLUSH_SECONDS with one batched upsert, and once more when the
+process exits, so requests never wait for the flush. Counts decay with a
+half-life of POPULARITY_HALF_LIFE_DAYS.
+
+Rewriting every row as time passes is avoided by storing each counter as
+log(sum of exp(rate * (event time - EPOCH)))
+
+where rate = ln 2 / half-life. The decayed value now is
+exp(stored - rate * (now - EPOCH)). That factor is the same for every row,
+so ordering by the stored column is ordering by current popularity. New
+events are merged with log-add-exp, in SQL during the upsert.
+
+The index on `score` serves top-N reads of ItemPopularity itself. Item
+listings filter items first and sort them across a LEFT JOIN with NULLS
+LAST, which sorts the matching rows rather than walking the index.
+
+Counts not yet flushed are lost if a worker is killed without exiting
+normally. This loses at most one flush interval of a signal that is only
+used for ranking.
+"""
+import atexit
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import F
+
+from rentals.models import Item, ItemPopularity
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(2026, 1, 1, tzinfo=dt_timezone.utc).timestamp()
+KINDS = ('views', 'requests', 'completions')
+# Stored for a counter with no events: exp(EMPTY) is indistinguishable from 0.
+EMPTY = -1e6
+BATCH_SIZE = 1000
+
+
+def _rate():
+    return math.log(2) / (settings.POPULARITY_HALF_LIFE_DAYS * 86400)
+
+
+def decayed(value, now=None):
+    """
+    Current decayed count for a stored log value.
+    """
+    now = time.time() if now is None else now
+    return math.exp(value - _rate() * (now - EPOCH))
+
+
+class PopularityCounters:
+    """
+    Per-process buffer of decayed event counts, relative to `base` so the
+    exponentials stay small between flushes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.base = time.time()
+        self.counts = {}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def record(self, item_id, kind, now=None):
+        weight = math.exp(_rate() * ((time.time() if now is None else now) - self.base))
+        with self.lock:
+            counts = self.counts.get(item_id)
+            if counts is None:
+                counts = self.counts[item_id] = dict.fromkeys(KINDS, 0.0)
+            counts[kind] += weight
+
+    def start(self):
+        """
+        Flush every POPULARITY_FLUSH_SECONDS on a daemon thread, and once
+        more at exit.
+        """
+        self.thread = threading.Thread(target=self._run, name="popularity-flush", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self.stopped.wait(settings.POPULARITY_FLUSH_SECONDS):
+            self.flush()
+            # Connections are per thread; do not hold this one between flushes.
+            connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout=settings.POPULARITY_FLUSH_SECONDS)
+        self.flush()
+
+    def take(self):
+        with self.lock:
+            counts, base = self.counts, self.base
+            self.counts, self.base = {}, time.time()
+        return counts, base
+
+    def restore(self, counts, base):
+        # Put back counts a failed flush could not write, rescaled to the
+        # current base.
+        scale = math.exp(_rate() * (base - self.base))
+        with self.lock:
+            for item_id, values in counts.items():
+                current = self.counts.setdefault(item_id, dict.fromkeys(KINDS, 0.0))
+                for kind, value in values.items():
+                    current[kind] += value * scale
+
+    def flush(self):
+        counts, base = self.take()
+        if not counts:
+            return 0
+        try:
+            upsert(counts, base)
+        except Exception:
+            logger.exception("Could not flush popularity counters")
+            self.restore(counts, base)
+            return 0
+        return len(counts)
+
+
+def _log(value, offset):
+    return math.log(value) + offset if value > 0 else EMPTY
+
+
+def upsert(counts, base):
+    """
+    Merge buffered counts (relative to `base`) into ItemPopularity with one
+    INSERT ... ON CONFLICT per BATCH_SIZE items.
+    """
+    weights = settings.POPULARITY_WEIGHTS
+    offset = _rate() * (base - EPOCH)
+    rows = []
+    for item_id, values in counts.items():
+        score = sum(weights[kind] * values[kind] for kind in KINDS)
+        rows.append((item_id, *(_log(values[kind], offset) for kind in KINDS), _log(score, offset)))
+
+    table = ItemPopularity._meta.db_table
+    columns = [*KINDS, 'score']
+    # log(exp(a) + exp(b)), without overflowing; the LEAST keeps EXP from
+    # underflowing, which PostgreSQL reports as an error.
+    merge = ", ".join(
+        f"{column} = GREATEST(p.{column}, EXCLUDED.{column})"
+        f" + LN(1 + EXP(-LEAST(ABS(p.{column} - EXCLUDED.{column}), 700)))"
+        for column in columns
+    )
+    # Row locks are taken in id order so concurrent flushes cannot deadlock,
+    # and counts for items deleted since they were recorded are dropped by
+    # the join.
+    rows.sort()
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} AS p (item_id, {', '.join(columns)}) "
+                f"SELECT v.* FROM (VALUES {placeholders}) AS v (item_id, {', '.join(columns)}) "
+                f"JOIN {Item._meta.db_table} i ON i.id = v.item_id ORDER BY v.item_id "
+                f"ON CONFLICT (item_id) DO UPDATE SET {merge}",
+                [value for row in batch for value in row],
+            )
+
+
+_counters = None
+_counters_lock = threading.Lock()
+
+
+def get_counters():
+    global _counters
+    if _counters is None:
+        with _counters_lock:
+            if _counters is None:
+                _counters = PopularityCounters()
+                _counters.start()
+    return _counters
+
+
+def record(item_id, kind):
+    get_counters().record(item_id, kind)
+
+
+def order_by_popularity(items):
+    """
+    Most popular first; items never counted come last, newest first.
+    """
+    return items.order_by(F('popularity__score').desc(nulls_last=True), '-created_at')
@@ -0,0 +1,205 @@
+"""
+Precomputed "similar items nearby".
+
+Each item's top RECOMMENDATION_TOP_K similar items are stored in
+ItemRecommendation, so the similar-items endpoint is one index range scan.
+Candidates are the nearest items within RECOMMENDATION_RADIUS_KM plus the
+nearest of the same category (or, for items without a location, the newest
+of the same category). They are scored on:
+
+    category   1 if the category matches
+    distance   exp(-km / RECOMMENDATION_DISTANCE_SCALE_KM)
+    price      cheaper / dearer price per day
+    text       TF-IDF cosine similarity of name and description
+
+weighted by RECOMMENDATION_WEIGHTS.
+
+Refreshing is incremental. Saving an item queues it in StaleRecommendation
+and process_queue() recomputes its list. Because the score is symmetric,
+the same pass also merges the item into, or drops it from, the lists of
+its candidates without recomputing those. A list that loses an entry is
+queued for a full refresh. The TF-IDF weights come from each item's own
+candidate pool, so the merged scores are close to what a full refresh
+would give, not exactly equal.
+"""
+import re
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.contrib.gis.measure import D
+from django.db import transaction
+from django.db.models import Q
+
+from rentals.models import Item, ItemRecommendation, StaleRecommendation
+from snicko.gis import KNNDistance
+
+TOKEN_RE = re.compile(r"[a-z0-9]{3,}")
+FIELDS = ("id", "name", "description", "category_id", "price_per_day", "location", "is_available")
+# Saves touching only other fields (e.g. a new photo) do not requeue.
+SCORED_FIELDS = {"name", "description", "category", "category_id", "price_per_day", "location", "is_available"}
+
+
+def enqueue(item_ids, changed=False):
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+    StaleRecommendation.objects.bulk_create(
+        [StaleRecommendation(item_id=item_id, changed=changed) for item_id in item_ids],
+        ignore_conflicts=True,
+    )
+    if changed:
+        StaleRecommendation.objects.filter(item_id__in=item_ids, changed=False).update(changed=True)
+
+
+def candidates(item):
+    items = Item.objects.filter(is_available=True).exclude(pk=item.pk).only(*FIELDS)
+    size = settings.RECOMMENDATION_POOL_SIZE
+    if item.location is None:
+        if item.category_id is None:
+            return []
+        return list(items.filter(category_id=item.category_id).order_by("-created_at")[:size])
+    nearby = (
+        items.filter(location__dwithin=(item.location, D(km=settings.RECOMMENDATION_RADIUS_KM)))
+        .annotate(distance=KNNDistance("location", item.location))
+        .order_by("distance")
+    )
+    pool = {other.id: other for other in nearby[:size]}
+    if item.category_id is not None:
+        pool.update((other.id, other) for other in nearby.filter(category_id=item.category_id)[:size])
+    return list(pool.values())
+
+
+def text_similarity(item, others):
+    docs = [TOKEN_RE.findall(f"{doc.name} {doc.description}".lower()) for doc in [item, *others]]
+    vocabulary = {}
+    for doc in docs:
+        for token in doc:
+            vocabulary.setdefault(token, len(vocabulary))
+    if not vocabulary:
+        return np.zeros(len(others))
+    counts = np.zeros((len(docs), len(vocabulary)))
+    for row, doc in enumerate(docs):
+        for token in doc:
+            counts[row, vocabulary[token]] += 1
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(docs)) / (1 + document_frequency)) + 1
+    vectors = np.log1p(counts) * idf
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1
+    vectors /= norms[:, None]
+    return vectors[1:] @ vectors[0]
+
+
+def score(item, others):
+    """
+    Return an array of similarity scores between `item` and each of
+    `others`, which must carry a `distance` in metres when located.
+    """
+    if not others:
+        return np.zeros(0)
+    weights = settings.RECOMMENDATION_WEIGHTS
+    category = np.array(
+        [item.category_id is not None and other.category_id == item.category_id for other in others], dtype=float,
+    )
+    km = np.array([
+        other.distance / 1000 if getattr(other, "distance", None) is not None else np.inf for other in others
+    ])
+    distance = np.exp(-km / settings.RECOMMENDATION_DISTANCE_SCALE_KM)
+    prices = np.array([float(other.price_per_day) for other in others])
+    price = np.minimum(prices, float(item.price_per_day)) / np.maximum(
+        np.maximum(prices, float(item.price_per_day)), 0.01
+    )
+    return (
+        weights["category"] * category
+        + weights["distance"] * distance
+        + weights["price"] * price
+        + weights["text"] * text_similarity(item, others)
+    )
+
+
+def _write(item_id, ranked):
+    ItemRecommendation.objects.filter(item_id=item_id).delete()
+    ItemRecommendation.objects.bulk_create(
+        ItemRecommendation(item_id=item_id, recommended_id=other_id, rank=rank, score=value)
+        for rank, (other_id, value) in enumerate(ranked)
+    )
+
+
+def _merge_into_neighbours(item_id, scores):
+    """
+    Add `item_id` to, move it within or drop it from the lists of the items
+    it was scored against (`scores`) and of the items already listing it.
+    """
+    top_k = settings.RECOMMENDATION_TOP_K
+    lists = defaultdict(list)
+    rows = (
+        ItemRecommendation.objects.filter(Q(item_id__in=list(scores)) | Q(recommended_id=item_id))
+        .order_by("item_id", "rank")
+        .values_list("item_id", "recommended_id", "score")
+    )
+    for owner_id, other_id, value in rows:
+        lists[owner_id].append((other_id, value))
+
+    stale = []
+    # Neighbours with no list yet (e.g. the first item in an area) are in
+    # `scores` only.
+    for other_id in set(scores) | set(lists):
+        current = lists[other_id]
+        listed = any(entry == item_id for entry, _ in current)
+        merged = [(entry, value) for entry, value in current if entry != item_id]
+        value = scores.get(other_id, 0)
+        if value > 0 and (len(merged) < top_k or value > merged[-1][1]):
+            merged = sorted(merged + [(item_id, value)], key=lambda pair: -pair[1])[:top_k]
+        elif not listed:
+            continue
+        elif len(current) == top_k:
+            # The freed slot may belong to an item this merge cannot see.
+            stale.append(other_id)
+        if merged != current:
+            _write(other_id, merged)
+    enqueue(stale)
+
+
+def refresh(item, propagate=False):
+    others = candidates(item)
+    scores = score(item, others)
+    order = np.argsort(-scores, kind="stable")[:settings.RECOMMENDATION_TOP_K]
+    with transaction.atomic():
+        _write(item.id, [(others[i].id, float(scores[i])) for i in order if scores[i] > 0])
+        if propagate:
+            # An unavailable item is only removed from other lists.
+            neighbours = {other.id: float(value) for other, value in zip(others, scores)} if item.is_available else {}
+            _merge_into_neighbours(item.id, neighbours)
+
+
+def process_queue(batch_size=100):
+    """
+    Refresh queued items until the queue is empty. Several workers may run
+    this at once; each claims its own batch. Returns the number refreshed.
+    """
+    processed = 0
+    while True:
+        with transaction.atomic():
+            claimed = dict(
+                StaleRecommendation.objects.select_for_update(skip_locked=True)
+                .order_by("queued_at").values_list("item_id", "changed")[:batch_size]
+            )
+            StaleRecommendation.objects.filter(item_id__in=list(claimed)).delete()
+        if not claimed:
+            return processed
+        for item in Item.objects.filter(pk__in=list(claimed)).only(*FIELDS):
+            refresh(item, propagate=claimed[item.id])
+        processed += len(claimed)
+
+
+def rebuild(batch_size=1000):
+    """
+    Recompute every item's list from scratch, e.g. after bulk loading.
+    """
+    StaleRecommendation.objects.all().delete()
+    count = 0
+    for item in Item.objects.only(*FIELDS).iterator(chunk_size=batch_size):
+        refresh(item)
+        count += 1
+    return count
@@ -0,0 +1,108 @@
+"""
+Facet counts for item search.
+
+Search results can be narrowed by category and price range; the response
+carries counts per category, per price band (SEARCH_PRICE_BANDS) and per
+distance ring (SEARCH_DISTANCE_RINGS_KM) so the app can show its filter
+chips without searching again.
+
+All facets come from one grouped query over the items matching the
+location and text query, grouped by category, price band, innermost ring
+and whether the price is in the requested range. Each facet then ignores
+its own filter, as filter chips expect: the category counts apply only
+the price filter, the price band counts only the category filter, and the
+rings (which are cumulative) both.
+"""
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.gis.measure import D
+from django.db.models import BooleanField, Case, Count, IntegerField, Q, Value, When
+
+
+def price_bands():
+    """
+    (min, max) pairs from SEARCH_PRICE_BANDS; the last band has no max.
+    """
+    bounds = settings.SEARCH_PRICE_BANDS
+    return list(zip(bounds, [*bounds[1:], None]))
+
+
+def distance_rings(radius):
+    """
+    Ring radii in km up to `radius`, which is always the outermost ring.
+    """
+    return [ring for ring in settings.SEARCH_DISTANCE_RINGS_KM if ring < radius] + [radius]
+
+
+def price_filter(min_price=None, max_price=None):
+    q = Q()
+    if min_price is not None:
+        q &= Q(price_per_day__gte=min_price)
+    if max_price is not None:
+        q &= Q(price_per_day__lte=max_price)
+    return q
+
+
+def category_filter(category_ids):
+    return Q(category_id__in=category_ids) if category_ids else Q()
+
+
+def facets(items, location, radius, category_ids=None, min_price=None, max_price=None):
+    """
+    Facet counts for `items`, a queryset filtered by location and text
+    query but not by category or price.
+    """
+    bands = price_bands()
+    rings = distance_rings(radius)
+    prices = price_filter(min_price, max_price)
+    # When() rejects an empty Q, so without a price filter every row is in range.
+    if prices:
+        in_price = Case(When(prices, then=Value(True)), default=Value(False), output_field=BooleanField())
+    else:
+        in_price = Value(True, output_field=BooleanField())
+    rows = (
+        items.order_by()
+        .values(
+            'category_id',
+            'category__name',
+            band=Case(
+                *[When(price_per_day__lt=Decimal(str(high)), then=Value(n)) for n, (_, high) in enumerate(bands[:-1])],
+                default=Value(len(bands) - 1),
+                output_field=IntegerField(),
+            ),
+            ring=Case(
+                *[When(location__dwithin=(location, D(km=km)), then=Value(n)) for n, km in enumerate(rings[:-1])],
+                default=Value(len(rings) - 1),
+                output_field=IntegerField(),
+            ),
+            in_price=in_price,
+        )
+        .annotate(count=Count('id'))
+    )
+
+    categories, names, by_band, by_ring = Counter(), {}, Counter(), Counter()
+    for row in rows:
+        in_category = not category_ids or row['category_id'] in category_ids
+        if row['in_price'] and row['category_id'] is not None:
+            categories[row['category_id']] += row['count']
+            names[row['category_id']] = row['category__name']
+        if in_category:
+            by_band[row['band']] += row['count']
+        if in_category and row['in_price']:
+            by_ring[row['ring']] += row['count']
+
+    return {
+        'total': sum(by_ring.values()),
+        'categories': [
+            {'id': category_id, 'name': names[category_id], 'count': count}
+            for category_id, count in sorted(categories.items(), key=lambda pair: (-pair[1], names[pair[0]]))
+        ],
+        'price_bands': [
+            {'min': low, 'max': high, 'count': by_band[n]} for n, (low, high) in enumerate(bands)
+        ],
+        'distance_rings': [
+            {'km': km, 'count': sum(by_ring[inner] for inner in range(n + 1))} for n, km in enumerate(rings)
+        ],
+    }
@@ -0,0 +1,112 @@
+"""
+Delta sync for offline-first clients.
+
+A client keeps the watermark returned by its last sync and sends it back as
+?since=. The response holds the items, bookings and payments it can see that
+changed at or after the watermark, the ids of those deleted since, and a new
+watermark.
+
+Rows are stamped by the application servers' clocks, but the watermark is
+read from the database clock, so every server hands out watermarks from the
+same clock. It is read before the changes are queried and then moved back
+by SYNC_OVERLAP_SECONDS. The overlap covers rows
+stamped by an application server whose clock runs behind, and transactions
+that stamped their rows before the watermark but committed after the query
+ran. Rows in the overlap are sent again on the next sync; clients upsert by
+id, so repeats are harmless. The returned watermark never moves backwards
+past the one the client sent.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from payments.models import Payment
+from rentals.models import Booking, Item, Tombstone
+
+
+def database_now():
+    # statement_timestamp() rather than now(), which stays at the start of
+    # the enclosing transaction.
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT statement_timestamp()")
+        return cursor.fetchone()[0]
+
+
+def next_watermark(since=None):
+    watermark = database_now() - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+    if since is not None and since > watermark:
+        return since
+    return watermark
+
+
+def is_expired(since):
+    """
+    Tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS are pruned, so a
+    client that last synced before then has to start over.
+    """
+    return since < timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+
+def changes(user, since=None):
+    """
+    Return (items, bookings, payments, deleted) changed for `user` since the
+    watermark `since`, or everything when it is None. `deleted` maps each
+    kind to a list of ids.
+    """
+    items = Item.objects.filter(owner=user).select_related("owner")
+    renting = Booking.objects.filter(renter=user).select_related("item__owner")
+    lending = Booking.objects.filter(item__owner=user).select_related("item__owner")
+    payments = Payment.objects.filter(user=user)
+    deleted = {kind: [] for kind, _ in Tombstone.KIND_CHOICES}
+    if since is not None:
+        items = items.filter(updated_at__gte=since)
+        renting = renting.filter(updated_at__gte=since)
+        lending = lending.filter(updated_at__gte=since)
+        payments = payments.filter(updated_at__gte=since)
+        tombstones = Tombstone.objects.filter(user=user, deleted_at__gte=since).values_list("kind", "object_id")
+        for kind, object_id in tombstones:
+            deleted[kind].append(object_id)
+
+    # Two indexed queries rather than one OR across the join.
+    bookings = {booking.id: booking for booking in renting}
+    bookings.update((booking.id, booking) for booking in lending)
+    return list(items), list(bookings.values()), list(payments), deleted
+
+
+def record_deletion(obj):
+    """
+    Write tombstones for `obj` (an Item or Booking) and for the bookings and
+    payments its deletion cascades to, one per user who may have synced
+    them. Call inside the transaction that deletes `obj`.
+    """
+    if isinstance(obj, Item):
+        bookings = Booking.objects.filter(item=obj)
+        tombstones = [Tombstone(user_id=obj.owner_id, kind="item", object_id=obj.id)]
+        owner_id = obj.owner_id
+    else:
+        bookings = Booking.objects.filter(pk=obj.pk)
+        tombstones = []
+        owner_id = obj.item.owner_id
+    for booking_id, renter_id in bookings.values_list("id", "renter_id"):
+        tombstones.extend(
+            Tombstone(user_id=user_id, kind="booking", object_id=booking_id)
+            for user_id in {renter_id, owner_id}
+        )
+    tombstones.extend(
+        Tombstone(user_id=user_id, kind="payment", object_id=payment_id)
+        for payment_id, user_id in Payment.objects.filter(booking__in=bookings).values_list("id", "user_id")
+    )
+    Tombstone.objects.bulk_create(tombstones)
+
+
+def delete_with_tombstones(obj):
+    with transaction.atomic():
+        record_deletion(obj)
+        obj.delete()
+
+
+def prune_tombstones():
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    return Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
@@ -0,0 +1,214 @@
+"""
+Resumable chunked uploads for item, handover and damage photos.
+
+    POST   uploads/                 {target, object_id, filename, size, sha256}
+    PUT    uploads/<id>/            raw bytes, Upload-Offset: <n>
+                                    [, Upload-Checksum: sha256 <hex>]
+    GET    uploads/<id>/            current offset, to resume after a failure
+    POST   uploads/<id>/complete/   verify and attach
+    DELETE uploads/<id>/            abort
+
+Chunks are streamed to a temporary file in fixed-size blocks, so memory use
+does not depend on chunk or file size. The temporary file's length is the
+offset: a chunk must start exactly there, and a chunk that fails its
+checksum or arrives short is cut off again. Once complete, the file is
+checked against the declared SHA-256, verified as an image and saved
+through the target field's storage backend (content-addressed, see
+rentals/storage.py). When a file with the declared SHA-256 is already
+stored, the upload completes as soon as it is created and no bytes are sent.
+"""
+import fcntl
+import hashlib
+import os
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from rentals.models import Booking, DamageReport, Item, MediaBlob, UploadSession
+
+BLOCK_SIZE = 64 * 1024
+
+Target = namedtuple('Target', ['model', 'field', 'allowed'])
+
+
+def _is_party(booking, user):
+    return user.id in (booking.renter_id, booking.item.owner_id)
+
+
+TARGETS = {
+    'item.image': Target(Item, 'image', lambda item, user: item.owner_id == user.id),
+    'booking.pickup_photo': Target(Booking, 'pickup_photo', _is_party),
+    'booking.return_photo': Target(Booking, 'return_photo', _is_party),
+    'damage_report.photo': Target(
+        DamageReport, 'photo', lambda report, user: _is_party(report.booking, user),
+    ),
+}
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    def __init__(self, offset):
+        super().__init__(f"Expected a chunk at offset {offset}")
+        self.offset = offset
+
+
+class UploadBusy(UploadError):
+    def __init__(self):
+        super().__init__("Another chunk for this upload is still being received")
+
+
+def temp_path(session):
+    return os.path.join(settings.UPLOAD_TEMP_DIR, f'{session.id}.part')
+
+
+def target_object(target, object_id, user):
+    """
+    Return the object `user` may attach an upload to, or raise UploadError.
+    """
+    spec = TARGETS.get(target)
+    if spec is None:
+        raise UploadError(f"Unknown target; use one of: {', '.join(TARGETS)}")
+    obj = spec.model.objects.filter(pk=object_id).first()
+    if obj is None or not spec.allowed(obj, user):
+        raise UploadError("Target not found")
+    return obj
+
+
+def start_upload(user, target, object_id, filename, size, sha256):
+    """
+    Create an upload session. If the file is already stored it is attached
+    straight away and the session is returned complete.
+    """
+    obj = target_object(target, object_id, user)
+    if not 0 < size <= settings.UPLOAD_MAX_SIZE:
+        raise UploadError(f"size must be between 1 and {settings.UPLOAD_MAX_SIZE} bytes")
+    if len(sha256) != 64 or not all(c in '0123456789abcdef' for c in sha256):
+        raise UploadError("sha256 must be a hex digest")
+    session = UploadSession(
+        user=user, target=target, object_id=object_id,
+        filename=os.path.basename(filename)[:255] or 'upload', size=size, sha256=sha256,
+    )
+    blob = MediaBlob.objects.filter(sha256=sha256, size=size).first()
+    if blob is not None:
+        field = TARGETS[target].field
+        with transaction.atomic():
+            setattr(obj, field, blob.name)
+            obj.save(update_fields=[field, 'updated_at'])
+            session.status = 'COMPLETE'
+            session.received = size
+            session.save()
+        return session
+    session.save()
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    open(temp_path(session), 'xb').close()
+    return session
+
+
+def _locked(f):
+    # Two requests for the same upload (a client retrying while the first
+    # attempt is still arriving) must not write at once.
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        raise UploadBusy()
+
+
+def write_chunk(session, offset, stream, length, checksum=None):
+    """
+    Append `length` bytes read from `stream` at `offset` and return the new
+    offset. `checksum`, if given, is the chunk's SHA-256 hex digest.
+    """
+    if offset + length > session.size:
+        raise UploadError("Chunk runs past the declared size")
+    with open(temp_path(session), 'r+b') as f:
+        _locked(f)
+        current = os.fstat(f.fileno()).st_size
+        if offset != current:
+            raise OffsetMismatch(current)
+        f.seek(offset)
+        digest = hashlib.sha256()
+        remaining = length
+        while remaining:
+            block = stream.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            f.write(block)
+            digest.update(block)
+            remaining -= len(block)
+        if remaining or (checksum and digest.hexdigest() != checksum.lower()):
+            f.truncate(offset)
+            raise UploadError("Chunk was incomplete" if remaining else "Chunk checksum mismatch")
+        f.flush()
+        os.fsync(f.fileno())
+    UploadSession.objects.filter(pk=session.pk).update(received=offset + length, updated_at=timezone.now())
+    return offset + length
+
+
+def complete_upload(session, user):
+    """
+    Verify the received file and save it to the target field. Returns the
+    target object.
+    """
+    obj = target_object(session.target, session.object_id, user)
+    field = TARGETS[session.target].field
+    path = temp_path(session)
+    with open(path, 'rb') as f:
+        _locked(f)
+        if os.fstat(f.fileno()).st_size != session.size:
+            raise UploadError("Upload is incomplete")
+        digest = hashlib.sha256()
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            digest.update(block)
+        if digest.hexdigest() != session.sha256:
+            raise UploadError("File checksum mismatch")
+        f.seek(0)
+        try:
+            Image.open(f).verify()
+        except Exception:
+            raise UploadError("File is not a valid image")
+        f.seek(0)
+        content = File(f, name=session.filename)
+        # Already verified; the storage need not hash the file again.
+        content.sha256 = session.sha256
+        with transaction.atomic():
+            # Assigned rather than saved directly so the model save stores
+            # it, and the reference is counted once.
+            setattr(obj, field, content)
+            obj.save(update_fields=[field, 'updated_at'])
+            session.status = 'COMPLETE'
+            session.received = session.size
+            session.save(update_fields=['status', 'received', 'updated_at'])
+    os.remove(path)
+    return obj
+
+
+def abort_upload(session):
+    _remove(session)
+    session.delete()
+
+
+def _remove(session):
+    try:
+        os.remove(temp_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def purge_uploads():
+    """
+    Delete sessions not touched for UPLOAD_SESSION_TTL_HOURS, with their
+    temporary files. Returns the number deleted.
+    """
+    cutoff = timezone.now() - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    sessions = UploadSession.objects.filter(updated_at__lt=cutoff)
+    for session in sessions.filter(status='OPEN').only('id').iterator():
+        _remove(session)
+    return sessions.delete()[0]
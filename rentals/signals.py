@@ -0,0 +1,102 @@
+"""
+Keep MediaBlob reference counts in step with the photo fields of items,
+bookings and damage reports (see rentals/storage.py), queue items for a
+recommendations refresh when they change (see
+rentals/services/recommendations.py) and drop cached owner dashboards
+(see rentals/services/dashboard.py).
+"""
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+
+from rentals.models import Booking, DamageReport, Item, ItemRecommendation
+from rentals.services import dashboard
+from rentals.services.recommendations import SCORED_FIELDS, enqueue
+from rentals.storage import acquire, release
+
+MEDIA_FIELDS = {
+    Item: ['image'],
+    Booking: ['pickup_photo', 'return_photo'],
+    DamageReport: ['photo'],
+}
+
+
+def _name(instance, field):
+    # Read the raw value so deferred fields are not loaded from the database.
+    value = instance.__dict__.get(field)
+    return getattr(value, 'name', value) or None
+
+
+def remember_media(sender, instance, **kwargs):
+    instance._media_names = {
+        field: _name(instance, field) for field in MEDIA_FIELDS[sender] if field in instance.__dict__
+    }
+
+
+def note_new_files(sender, instance, **kwargs):
+    # Files not yet committed are about to go through the storage, which
+    # takes their reference itself.
+    instance._media_stored = {
+        field for field in MEDIA_FIELDS[sender]
+        if field in instance.__dict__ and not getattr(instance, field)._committed
+    }
+
+
+def update_references(sender, instance, created, **kwargs):
+    remembered = {} if created else getattr(instance, '_media_names', {})
+    stored = getattr(instance, '_media_stored', set())
+    for field in MEDIA_FIELDS[sender]:
+        # Skip fields that were deferred when the instance was loaded: their
+        # previous value is unknown (gc_media repairs any drift).
+        if field not in instance.__dict__ or (not created and field not in remembered):
+            continue
+        old, new = remembered.get(field), _name(instance, field)
+        if old == new:
+            continue
+        if new and field not in stored:
+            acquire(new)
+        release(old)
+        remembered[field] = new
+    instance._media_names = remembered
+
+
+def drop_references(sender, instance, **kwargs):
+    for field in MEDIA_FIELDS[sender]:
+        if field in instance.__dict__:
+            release(_name(instance, field))
+
+
+for model in MEDIA_FIELDS:
+    post_init.connect(remember_media, sender=model, dispatch_uid=f'media-init-{model.__name__}')
+    pre_save.connect(note_new_files, sender=model, dispatch_uid=f'media-pre-save-{model.__name__}')
+    post_save.connect(update_references, sender=model, dispatch_uid=f'media-post-save-{model.__name__}')
+    post_delete.connect(drop_references, sender=model, dispatch_uid=f'media-delete-{model.__name__}')
+
+
+def queue_recommendations(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or SCORED_FIELDS & set(update_fields):
+        enqueue([instance.pk], changed=True)
+
+
+def queue_listing_items(sender, instance, **kwargs):
+    # Lists recommending this item lose it when it is deleted.
+    enqueue(ItemRecommendation.objects.filter(recommended=instance).values_list('item_id', flat=True))
+
+
+post_save.connect(queue_recommendations, sender=Item, dispatch_uid='recommendations-item-saved')
+pre_delete.connect(queue_listing_items, sender=Item, dispatch_uid='recommendations-item-deleted')
+
+
+def invalidate_item_owner(sender, instance, **kwargs):
+    dashboard.invalidate(instance.owner_id)
+
+
+def invalidate_booking_owner(sender, instance, **kwargs):
+    if Booking.item.is_cached(instance):
+        owner_id = instance.item.owner_id
+    else:
+        owner_id = Item.objects.filter(pk=instance.item_id).values_list('owner_id', flat=True).first()
+    dashboard.invalidate(owner_id)
+
+
+for model, receiver in ((Item, invalidate_item_owner), (Booking, invalidate_booking_owner)):
+    post_save.connect(receiver, sender=model, dispatch_uid=f'dashboard-saved-{model.__name__}')
+    post_delete.connect(receiver, sender=model, dispatch_uid=f'dashboard-deleted-{model.__name__}')
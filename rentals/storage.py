@@ -0,0 +1,257 @@
+"""
+Content-addressed media storage.
+
+Photos are stored once per distinct content, under blobs/ab/cd/<sha256><ext>,
+whatever field or upload_to they were saved for. Each blob has a MediaBlob
+row counting the model fields that point at it: saving a new file through
+the storage adds a reference, and rentals/signals.py adds and drops
+references as items, bookings and damage reports change or are deleted.
+The file is removed once the transaction dropping the last reference
+commits. Writers and deleters of a blob name take an advisory lock on it,
+so a file is never deleted under a concurrent save of the same content.
+Files left by saves that rolled back are swept by sweep_unreferenced_files().
+
+A dHash (difference hash) of every image blob is kept so listings with
+near-identical photos can be found; see near_duplicates().
+"""
+import hashlib
+import os
+from collections import Counter
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image
+
+BLOCK_SIZE = 64 * 1024
+
+
+def media_storage():
+    return storages["media"]
+
+
+def _lock_name(name):
+    # Held until the end of the transaction.
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [name])
+
+
+def file_digest(content):
+    """
+    SHA-256 of a File, read in blocks. Content that already carries a
+    verified `sha256` attribute (chunked uploads) is not read again.
+    """
+    digest = getattr(content, "sha256", None)
+    if digest:
+        return digest
+    digest = hashlib.sha256()
+    content.seek(0)
+    for block in content.chunks(BLOCK_SIZE):
+        digest.update(block)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def dhash(content, size=8):
+    """
+    64-bit difference hash: shrink to 9x8 greyscale and record whether each
+    pixel is brighter than its right neighbour. Returned as a signed value
+    to fit a bigint column, or None if the content is not an image.
+    """
+    try:
+        content.seek(0)
+        image = Image.open(content).convert("L").resize((size + 1, size), Image.Resampling.LANCZOS)
+    except Exception:
+        return None
+    finally:
+        content.seek(0)
+    pixels = list(image.getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            value = (value << 1) | (left > pixels[row * (size + 1) + col + 1])
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class ContentAddressedMixin:
+    """
+    Storage mixin that names files by their content hash. Mix into any
+    Django storage backend; ContentAddressedStorage uses the file system.
+    """
+
+    def blob_name(self, digest, name):
+        ext = os.path.splitext(name)[1].lower()
+        return f"blobs/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    def save(self, name, content, max_length=None):
+        from rentals.models import MediaBlob
+
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        digest = file_digest(content)
+        with transaction.atomic():
+            # The row lock serialises writers of the same content with each
+            # other and with release().
+            blob = MediaBlob.objects.select_for_update().filter(sha256=digest).first()
+            if blob is None:
+                blob, _ = MediaBlob.objects.get_or_create(sha256=digest, defaults={
+                    "name": self.blob_name(digest, name or content.name or ""),
+                    "size": content.size,
+                    "dhash": lambda: dhash(content),
+                })
+                blob = MediaBlob.objects.select_for_update().get(pk=blob.pk)
+            _lock_name(blob.name)
+            if not self.exists(blob.name):
+                self._save(blob.name, content)
+            # The reference for the field this file is being saved to.
+            MediaBlob.objects.filter(pk=blob.pk).update(refcount=F("refcount") + 1)
+        return blob.name
+
+    def get_available_name(self, name, max_length=None):
+        # Identical content maps to the same name; never rename.
+        return name
+
+
+class ContentAddressedStorage(ContentAddressedMixin, FileSystemStorage):
+    pass
+
+
+def acquire(name):
+    from rentals.models import MediaBlob
+
+    if name:
+        MediaBlob.objects.filter(name=name).update(refcount=F("refcount") + 1)
+
+
+def release(name):
+    """
+    Drop a reference to `name`, deleting the blob and its file when none
+    are left. Files not stored as blobs are left alone.
+    """
+    from rentals.models import MediaBlob
+
+    if not name:
+        return
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return
+        if blob.refcount > 1:
+            MediaBlob.objects.filter(pk=blob.pk).update(refcount=F("refcount") - 1)
+            return
+        blob.delete()
+    # Only once the deletion commits: a rollback brings the row back.
+    transaction.on_commit(lambda: delete_if_unreferenced(name))
+
+
+def delete_if_unreferenced(name):
+    """
+    Delete the file `name` unless a MediaBlob row refers to it. Returns
+    whether it was deleted.
+    """
+    from rentals.models import MediaBlob
+
+    with transaction.atomic():
+        _lock_name(name)
+        if MediaBlob.objects.filter(name=name).exists():
+            return False
+        media_storage().delete(name)
+    return True
+
+
+def recount_references():
+    """
+    Recompute every blob's reference count from the photo fields and delete
+    blobs nothing refers to, repairing counts left wrong by rolled back
+    saves or bulk deletes that bypass signals. Returns (fixed, deleted).
+    """
+    from rentals.models import MediaBlob
+    from rentals.signals import MEDIA_FIELDS
+
+    counts = Counter()
+    for model, fields in MEDIA_FIELDS.items():
+        for field in fields:
+            rows = (
+                model.objects.filter(**{f"{field}__startswith": "blobs/"})
+                .values_list(field).annotate(n=models.Count("pk")).order_by()
+            )
+            counts.update(dict(rows))
+    fixed = deleted = 0
+    for blob in MediaBlob.objects.iterator():
+        refcount = counts.get(blob.name, 0)
+        if refcount == 0:
+            with transaction.atomic():
+                if MediaBlob.objects.filter(pk=blob.pk, refcount=blob.refcount).delete()[0]:
+                    transaction.on_commit(lambda name=blob.name: delete_if_unreferenced(name))
+                    deleted += 1
+        elif refcount != blob.refcount:
+            MediaBlob.objects.filter(pk=blob.pk).update(refcount=refcount)
+            fixed += 1
+    return fixed, deleted
+
+
+def _walk(storage, path):
+    try:
+        directories, files = storage.listdir(path)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield f"{path}/{name}"
+    for directory in directories:
+        yield from _walk(storage, f"{path}/{directory}")
+
+
+def sweep_unreferenced_files(older_than, batch_size=1000):
+    """
+    Delete files under blobs/ that have no MediaBlob row, left behind when
+    the transaction that saved them rolled back. Files newer than
+    `older_than` (a timedelta) may belong to a save still in progress and
+    are kept. Returns the number deleted.
+    """
+    from rentals.models import MediaBlob
+
+    storage = media_storage()
+    cutoff = timezone.now() - older_than
+    deleted = 0
+    names = _walk(storage, "blobs")
+    while True:
+        batch = [name for _, name in zip(range(batch_size), names)]
+        if not batch:
+            return deleted
+        known = set(MediaBlob.objects.filter(name__in=batch).values_list("name", flat=True))
+        for name in batch:
+            if name not in known and storage.get_modified_time(name) < cutoff and delete_if_unreferenced(name):
+                deleted += 1
+
+
+class HammingDistance(models.Func):
+    """
+    Number of differing bits between two 64-bit hashes.
+    """
+    arg_joiner = " # "
+    template = "length(replace(((%(expressions)s)::bit(64))::text, '0', ''))"
+    output_field = models.IntegerField()
+
+
+def near_duplicates(item, max_distance):
+    """
+    Other items whose photo is within `max_distance` bits of `item`'s, by
+    dHash, closest first. This scans the blob table, which holds one row per
+    distinct photo rather than one per listing.
+    """
+    from rentals.models import Item, MediaBlob
+
+    blob = MediaBlob.objects.filter(name=item.image.name, dhash__isnull=False).first()
+    if blob is None:
+        return []
+    similar = (
+        MediaBlob.objects.filter(dhash__isnull=False)
+        .annotate(distance=HammingDistance(F("dhash"), models.Value(blob.dhash, output_field=models.BigIntegerField())))
+        .filter(distance__lte=max_distance)
+    )
+    distances = dict(similar.values_list("name", "distance"))
+    items = Item.objects.filter(image__in=list(distances)).exclude(pk=item.pk).select_related("owner")
+    return sorted(items, key=lambda other: distances[other.image.name])
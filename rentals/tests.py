@@ -1,3 +1,820 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import date, timedelta
+import types
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, transaction
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from payments.models import Payment
+from snicko.testing import QueryBudgetMixin, QueryPlanAssertionsMixin
+from snicko.throttling import LocalBucketStore, SearchThrottle, pressure
+from users.models import CustomUser, PickUpSpot
+from .models import Booking, Category, Item, ItemPopularity, MediaBlob, StaleRecommendation
+from .services.benchmarks import Result, Scenario, compare, failures, run_scenario, to_json
+from .services.marketplace import bench_users, generate_marketplace
+from .services.popularity import PopularityCounters, decayed
+from .services.recommendations import process_queue
+from .storage import media_storage, sweep_unreferenced_files
+
+
+class QueryPlanTestCase(QueryPlanAssertionsMixin, TestCase):
+    """
+    Guards the indexes behind the hot endpoints: each main query must be
+    answered from an index once the tables hold a realistic volume.
+    """
+    USERS = 200
+    ITEMS_PER_USER = 25
+    BOOKINGS = 20000
+    PICKUP_SPOTS_PER_USER = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(29)
+        users = CustomUser.objects.bulk_create(
+            CustomUser(email=f'user{i}@example.com', name=f'User {i}') for i in range(cls.USERS)
+        )
+        items = Item.objects.bulk_create(
+            Item(
+                owner=owner, name=f'Item {owner.id}-{n}', description='Seeded item',
+                price_per_day=100, image='item_images/seed.jpg',
+            )
+            for owner in users for n in range(cls.ITEMS_PER_USER)
+        )
+        statuses = ['COMPLETED'] * 14 + ['REJECTED'] * 4 + ['APPROVED', 'PENDING']
+        start = date(2030, 1, 1)
+        bookings = Booking.objects.bulk_create(
+            Booking(
+                renter=rng.choice(users), item=rng.choice(items), status=rng.choice(statuses),
+                start_date=start, end_date=start + timedelta(days=2), total_price=300,
+            )
+            for _ in range(cls.BOOKINGS)
+        )
+        Payment.objects.bulk_create(
+            Payment(
+                user=booking.renter, booking=booking, amount=300,
+                razorpay_order_id=f'order_seed_{booking.id}', status='SUCCESS',
+            )
+            for booking in bookings[::4]
+        )
+        PickUpSpot.objects.bulk_create(
+            PickUpSpot(
+                user=user, full_name=user.name, phone_number='9999999999', street_address='1 Main St',
+                city='Pune', state='MH', postal_code='411001', country='IN', is_default=(n == 0),
+            )
+            for user in users for n in range(cls.PICKUP_SPOTS_PER_USER)
+        )
+        with connection.cursor() as cursor:
+            for model in (CustomUser, Item, Booking, Payment, PickUpSpot):
+                cursor.execute(f'ANALYZE "{model._meta.db_table}"')
+
+        cls.user = users[0]
+        cls.item = items[0]
+        cls.booking = bookings[0]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_main_query(self, url, table, method='get', verb='SELECT', **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 400)
+        return self.captured_query(queries, table, verb=verb)
+
+    def test_user_items_use_owner_index(self):
+        sql = self.get_main_query('/api/rentals/my-items/', Item._meta.db_table)
+        self.assertUsesIndex(sql, Item._meta.db_table)
+
+    def test_renter_bookings_use_renter_index(self):
+        sql = self.get_main_query('/api/rentals/bookings/', Booking._meta.db_table)
+        self.assertUsesIndex(sql, Booking._meta.db_table)
+
+    def test_owner_booking_requests_use_pending_index(self):
+        sql = self.get_main_query('/api/rentals/booking/requests/', Booking._meta.db_table)
+        self.assertUsesIndex(sql, Booking._meta.db_table)
+        self.assertUsesIndex(sql, Item._meta.db_table)
+
+    def test_rejecting_other_pending_requests_uses_item_index(self):
+        queryset = Booking.objects.filter(item=self.item, status='PENDING').exclude(pk=self.booking.pk)
+        self.assertUsesIndex(queryset, Booking._meta.db_table)
+
+    def test_booking_payments_use_booking_index(self):
+        self.assertUsesIndex(Payment.objects.filter(booking=self.booking), Payment._meta.db_table)
+
+    def test_resetting_default_pickup_spot_uses_user_index(self):
+        sql = self.get_main_query(
+            '/api/users/address/', PickUpSpot._meta.db_table, method='post', verb='UPDATE',
+            data={
+                'full_name': 'Home', 'phone_number': '9999999999', 'street_address': '2 Main St',
+                'city': 'Pune', 'state': 'MH', 'postal_code': '411001', 'country': 'IN', 'is_default': True,
+            },
+            format='json',
+        )
+        self.assertUsesIndex(sql, PickUpSpot._meta.db_table)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ItemImportExportTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='shop@example.com', password='password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def image_archive(self, *names):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            for name in names:
+                image = io.BytesIO()
+                Image.new('RGB', (8, 8)).save(image, 'PNG')
+                archive.writestr(name, image.getvalue())
+        return SimpleUploadedFile('images.zip', buffer.getvalue(), content_type='application/zip')
+
+    def test_import_creates_valid_rows_and_reports_errors(self):
+        rows = (
+            "name,description,price_per_day,image,latitude,longitude\n"
+            "Drill,Cordless drill,120,drill.png,18.52,73.85\n"
+            "Ladder,Aluminium ladder,not-a-price,ladder.png,,\n"
+            "Tent,Two person tent,80,missing.png,,\n"
+        )
+        response = self.client.post('/api/rentals/items/import/', {
+            'file': SimpleUploadedFile('items.csv', rows.encode()),
+            'images': self.image_archive('drill.png', 'ladder.png'),
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        item = Item.objects.get(owner=self.user)
+        self.assertEqual(item.name, 'Drill')
+        self.assertAlmostEqual(item.location.y, 18.52)
+
+    def test_import_reports_unreadable_files_and_bad_types(self):
+        rows = [
+            {'name': 'Drill', 'description': 'Cordless drill', 'price_per_day': 120, 'image': 'drill.png', 'category': 7},
+            {'name': 'Tent', 'description': 'Tent', 'price_per_day': 80, 'image': 'drill.png', 'latitude': [1], 'longitude': 2},
+            {'name': 'Saw', 'description': 'Saw', 'price_per_day': 80, 'image': 'drill.png', 'category': {'a': 1}},
+        ]
+        content = ''.join(json.dumps(row) + '\n' for row in rows).encode() + b'\xff\xfe\n'
+        response = self.client.post('/api/rentals/items/import/', {
+            'file': SimpleUploadedFile('items.jsonl', content),
+            'images': self.image_archive('drill.png'),
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(
+            [(error['row'], list(error['errors'])) for error in response.data['errors']],
+            [(2, ['location']), (3, ['category']), (4, ['file'])],
+        )
+
+        response = self.client.post('/api/rentals/items/import/', {
+            'file': SimpleUploadedFile('items.csv', b'name,description\nDrill\rcordless,x\n'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data['errors'][-1]['errors']), ['file'])
+
+    def test_export_streams_one_line_per_item(self):
+        for n in range(3):
+            Item.objects.create(
+                owner=self.user, name=f'Item {n}', description='Seeded item',
+                price_per_day=100, image='item_images/seed.jpg',
+            )
+
+        response = self.client.get('/api/rentals/export/items/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['Item 0', 'Item 1', 'Item 2'])
+
+    def test_export_as_csv(self):
+        Item.objects.create(
+            owner=self.user, name='Drill, cordless', description='Seeded item',
+            price_per_day=100, image='item_images/seed.jpg',
+        )
+
+        response = self.client.get('/api/rentals/export/items/', {'type': 'csv'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['name'] for row in rows], ['Drill, cordless'])
+
+    async def test_export_streams_under_asgi(self):
+        await Item.objects.acreate(
+            owner=self.user, name='Drill', description='Seeded item',
+            price_per_day=100, image='item_images/seed.jpg',
+        )
+        token = AccessToken.for_user(self.user)
+
+        response = await AsyncClient().get(
+            '/api/rentals/export/items/', {'type': 'jsonl'}, HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['Drill'])
+
+
+class AsyncItemViewsTestCase(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(email='owner@example.com', password='password123', name='Owner')
+        self.items = [
+            Item.objects.create(
+                owner=self.owner, name=f'Item {n}', description='Seeded item',
+                price_per_day=100, image='item_images/seed.jpg',
+            )
+            for n in range(3)
+        ]
+
+    async def test_async_item_list_matches_sync_view(self):
+        async_response = await AsyncClient().get('/api/rentals/async/items/')
+        sync_response = await AsyncClient().get('/api/rentals/items/')
+
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(
+            sorted(item['name'] for item in async_response.json()),
+            sorted(item['name'] for item in sync_response.json()),
+        )
+        self.assertEqual({item['owner_name'] for item in async_response.json()}, {'Owner'})
+
+    async def test_replica_views_are_served_under_asgi(self):
+        # Sync and async views marked read_replica, through the ASGI handler.
+        for path in ('/api/rentals/items/', f'/api/rentals/items/{self.items[0].id}/', '/api/rentals/async/items/'):
+            response = await AsyncClient().get(path)
+            self.assertEqual(response.status_code, 200, path)
+
+    async def test_async_views_are_throttled_and_shed(self):
+        path, params = '/api/rentals/async/items/search/', {'latitude': 18.52, 'longitude': 73.85, 'radius': 5}
+        with mock.patch.object(SearchThrottle, 'THROTTLE_RATES', {'search': '1/min'}), \
+                mock.patch('snicko.throttling._store', LocalBucketStore()):
+            first = await AsyncClient().get(path, params)
+            second = await AsyncClient().get(path, params)
+        self.assertNotEqual(first.status_code, 429)
+        self.assertEqual(second.status_code, 429)
+        self.assertIn('Retry-After', second)
+
+        with mock.patch.object(pressure, 'overloaded', return_value=True):
+            self.assertEqual((await AsyncClient().get('/api/rentals/async/items/')).status_code, 503)
+
+    async def test_async_my_items_requires_a_token(self):
+        response = await AsyncClient().get('/api/rentals/async/my-items/')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_async_booking_writes_send_notifications(self):
+        await CustomUser.objects.filter(pk=self.owner.pk).aupdate(fcm_token='owner-device')
+        renter = await CustomUser.objects.acreate(email='renter@example.com', name='Renter', fcm_token='renter-device')
+        # The real module initialises firebase on import.
+        notifications = types.SimpleNamespace(asend_fcm_notification=mock.AsyncMock())
+        client = AsyncClient()
+
+        with mock.patch.dict(sys.modules, {'rentals.services.notifications': notifications}):
+            created = await client.post(
+                f'/api/rentals/async/bookings/create/{self.items[0].id}/',
+                {'start_date': '2030-01-01', 'end_date': '2030-01-03'},
+                content_type='application/json',
+                HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(renter)}',
+            )
+            self.assertEqual(created.status_code, 201)
+            booking_id = created.json()['booking_id']
+
+            approved = await client.post(
+                f'/api/rentals/async/bookings/{booking_id}/status/',
+                {'status': 'APPROVED'},
+                content_type='application/json',
+                HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.owner)}',
+            )
+            self.assertEqual(approved.status_code, 200)
+
+        self.assertEqual((await Booking.objects.aget(pk=booking_id)).status, 'APPROVED')
+        sent = notifications.asend_fcm_notification.await_args_list
+        self.assertEqual([call.args[0] for call in sent], ['owner-device', 'renter-device'])
+        self.assertEqual(sent[1].args[3], {'redirectTo': 'paymentpage', 'booking_id': str(booking_id)})
+
+
+class QueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """
+    List endpoints must run a fixed number of queries however many rows
+    they return.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='owner0@example.com', password='password123', name='Owner 0')
+        owners = [cls.user] + [
+            CustomUser.objects.create_user(email=f'owner{n}@example.com', password='password123', name=f'Owner {n}')
+            for n in range(1, 8)
+        ]
+        items = [
+            Item.objects.create(
+                owner=owner, name=f'Item {owner.id}', description='Seeded item',
+                price_per_day=100, image='item_images/seed.jpg',
+            )
+            for owner in owners
+        ]
+        start = date(2030, 1, 1)
+        for item in items:
+            Booking.objects.create(
+                renter=cls.user, item=item, status='PENDING',
+                start_date=start, end_date=start + timedelta(days=2), total_price=300,
+            )
+        renters = owners[1:]
+        for renter in renters:
+            Booking.objects.create(
+                renter=renter, item=items[0], status='PENDING',
+                start_date=start, end_date=start + timedelta(days=2), total_price=300,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_item_list_joins_owners(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get('/api/rentals/items/')
+        self.assertEqual(len(response.data), 8)
+
+    def test_booking_list_joins_items_and_owners(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get('/api/rentals/bookings/')
+        self.assertEqual(len(response.data), 8)
+
+    def test_booking_requests_join_items_and_owners(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get('/api/rentals/booking/requests/')
+        self.assertEqual(len(response.data), 8)
+
+
+class MarketplaceBenchmarkTestCase(TestCase):
+    def test_generator_is_deterministic_and_batched(self):
+        counts = generate_marketplace(users=5, items=20, bookings=50, batch_size=7, seed=3)
+        first = list(Item.objects.order_by('id').values_list('name', 'price_per_day'))
+
+        bench_users().delete()
+        generate_marketplace(users=5, items=20, bookings=50, batch_size=7, seed=3)
+
+        self.assertEqual(counts, {'users': 5, 'items': 20, 'bookings': 50})
+        self.assertEqual(list(Item.objects.order_by('id').values_list('name', 'price_per_day')), first)
+        self.assertEqual(Booking.objects.count(), 50)
+
+    def test_regressions_beyond_tolerance_are_reported(self):
+        baseline = to_json([Result('item search', 50, 0, 10.0, 20.0, 30.0, 2.0)])
+        results = [Result('item search', 50, 0, 11.0, 30.0, 31.0, 3.0)]
+
+        regressions = compare(results, baseline, tolerance=0.2)
+
+        self.assertEqual(regressions, [
+            "item search: p95_ms 20.0 -> 30.0",
+            "item search: queries/request 2.0 -> 3.0",
+        ])
+
+    def test_failed_requests_fail_the_run(self):
+        owner = CustomUser.objects.create_user(email='owner@example.com', password='password123', name='Owner')
+        ok = run_scenario(Scenario('booking inbox', 'get', '/api/rentals/booking/requests/', user_id=owner.id), 2, 0)
+        missing = run_scenario(Scenario('missing item', 'get', '/api/rentals/items/999999/'), 2, 0)
+
+        self.assertEqual(ok.errors, 0)
+        self.assertEqual(failures([ok, missing]), ["missing item: 2/2 requests failed"])
+
+
+class SparseFieldsetTestCase(TestCase):
+    def setUp(self):
+        self.renter = CustomUser.objects.create_user(email='renter@example.com', password='password123', name='Renter')
+        owner = CustomUser.objects.create_user(email='owner@example.com', password='password123', name='Owner')
+        item = Item.objects.create(
+            owner=owner, name='Drill', description='Cordless drill', price_per_day=100, image='item_images/seed.jpg',
+        )
+        start = date(2030, 1, 1)
+        Booking.objects.create(
+            renter=self.renter, item=item, start_date=start, end_date=start + timedelta(days=2), total_price=200,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.renter)
+
+    def test_fields_limit_output_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/rentals/bookings/', {'fields': 'id,status,item.name'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['item'], {'name': 'Drill'})
+        self.assertEqual(set(response.data[0]), {'id', 'status', 'item'})
+        sql = self.captured_sql(queries, Booking._meta.db_table)
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn(CustomUser._meta.db_table, sql)
+
+    def test_unexpanded_nested_objects_collapse_to_their_id(self):
+        response = self.client.get('/api/rentals/bookings/', {'fields': 'id,item'})
+        self.assertEqual(response.data[0]['item'], Booking.objects.get().item_id)
+
+        response = self.client.get('/api/rentals/bookings/', {'fields': 'id', 'expand': 'item'})
+        self.assertEqual(response.data[0]['item']['owner_name'], 'Owner')
+
+    def captured_sql(self, queries, table):
+        return next(query['sql'] for query in queries if f'FROM "{table}"' in query['sql'])
+
+
+@override_settings(SYNC_OVERLAP_SECONDS=0)
+class DeltaSyncTestCase(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(email='owner@example.com', password='password123', name='Owner')
+        self.renter = CustomUser.objects.create_user(email='renter@example.com', password='password123', name='Renter')
+        self.item = Item.objects.create(
+            owner=self.owner, name='Drill', description='Cordless drill', price_per_day=100,
+            image='item_images/seed.jpg',
+        )
+        start = date(2030, 1, 1)
+        self.booking = Booking.objects.create(
+            renter=self.renter, item=self.item, start_date=start, end_date=start + timedelta(days=2),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_incremental_sync_returns_changes_and_deletions(self):
+        full = self.client.get('/api/rentals/sync/')
+        self.assertEqual([item['id'] for item in full.data['items']], [self.item.id])
+        self.assertEqual([booking['id'] for booking in full.data['bookings']], [self.booking.id])
+
+        # Everything above happened before the watermark.
+        earlier = timezone.now() - timedelta(hours=1)
+        Item.objects.update(updated_at=earlier)
+        Booking.objects.update(updated_at=earlier)
+        second = Item.objects.create(
+            owner=self.owner, name='Ladder', description='Ladder', price_per_day=50, image='item_images/seed.jpg',
+        )
+        self.client.force_authenticate(self.renter)
+        self.client.delete(f'/api/rentals/bookings/{self.booking.id}/')
+        self.client.force_authenticate(self.owner)
+
+        delta = self.client.get('/api/rentals/sync/', {'since': full.data['watermark']})
+
+        self.assertEqual([item['id'] for item in delta.data['items']], [second.id])
+        self.assertEqual(delta.data['bookings'], [])
+        self.assertEqual(delta.data['deleted']['booking'], [self.booking.id])
+        self.assertGreaterEqual(delta.data['watermark'], full.data['watermark'])
+
+    def test_watermarks_older_than_tombstone_retention_force_a_reset(self):
+        since = (timezone.now() - timedelta(days=365)).isoformat()
+        response = self.client.get('/api/rentals/sync/', {'since': since})
+        self.assertTrue(response.data['reset'])
+        self.assertEqual(len(response.data['items']), 1)
+
+        response = self.client.get('/api/rentals/sync/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), UPLOAD_TEMP_DIR=tempfile.mkdtemp())
+class ChunkedUploadTestCase(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(email='owner@example.com', password='password123', name='Owner')
+        self.item = Item.objects.create(
+            owner=self.owner, name='Drill', description='Cordless drill', price_per_day=100,
+            image='item_images/seed.jpg',
+        )
+        image = io.BytesIO()
+        Image.new('RGB', (64, 64)).save(image, 'PNG')
+        self.content = image.getvalue()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def start(self):
+        response = self.client.post('/api/rentals/uploads/', {
+            'target': 'item.image', 'object_id': self.item.id, 'filename': 'drill.png',
+            'size': len(self.content), 'sha256': hashlib.sha256(self.content).hexdigest(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return f"/api/rentals/uploads/{response.data['id']}/"
+
+    def put(self, url, offset, chunk, checksum=None):
+        headers = {'HTTP_UPLOAD_OFFSET': str(offset)}
+        if checksum:
+            headers['HTTP_UPLOAD_CHECKSUM'] = f'sha256 {checksum}'
+        return self.client.put(url, chunk, content_type='application/octet-stream', **headers)
+
+    def test_chunks_resume_from_the_stored_offset_and_attach(self):
+        url = self.start()
+        half = len(self.content) // 2
+        first, second = self.content[:half], self.content[half:]
+
+        self.assertEqual(self.put(url, 0, first).data['offset'], half)
+        # A retried or skipped chunk is told where to continue.
+        self.assertEqual(self.put(url, 0, first).status_code, 409)
+        self.assertEqual(self.client.get(url).data['offset'], half)
+        self.assertEqual(self.put(url, half, second, checksum='0' * 64).status_code, 400)
+        self.assertEqual(self.put(url, half, second, hashlib.sha256(second).hexdigest()).status_code, 200)
+
+        response = self.client.post(url + 'complete/')
+
+        self.assertEqual(response.status_code, 200)
+        self.item.refresh_from_db()
+        self.assertTrue(self.item.image.name.startswith('blobs/'))
+        self.assertEqual(self.item.image.read(), self.content)
+
+    def test_incomplete_or_foreign_uploads_are_rejected(self):
+        url = self.start()
+        self.put(url, 0, self.content[:10])
+        self.assertEqual(self.client.post(url + 'complete/').status_code, 400)
+
+        stranger = CustomUser.objects.create_user(email='stranger@example.com', password='password123')
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ContentAddressedStorageTestCase(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(email='owner@example.com', password='password123', name='Owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def png(self, image):
+        buffer = io.BytesIO()
+        image.convert('RGB').save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def create_item(self, content, name='photo.png'):
+        return Item.objects.create(
+            owner=self.owner, name='Drill', description='Cordless drill', price_per_day=100,
+            image=SimpleUploadedFile(name, content),
+        )
+
+    def test_identical_photos_share_one_blob_until_the_last_is_deleted(self):
+        content = self.png(Image.new('RGB', (32, 32), 'red'))
+        first, second = self.create_item(content, 'a.png'), self.create_item(content, 'b.png')
+        self.assertEqual(first.image.name, second.image.name)
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+
+        self.client.delete(f'/api/rentals/items/{first.id}/')
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 1)
+        self.assertTrue(second.image.storage.exists(blob.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/rentals/items/{second.id}/')
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(second.image.storage.exists(blob.name))
+
+    def test_files_are_only_deleted_once_the_deletion_commits(self):
+        item = self.create_item(self.png(Image.new('RGB', (32, 32), 'green')))
+        name = item.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    item.delete()
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+        self.assertTrue(item.image.storage.exists(name))
+
+    def test_files_without_a_blob_row_are_swept(self):
+        storage = media_storage()
+        orphan = storage.blob_name('0' * 64, 'orphan.png')
+        storage._save(orphan, ContentFile(b'rolled back'))
+        kept = self.create_item(self.png(Image.new('RGB', (32, 32), 'white'))).image.name
+
+        self.assertEqual(sweep_unreferenced_files(timedelta(0)), 1)
+        self.assertFalse(storage.exists(orphan))
+        self.assertTrue(storage.exists(kept))
+
+    def test_known_uploads_complete_without_sending_bytes(self):
+        content = self.png(Image.new('RGB', (32, 32), 'blue'))
+        existing, item = self.create_item(content), self.create_item(self.png(Image.new('RGB', (8, 8))))
+
+        response = self.client.post('/api/rentals/uploads/', {
+            'target': 'item.image', 'object_id': item.id, 'filename': 'copy.png',
+            'size': len(content), 'sha256': hashlib.sha256(content).hexdigest(),
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['complete'])
+        item.refresh_from_db()
+        self.assertEqual(item.image.name, existing.image.name)
+        self.assertEqual(MediaBlob.objects.get(name=item.image.name).refcount, 2)
+
+    def test_near_duplicate_listings_are_flagged(self):
+        photo = Image.effect_mandelbrot((64, 64), (-2, -1.5, 1, 1.5), 100)
+        original = self.create_item(self.png(photo))
+        brighter = self.create_item(self.png(Image.eval(photo, lambda p: min(255, p + 8))))
+        different = self.create_item(self.png(photo.rotate(90)))
+        self.owner.is_staff = True
+        self.owner.save()
+
+        response = self.client.get(f'/api/rentals/items/{original.id}/near-duplicates/')
+
+        ids = [item['id'] for item in response.data]
+        self.assertIn(brighter.id, ids)
+        self.assertNotIn(different.id, ids)
+
+
+class SimilarItemsTestCase(TestCase):
+    def setUp(self):
+        owner = CustomUser.objects.create_user(email='owner@example.com', password='password123', name='Owner')
+        tools, camping = Category.objects.create(name='Tools'), Category.objects.create(name='Camping')
+
+        def item(name, description, category, price, longitude, latitude):
+            return Item.objects.create(
+                owner=owner, name=name, description=description, category=category, price_per_day=price,
+                image='item_images/seed.jpg', location=Point(longitude, latitude, srid=4326),
+            )
+
+        self.drill = item('Cordless drill', 'Bosch cordless drill with two batteries', tools, 100, 73.8567, 18.5204)
+        self.hammer = item('Hammer drill', 'Corded hammer drill for concrete', tools, 120, 73.8600, 18.5250)
+        self.tent = item('Tent', 'Two person camping tent', camping, 80, 73.8500, 18.5150)
+        self.far = item('Cordless drill', 'Bosch cordless drill', tools, 100, 72.8777, 19.0760)
+
+    def similar(self, item):
+        return [entry['id'] for entry in self.client.get(f'/api/rentals/items/{item.id}/similar/').data]
+
+    def test_recommendations_are_precomputed_and_refreshed_incrementally(self):
+        self.assertEqual(process_queue(), 4)
+
+        similar = self.similar(self.drill)
+        self.assertEqual(similar[0], self.hammer.id)
+        self.assertNotIn(self.far.id, similar)
+
+        self.tent.name, self.tent.description = 'Cordless drill', 'Bosch cordless drill with two batteries'
+        self.tent.category = self.drill.category
+        self.tent.save()
+        # Only the tent is refreshed; it is merged into the drill's list.
+        self.assertEqual(process_queue(), 1)
+
+        self.assertEqual(self.similar(self.drill)[0], self.tent.id)
+        self.assertFalse(StaleRecommendation.objects.exists())
+
+    def test_new_items_are_merged_into_empty_lists(self):
+        Item.objects.exclude(pk=self.drill.pk).delete()
+        process_queue()
+        self.assertEqual(self.similar(self.drill), [])
+
+        hammer = Item.objects.create(
+            owner=self.drill.owner, name='Hammer drill', description='Corded hammer drill',
+            category=self.drill.category, price_per_day=120, image='item_images/seed.jpg',
+            location=Point(73.8600, 18.5250, srid=4326),
+        )
+        self.assertEqual(process_queue(), 1)
+
+        self.assertEqual(self.similar(self.drill), [hammer.id])
+
+
+class PopularityTestCase(TestCase):
+    def setUp(self):
+        owner = CustomUser.objects.create_user(email='owner@example.com', password='password123', name='Owner')
+        self.viewed, self.completed, self.stale = [
+            Item.objects.create(
+                owner=owner, name=name, description=name, price_per_day=100, image='item_images/seed.jpg',
+            )
+            for name in ('Viewed', 'Completed', 'Stale')
+        ]
+        self.counters = PopularityCounters()
+
+    def test_counters_decay_and_merge_into_the_score(self):
+        now = time.time()
+        for _ in range(3):
+            self.counters.record(self.viewed.id, 'views', now=now)
+        self.counters.record(self.completed.id, 'completions', now=now)
+        # Ten views a month ago are worth less than one view today.
+        for _ in range(10):
+            self.counters.record(self.stale.id, 'views', now=now - 30 * 86400)
+        self.counters.flush()
+        self.counters.record(self.viewed.id, 'views', now=now)
+        self.counters.flush()
+
+        self.assertAlmostEqual(decayed(self.viewed.popularity.views, now), 4, places=3)
+        response = self.client.get('/api/rentals/items/', {'sort': 'popular'})
+        self.assertEqual(
+            [item['id'] for item in response.data], [self.completed.id, self.viewed.id, self.stale.id],
+        )
+
+    @override_settings(POPULARITY_FLUSH_SECONDS=0.01)
+    def test_counters_flush_in_the_background_and_at_exit(self):
+        with mock.patch.object(self.counters, 'flush') as flush:
+            self.counters.start()
+            deadline = time.monotonic() + 5
+            while not flush.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.counters.stopped.set()
+            self.counters.thread.join()
+        self.assertTrue(flush.called)
+
+        self.counters.record(self.viewed.id, 'views')
+        self.counters.stop()
+        self.assertAlmostEqual(decayed(ItemPopularity.objects.get(item=self.viewed).views), 1, places=3)
+
+    def test_unknown_sort_is_rejected(self):
+        self.assertEqual(self.client.get('/api/rentals/items/', {'sort': 'price'}).status_code, 400)
+
+
+class OwnerDashboardTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(email='owner@example.com', password='password123', name='Owner')
+        self.renter = CustomUser.objects.create_user(email='renter@example.com', password='password123', name='Renter')
+        self.drill, self.tent = [
+            Item.objects.create(
+                owner=self.owner, name=name, description=name, price_per_day=100, image='item_images/seed.jpg',
+            )
+            for name in ('Drill', 'Tent')
+        ]
+        today = timezone.now().date()
+        self.book(self.drill, 'COMPLETED', today - timedelta(days=9), today - timedelta(days=5))
+        self.book(self.drill, 'APPROVED', today + timedelta(days=2), today + timedelta(days=3))
+        self.book(self.tent, 'PENDING', today + timedelta(days=1), today + timedelta(days=2))
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def book(self, item, status, start, end):
+        return Booking.objects.create(
+            renter=self.renter, item=item, status=status, start_date=start, end_date=end, total_price=100,
+        )
+
+    def test_dashboard_is_aggregated_and_cached(self):
+        with self.assertQueryBudget(2):
+            response = self.client.get('/api/rentals/dashboard/')
+        drill = response.data['items'][0]
+        self.assertEqual(drill['bookings']['COMPLETED'], 1)
+        self.assertEqual(drill['booked_days'], 5)
+        self.assertEqual(response.data['pending_requests'], 1)
+        self.assertEqual(len(response.data['upcoming_pickups']), 1)
+
+        with self.assertQueryBudget(0):
+            self.assertEqual(self.client.get('/api/rentals/dashboard/').data, response.data)
+
+    def test_booking_writes_invalidate_the_owner_dashboard(self):
+        self.client.get('/api/rentals/dashboard/')
+        today = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(self.drill, 'PENDING', today + timedelta(days=4), today + timedelta(days=5))
+        self.assertEqual(self.client.get('/api/rentals/dashboard/').data['pending_requests'], 2)
+
+
+class SearchFacetsTestCase(TestCase):
+    def setUp(self):
+        owner = CustomUser.objects.create_user(email='owner@example.com', password='password123', name='Owner')
+        self.tools, self.camping = Category.objects.create(name='Tools'), Category.objects.create(name='Camping')
+
+        def item(category, price, longitude):
+            return Item.objects.create(
+                owner=owner, name='Item', description='Seeded item', category=category, price_per_day=price,
+                image='item_images/seed.jpg', location=Point(longitude, 18.5204, srid=4326),
+            )
+
+        # About 0, 3 and 6 km east of the search point.
+        self.drill = item(self.tools, 100, 73.8567)
+        self.saw = item(self.tools, 600, 73.8850)
+        self.tent = item(self.camping, 300, 73.9135)
+
+    def search(self, **params):
+        return self.client.get('/api/rentals/items/search/', {
+            'latitude': 18.5204, 'longitude': 73.8567, 'radius': 10, 'facets': 'true', **params,
+        })
+
+    def test_facets_ignore_their_own_filter(self):
+        response = self.search(category=self.tools.id, max_price=500)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.drill.id])
+
+        facets = response.data['facets']
+        self.assertEqual(facets['total'], 1)
+        self.assertEqual(
+            [(entry['name'], entry['count']) for entry in facets['categories']], [('Camping', 1), ('Tools', 1)],
+        )
+        self.assertEqual([band['count'] for band in facets['price_bands']], [1, 0, 1, 0, 0])
+        self.assertEqual([(ring['km'], ring['count']) for ring in facets['distance_rings']][:3], [(1, 1), (2, 1), (5, 1)])
+
+    def test_facets_without_filters(self):
+        response = self.search()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        facets = response.data['facets']
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual([band['count'] for band in facets['price_bands']], [1, 1, 1, 0, 0])
+        self.assertEqual(facets['distance_rings'][-1]['count'], 3)
+
+    def test_empty_faceted_search_is_not_a_404(self):
+        response = self.search(min_price=1000)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['facets']['price_bands'][2]['count'], 1)
+
+    def test_invalid_price_is_rejected(self):
+        self.assertEqual(self.search(min_price='cheap').status_code, 400)
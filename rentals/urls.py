@@ -1,12 +1,30 @@
 from django.urls import path
-from .views import ItemView, BookingView, get_item_booking_requests, ManageBookingStatusView, UserItemView
+from . import async_views
+from .views import ItemView, BookingView, get_item_booking_requests, ManageBookingStatusView, UserItemView, ItemImportView, ExportView, SearchItemView, SyncView, UploadSessionView, UploadChunkView, UploadCompleteView, NearDuplicateItemsView, SimilarItemsView, OwnerDashboardView
 
 urlpatterns = [
     path('items/<int:pk>/', ItemView.as_view(), name='item-detail'),
     path('items/', ItemView.as_view(), name='item-list'),
+    path('items/search/', SearchItemView.as_view(), name='item-search'),
+    path('items/<int:pk>/similar/', SimilarItemsView.as_view(), name='item-similar'),
+    path('items/<int:pk>/near-duplicates/', NearDuplicateItemsView.as_view(), name='item-near-duplicates'),
     path('bookings/<int:pk>/', BookingView.as_view(), name='booking-detail'),
     path('bookings/', BookingView.as_view(), name='booking-list'),
     path('booking/requests/', get_item_booking_requests, name='booking-requests'),
     path('booking/update-status/<int:pk>/', ManageBookingStatusView.as_view(), name='update-booking-status'),
     path('my-items/', UserItemView.as_view(), name='my-items'),
+    path('items/import/', ItemImportView.as_view(), name='item-import'),
+    path('export/<str:resource>/', ExportView.as_view(), name='export'),
+    path('dashboard/', OwnerDashboardView.as_view(), name='owner-dashboard'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('uploads/', UploadSessionView.as_view(), name='upload-create'),
+    path('uploads/<uuid:pk>/', UploadChunkView.as_view(), name='upload-chunk'),
+    path('uploads/<uuid:pk>/complete/', UploadCompleteView.as_view(), name='upload-complete'),
+    path('async/items/<int:pk>/', async_views.item_list, name='async-item-detail'),
+    path('async/items/', async_views.item_list, name='async-item-list'),
+    path('async/items/search/', async_views.search_items, name='async-item-search'),
+    path('async/my-items/', async_views.user_items, name='async-my-items'),
+    path('async/bookings/', async_views.booking_list, name='async-booking-list'),
+    path('async/bookings/create/<int:pk>/', async_views.book_item, name='async-booking-create'),
+    path('async/bookings/<int:pk>/status/', async_views.manage_booking_status, name='async-booking-status'),
 ]
\ No newline at end of file
@@ -1,13 +1,29 @@
-from .models import Item, Booking
+from .models import Item, Booking, ItemRecommendation, UploadSession
 from .serializers import ItemSerializer, ItemGetSerializer, BookingSerializer
+from .services.bookings import (
+    STATUS_ACTIONS, booking_request_message, booking_status_message, create_booking, update_status,
+)
+from .services.inventory import EXPORTS, ItemImporter, astream_export, detect_format, parse_rows, stream_export
+from .services import dashboard, popularity, search, sync, uploads
+from .storage import near_duplicates
+from payments.serializers import PaymentSerializer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from snicko.fieldsets import Fieldset
+from snicko.throttling import CatalogThrottle, SearchThrottle
 from django.contrib.gis.measure import D
 from django.contrib.gis.geos import Point
 from django.db import models
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import zipfile
 from rest_framework.decorators import api_view, permission_classes
 from channels.layers import get_channel_layer
 # from asgiref.sync import async_to_sync
@@ -20,13 +36,17 @@ class UserItemView(APIView):
     """
 
     permission_classes = [IsAuthenticated]
+    read_replica = True
+    query_budget = 2
 
     def get(self, request):
         """
         Retrieve all items owned by the authenticated user.
         """
-        items = Item.objects.filter(owner=request.user)
-        serializer = ItemGetSerializer(items, many=True)
+        fieldset = Fieldset.from_request(request)
+        items = Item.objects.filter(owner=request.user).select_related("owner")
+        items = fieldset.narrow(items, ItemGetSerializer)
+        serializer = ItemGetSerializer(items, many=True, fieldset=fieldset)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -34,6 +54,9 @@ class ItemView(APIView):
     """
     View for managing items (create, retrieve, update, delete).
     """
+    read_replica = True
+    shed_under_load = True
+    throttle_classes = [CatalogThrottle]
 
     def get(self, request, pk=None):
         """
@@ -42,18 +65,25 @@ class ItemView(APIView):
         latitude = request.query_params.get("latitude")
         longitude = request.query_params.get("longitude")
         radius = request.query_params.get("radius")
+        sort = request.query_params.get("sort")
+        fieldset = Fieldset.from_request(request)
+        if sort not in (None, "popular"):
+            return Response(
+                {"error": "sort must be 'popular'."}, status=status.HTTP_400_BAD_REQUEST
+            )
 
         if pk:
             try:
-                item = Item.objects.get(pk=pk)
-                serializer = ItemGetSerializer(item)
+                item = fieldset.narrow(Item.objects.select_related("owner"), ItemGetSerializer).get(pk=pk)
+                popularity.record(item.id, "views")
+                serializer = ItemGetSerializer(item, fieldset=fieldset)
                 return Response(serializer.data)
             except Item.DoesNotExist:
                 return Response(
                     {"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND
                 )
         else:
-            items = Item.objects.all()
+            items = Item.objects.select_related("owner")
 
             # Filter by location if latitude, longitude, and radius are provided
             if latitude and longitude and radius:
@@ -79,6 +109,9 @@ class ItemView(APIView):
 
                     # Filter items within the radius
                     # items = items.filter(location__distance_lte=(user_location, D(km=radius)))
+                    # "Popular near you" does need the radius.
+                    if sort == "popular":
+                        items = items.filter(location__distance_lte=(user_location, D(km=radius)))
 
                 except ValueError:
                     return Response(
@@ -88,12 +121,12 @@ class ItemView(APIView):
                         status=status.HTTP_400_BAD_REQUEST,
                     )
 
-            serializer = ItemGetSerializer(items, many=True)
-            data = serializer.data
-            # Add the owner name
-            for item_data in data:
-                item = Item.objects.get(pk=item_data["id"])
-                item_data["owner_name"] = item.owner.name if item.owner else None
+            if sort == "popular":
+                items = popularity.order_by_popularity(items)
+
+            # owner_name comes from the joined owner row.
+            items = fieldset.narrow(items, ItemGetSerializer)
+            serializer = ItemGetSerializer(items, many=True, fieldset=fieldset)
             return Response(serializer.data)
 
     def post(self, request):
@@ -125,7 +158,7 @@ class ItemView(APIView):
                     {"error": "You do not have permission to delete this item"},
                     status=status.HTTP_403_FORBIDDEN,
                 )
-            item.delete()
+            sync.delete_with_tombstones(item)
             return Response(
                 {"message": "Item deleted successfully"},
                 status=status.HTTP_204_NO_CONTENT,
@@ -141,11 +174,54 @@ class ItemView(APIView):
     #     return super().get_permissions()
 
 
+class SimilarItemsView(APIView):
+    """
+    Precomputed similar items near an item, best first.
+    """
+
+    read_replica = True
+    shed_under_load = True
+    throttle_classes = [CatalogThrottle]
+    query_budget = 1
+
+    def get(self, request, pk=None):
+        recommendations = (
+            ItemRecommendation.objects.filter(item_id=pk, recommended__is_available=True)
+            .select_related("recommended__owner")
+            .order_by("rank")
+        )
+        items = [recommendation.recommended for recommendation in recommendations]
+        serializer = ItemGetSerializer(items, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class NearDuplicateItemsView(APIView):
+    """
+    Listings whose photo looks like this item's, for moderation.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, pk=None):
+        item = Item.objects.filter(pk=pk).first()
+        if item is None:
+            return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
+        items = near_duplicates(item, settings.MEDIA_NEAR_DUPLICATE_DISTANCE)
+        serializer = ItemGetSerializer(items, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 class SearchItemView(APIView):
     """
     View for searching items within a given radius of a location (latitude, longitude)
-    and optionally filtering by a search query.
+    and optionally filtering by a search query, categories and a price range.
+    With ?facets=true the results come with category, price band and
+    distance ring counts (see rentals/services/search.py).
     """
+    read_replica = True
+    shed_under_load = True
+    throttle_classes = [SearchThrottle]
+    query_budget = 3
 
     def get(self, request):
         """
@@ -155,6 +231,12 @@ class SearchItemView(APIView):
         longitude = request.query_params.get("longitude")
         radius = request.query_params.get("radius")
         search_query = request.query_params.get("query", "").strip()
+        sort = request.query_params.get("sort")
+        with_facets = request.query_params.get("facets", "").lower() in ("1", "true")
+        if sort not in (None, "popular"):
+            return Response(
+                {"error": "sort must be 'popular'."}, status=status.HTTP_400_BAD_REQUEST
+            )
 
         # Validate required parameters
         if not latitude or not longitude or not radius:
@@ -186,6 +268,39 @@ class SearchItemView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        try:
+            category_ids = [
+                int(category_id)
+                for category_id in request.query_params.get("category", "").split(",")
+                if category_id.strip()
+            ]
+        except ValueError:
+            return Response(
+                {"error": "category must be a comma-separated list of ids."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            min_price, max_price = [
+                Decimal(request.query_params[name]) if request.query_params.get(name) else None
+                for name in ("min_price", "max_price")
+            ]
+        except InvalidOperation:
+            return Response(
+                {"error": "min_price and max_price must be valid numbers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if any(price is not None and not price.is_finite() for price in (min_price, max_price)):
+            return Response(
+                {"error": "min_price and max_price must be valid numbers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if min_price is not None and max_price is not None and min_price > max_price:
+            return Response(
+                {"error": "min_price must not be greater than max_price."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         # Create a Point object for the location
         user_location = Point(longitude, latitude)
 
@@ -201,14 +316,26 @@ class SearchItemView(APIView):
                 | models.Q(description__icontains=search_query)
             )
 
-        if not items.exists():
+        # Facets are counted before the category and price filters, which
+        # each facet applies to the others only.
+        facets = None
+        if with_facets:
+            facets = search.facets(items, user_location, radius, category_ids, min_price, max_price)
+        items = items.filter(search.category_filter(category_ids), search.price_filter(min_price, max_price))
+
+        if facets is None and not items.exists():
             return Response(
                 {"message": "No items found matching the criteria."},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        if sort == "popular":
+            items = popularity.order_by_popularity(items)
 
         # Serialize and return the results
         serializer = ItemSerializer(items, many=True)
+        if facets is not None:
+            # An empty result is not a 404 here: the facets show how to widen it.
+            return Response({"results": serializer.data, "facets": facets}, status=status.HTTP_200_OK)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -218,6 +345,7 @@ class BookingView(APIView):
     """
 
     permission_classes = [IsAuthenticated]
+    read_replica = True
 
     def send_booking_notification(self, user, booking):
         """
@@ -225,29 +353,11 @@ class BookingView(APIView):
         """
         from rentals.services.notifications import send_fcm_notification
 
-        # Determine the notification title and body based on booking status
-        if booking.status == "PENDING":
-            title = "Booking Request Received"
-            body = f"Your booking request for {booking.item.name} from {booking.start_date} to {booking.end_date} is pending approval."
-        elif booking.status == "APPROVED":
-            title = "Booking Approved"
-            body = f"Your booking for {booking.item.name} from {booking.start_date} to {booking.end_date} has been approved."
-        elif booking.status == "REJECTED":
-            title = "Booking Rejected"
-            body = f"Your booking request for {booking.item.name} from {booking.start_date} to {booking.end_date} has been rejected."
-        elif booking.status == "ACTIVE":
-            title = "Booking Active"
-            body = f"Your booking for {booking.item.name} is now active from {booking.start_date} to {booking.end_date}."
-        elif booking.status == "COMPLETED":
-            title = "Booking Completed"
-            body = f"Your booking for {booking.item.name} from {booking.start_date} to {booking.end_date} has been completed."
-        else:
-            title = "Booking Update"
-            body = f"Your booking for {booking.item.name} has been updated."
+        title, body, data = booking_request_message(booking)
 
         # Send the notification via FCM
         if user.fcm_token:
-            send_fcm_notification(user.fcm_token, title, body, data={"redirectTo": "requestpage"})
+            send_fcm_notification(user.fcm_token, title, body, data=data)
         else:
             print(f"[DEBUG] User {user.id} does not have an FCM token.")
 
@@ -264,13 +374,7 @@ class BookingView(APIView):
                 ).date()
                 end_date = datetime.fromisoformat(request.data.get("end_date")).date()
 
-                booking = Booking.objects.create(
-                    item=item,
-                    renter=request.user,
-                    start_date=start_date,
-                    end_date=end_date,
-                    status="PENDING",
-                )
+                booking = create_booking(item, request.user.id, start_date, end_date)
                 print(item.owner.name, item.owner.email)
                 # Send notification to the item owner
                 self.send_booking_notification(item.owner, booking)
@@ -299,11 +403,11 @@ class BookingView(APIView):
         """
         if pk:
             try:
-                booking = Booking.objects.get(pk=pk)
+                booking = Booking.objects.select_related("item__owner").get(pk=pk)
                 # Ensure the user is either the renter or the owner of the item
                 if (
-                    booking.renter != request.user
-                    and booking.item.owner != request.user
+                    booking.renter_id != request.user.id
+                    and booking.item.owner_id != request.user.id
                 ):
                     return Response(
                         {"error": "You do not have permission to view this booking"},
@@ -317,8 +421,10 @@ class BookingView(APIView):
                 )
         else:
             # Filter bookings where the user is either the renter or the owner
-            bookings = Booking.objects.filter(models.Q(renter=request.user))
-            serializer = BookingSerializer(bookings, many=True)
+            fieldset = Fieldset.from_request(request)
+            bookings = Booking.objects.filter(models.Q(renter=request.user)).select_related("item__owner")
+            bookings = fieldset.narrow(bookings, BookingSerializer)
+            serializer = BookingSerializer(bookings, many=True, fieldset=fieldset)
             return Response(serializer.data)
 
     def put(self, request, pk=None):
@@ -353,7 +459,7 @@ class BookingView(APIView):
                     {"error": "You do not have permission to cancel this booking"},
                     status=status.HTTP_403_FORBIDDEN,
                 )
-            booking.delete()
+            sync.delete_with_tombstones(booking)
             return Response(
                 {"message": "Booking cancelled successfully"},
                 status=status.HTTP_204_NO_CONTENT,
@@ -377,18 +483,7 @@ class ManageBookingStatusView(APIView):
         """
         from rentals.services.notifications import send_fcm_notification
 
-        if status == "APPROVED":
-            title = "Booking Status Updated"
-            body = f"The status of your booking for {booking.item.name} has been updated to {booking.status}."
-            data = {"redirectTo": "paymentpage", "booking_id": str(booking.id)}  # Ensure values are strings
-        elif status == "REJECTED":
-            title = "Booking Request Rejected"
-            body = f"Your booking request for {booking.item.name} from {booking.start_date} to {booking.end_date} has been rejected."
-            data = {}
-        elif status == "ACTIVE":
-            title = "Booking Active"
-            body = f"Your booking for {booking.item.name} is now active from {booking.start_date} to {booking.end_date}."
-            data = {}
+        title, body, data = booking_status_message(booking, status)
 
         # Send the notification via FCM
         if user.fcm_token:
@@ -406,7 +501,7 @@ class ManageBookingStatusView(APIView):
             )
 
         action = request.data.get("status")
-        if action not in ["APPROVED", "REJECTED", "ACTIVE", "COMPLETED"]:
+        if action not in STATUS_ACTIONS:
             return Response(
                 {"error": "Invalid action. Use 'APPROVED' or 'REJECTED'."},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -420,24 +515,7 @@ class ManageBookingStatusView(APIView):
             #         status=status.HTTP_403_FORBIDDEN,
             #     )
 
-            if action == "APPROVED":
-                booking.status = "APPROVED"
-                booking.item.is_available = False
-                booking.save()
-
-                # Reject other pending bookings for the same item
-                Booking.objects.filter(item=booking.item, status="PENDING").exclude(
-                    pk=pk
-                ).update(status="REJECTED")
-
-            elif action == "REJECTED":
-                booking.status = "REJECTED"
-                booking.rejection_reason = request.data.get("rejection_reason", "")
-                booking.save()
-            
-            elif action == "ACTIVE":
-                booking.status = "ACTIVE"
-                booking.save()
+            update_status(booking, action, request.data.get("rejection_reason", ""))
 
             # Send FCM notification to the renter
             self.send_notification(booking.renter, booking, action)
@@ -459,6 +537,242 @@ def get_item_booking_requests(request):
     View for retrieving booking requests for the authenticated user.
     """
     if request.method == "GET":
-        bookings = Booking.objects.filter(item__owner=request.user, status="PENDING")
-        serializer = BookingSerializer(bookings, many=True)
+        fieldset = Fieldset.from_request(request)
+        bookings = Booking.objects.filter(item__owner=request.user, status="PENDING").select_related("item__owner")
+        bookings = fieldset.narrow(bookings, BookingSerializer)
+        serializer = BookingSerializer(bookings, many=True, fieldset=fieldset)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class OwnerDashboardView(APIView):
+    """
+    Booking counts, pending requests, upcoming pickups and utilisation for
+    the items the user owns. Cached per owner; see
+    rentals/services/dashboard.py.
+    """
+
+    # No read_replica: a lagging replica could refill the cache with data
+    # from before the write that just invalidated it.
+    permission_classes = [IsAuthenticated]
+    query_budget = 2
+
+    def get(self, request):
+        return Response(dashboard.owner_dashboard(request.user), status=status.HTTP_200_OK)
+
+
+class SyncView(APIView):
+    """
+    Delta sync of the user's items, bookings (as renter and as owner) and
+    payments. Without ?since= everything is returned; see
+    rentals/services/sync.py for how watermarks work.
+    """
+
+    # Always read from the primary: a lagging replica would hand out a
+    # watermark past changes it has not applied yet.
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        since = request.query_params.get("since")
+        if since is not None:
+            since = parse_datetime(since)
+            if since is None or timezone.is_naive(since):
+                return Response(
+                    {"error": "since must be a watermark returned by a previous sync"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        reset = since is not None and sync.is_expired(since)
+        if reset:
+            since = None
+
+        watermark = sync.next_watermark(since)
+        items, bookings, payments, deleted = sync.changes(request.user, since)
+        return Response(
+            {
+                "watermark": watermark.isoformat(),
+                "reset": reset,
+                "items": ItemGetSerializer(items, many=True).data,
+                "bookings": BookingSerializer(bookings, many=True).data,
+                "payments": PaymentSerializer(payments, many=True).data,
+                "deleted": deleted,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class UploadSessionView(APIView):
+    """
+    Start a resumable chunked photo upload; see rentals/services/uploads.py.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        data = request.data
+        try:
+            session = uploads.start_upload(
+                request.user, data.get("target", ""), int(data.get("object_id", 0)),
+                str(data.get("filename", "")), int(data.get("size", 0)), str(data.get("sha256", "")).lower(),
+            )
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "object_id and size must be integers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except uploads.UploadError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if session.status == "COMPLETE":
+            return Response(
+                {"id": session.id, "offset": session.size, "complete": True},
+                status=status.HTTP_200_OK,
+            )
+        return Response(
+            {"id": session.id, "offset": 0, "chunk_size": settings.UPLOAD_CHUNK_MAX_SIZE, "complete": False},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class UploadChunkView(APIView):
+    """
+    Report progress of (GET), send a chunk to (PUT) or abort (DELETE) an
+    upload. The PUT body is read as a raw stream, never parsed.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get_session(self, request, pk):
+        return UploadSession.objects.filter(pk=pk, user=request.user, status="OPEN").first()
+
+    def get(self, request, pk=None):
+        session = self.get_session(request, pk)
+        if session is None:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"offset": session.received, "size": session.size})
+
+    def put(self, request, pk=None):
+        session = self.get_session(request, pk)
+        if session is None:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.META["CONTENT_LENGTH"])
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "Upload-Offset and Content-Length headers are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if length > settings.UPLOAD_CHUNK_MAX_SIZE:
+            return Response(
+                {"error": f"Chunks may be at most {settings.UPLOAD_CHUNK_MAX_SIZE} bytes"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        algorithm, _, checksum = request.headers.get("Upload-Checksum", "").partition(" ")
+        if checksum and algorithm.lower() != "sha256":
+            return Response(
+                {"error": "Upload-Checksum must be 'sha256 <hex digest>'"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            offset = uploads.write_chunk(session, offset, request.stream, length, checksum or None)
+        except uploads.OffsetMismatch as e:
+            return Response({"error": str(e), "offset": e.offset}, status=status.HTTP_409_CONFLICT)
+        except uploads.UploadBusy as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except uploads.UploadError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"offset": offset, "size": session.size})
+
+    def delete(self, request, pk=None):
+        session = self.get_session(request, pk)
+        if session is None:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        uploads.abort_upload(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadCompleteView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk=None):
+        session = UploadSession.objects.filter(pk=pk, user=request.user, status="OPEN").first()
+        if session is None:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            obj = uploads.complete_upload(session, request.user)
+        except uploads.UploadBusy as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except uploads.UploadError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        field = getattr(obj, uploads.TARGETS[session.target].field)
+        return Response(
+            {"target": session.target, "object_id": obj.pk, "url": field.url},
+            status=status.HTTP_200_OK,
+        )
+
+
+class ItemImportView(APIView):
+    """
+    Bulk import items for the authenticated user from a CSV or JSONL file,
+    with an optional zip archive of the images the rows refer to.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response(
+                {"error": "A CSV or JSONL file is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        file_format = request.data.get("format") or detect_format(upload.name)
+        if file_format not in ("csv", "jsonl"):
+            return Response(
+                {"error": "Format must be 'csv' or 'jsonl'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        images = request.FILES.get("images")
+        try:
+            importer = ItemImporter(request.user, images=images)
+        except zipfile.BadZipFile:
+            return Response(
+                {"error": "Images must be a zip archive"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        result = importer.run(parse_rows(upload.file, file_format))
+        response_status = status.HTTP_201_CREATED if result["created"] else status.HTTP_400_BAD_REQUEST
+        return Response(result, status=response_status)
+
+
+class ExportView(APIView):
+    """
+    Stream the authenticated user's items or bookings as JSONL or CSV,
+    chosen with ?type= (?format= is DRF's renderer override).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, resource):
+        if resource not in EXPORTS:
+            return Response(
+                {"error": "Resource must be 'items' or 'bookings'."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        file_format = request.query_params.get("type", "jsonl")
+        if file_format not in ("csv", "jsonl"):
+            return Response(
+                {"error": "Type must be 'csv' or 'jsonl'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        content_type = "text/csv" if file_format == "csv" else "application/x-ndjson"
+        # Each server needs an iterator of its own kind to stream without
+        # first reading the whole export into memory.
+        export = astream_export if isinstance(request._request, ASGIRequest) else stream_export
+        response = StreamingHttpResponse(
+            export(resource, request.user, file_format), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="{resource}.{file_format}"'
+        return response
@@ -0,0 +1,48 @@
+"""
+Database connection statistics.
+
+With DB_POOL_ENABLED the numbers come from the psycopg pool itself; with
+persistent connections only the count of newly opened connections is
+available, which should stay flat once every worker thread is connected.
+"""
+import threading
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+
+_opened = Counter()
+_opened_lock = threading.Lock()
+
+
+def _count_connection(sender, connection, **kwargs):
+    with _opened_lock:
+        _opened[connection.alias] += 1
+
+
+connection_created.connect(_count_connection, dispatch_uid="snicko.db.count_connection")
+
+
+def get_pool(alias=DEFAULT_DB_ALIAS):
+    """
+    Return the psycopg pool behind `alias`, or None when pooling is off.
+    """
+    return getattr(connections[alias], "pool", None)
+
+
+def get_pool_stats(alias=DEFAULT_DB_ALIAS):
+    connection = connections[alias]
+    pool = get_pool(alias)
+    with _opened_lock:
+        stats = {"alias": alias, "pooled": pool is not None, "connections_opened": _opened[alias]}
+    if pool is None:
+        stats["conn_max_age"] = connection.settings_dict["CONN_MAX_AGE"]
+        stats["health_checks"] = connection.settings_dict["CONN_HEALTH_CHECKS"]
+        return stats
+
+    pool_stats = pool.get_stats()
+    requests = pool_stats.get("requests_num", 0)
+    stats.update(pool_stats)
+    stats["timeout"] = pool.timeout
+    stats["requests_wait_ms_avg"] = pool_stats.get("requests_wait_ms", 0) / requests if requests else 0.0
+    return stats
@@ -0,0 +1,129 @@
+"""
+Sparse fieldsets for list and detail endpoints.
+
+    ?fields=id,status,item.name,item.image
+    ?fields=id,status,item&expand=item
+
+Without ?fields= responses are unchanged. With it, only the listed fields
+are returned; nested objects are returned as their primary key unless they
+are expanded, either with ?expand= or by naming one of their fields. The
+same selection narrows the SQL: Fieldset.narrow() applies only() and
+select_related() so unused columns and joins are not read at all.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import RelatedField
+
+
+class Fieldset:
+    def __init__(self, fields=None):
+        # None means every field.
+        self.fields = set(fields) if fields is not None else None
+        self.nested = {}
+
+    @classmethod
+    def parse(cls, fields=None, expand=None):
+        def names(value):
+            return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+        if fields is None:
+            return cls()
+        fieldset = cls([])
+        for name in names(fields):
+            head, _, rest = name.partition(".")
+            fieldset.fields.add(head)
+            if rest:
+                fieldset.nested.setdefault(head, cls([])).fields.add(rest)
+        for name in names(expand):
+            fieldset.fields.add(name)
+            fieldset.nested.setdefault(name, cls())
+        return fieldset
+
+    @classmethod
+    def from_request(cls, request):
+        return cls.parse(request.query_params.get("fields"), request.query_params.get("expand"))
+
+    @property
+    def is_sparse(self):
+        return self.fields is not None
+
+    def narrow(self, queryset, serializer_class):
+        """
+        Restrict `queryset` to the columns and joins `serializer_class` needs
+        to render this fieldset.
+        """
+        if not self.is_sparse:
+            return queryset
+        only, related = _paths(serializer_class(fieldset=self))
+        if only is None:
+            return queryset
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*only)
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that accepts a `fieldset` keyword argument.
+    """
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fieldset = fieldset
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.fieldset is None or not self.fieldset.is_sparse:
+            return fields
+        sparse = {}
+        for name, field in fields.items():
+            if name not in self.fieldset.fields:
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                child = self.fieldset.nested.get(name)
+                if child is None:
+                    field = serializers.PrimaryKeyRelatedField(read_only=True, source=field.source)
+                elif isinstance(field, SparseFieldsetMixin):
+                    field = type(field)(*field._args, fieldset=child, **field._kwargs)
+            sparse[name] = field
+        return sparse
+
+
+def _paths(serializer, prefix=""):
+    """
+    Return (only, select_related) lookups covering the serializer's fields,
+    or (None, None) when a field's data cannot be mapped to columns.
+    """
+    model = serializer.Meta.model
+    only, related = [prefix + model._meta.pk.name], []
+    for field in serializer.fields.values():
+        source = field.source
+        if source == "*":
+            return None, None
+        path = prefix + source.replace(".", "__")
+        if isinstance(field, serializers.BaseSerializer):
+            related.append(path)
+            nested_only, nested_related = _paths(field, path + "__")
+            if nested_only is None:
+                only.append(path)
+            else:
+                only.extend(nested_only)
+                related.extend(nested_related)
+        elif "." in source:
+            # e.g. owner_name = CharField(source="owner.name")
+            related.append(path.rsplit("__", 1)[0])
+            only.append(path)
+        elif isinstance(field, RelatedField) or _is_model_field(model, source):
+            only.append(path)
+        else:
+            return None, None
+    return only, related
+
+
+def _is_model_field(model, name):
+    try:
+        model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return True
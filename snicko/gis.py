@@ -0,0 +1,19 @@
+"""Spatial query expressions shared by the apps."""
+from django.contrib.gis.db.models import PointField
+from django.db.models import FloatField, Func, Value
+
+
+class KNNDistance(Func):
+    """
+    PostGIS `<->` distance between a geography column and a fixed point, in
+    metres. Ordering by it lets the planner walk the GiST index nearest
+    first, so ORDER BY ... LIMIT k reads about k rows instead of sorting
+    every candidate.
+    """
+    arg_joiner = " <-> "
+    template = "%(expressions)s"
+    output_field = FloatField()
+
+    def __init__(self, expression, point, **extra):
+        point = Value(point, output_field=PointField(geography=True, srid=4326))
+        super().__init__(expression, point, **extra)
@@ -0,0 +1,247 @@
+"""
+Process-local metrics in the Prometheus text format.
+
+Every thread records into its own shard, so the request path never takes a
+lock; a scrape of /metrics adds the shards up. Values are cumulative for the
+life of the process, and each worker process is scraped (or labelled)
+separately.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.decorators import sync_and_async_middleware
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help, buckets)
+METRICS = {
+    "http_request_duration_seconds": ("histogram", "Request latency by route.", LATENCY_BUCKETS),
+    "http_response_bytes_total": ("counter", "Response body bytes by route.", None),
+    "db_queries_total": ("counter", "Database queries run while serving a route.", None),
+    "db_query_seconds_total": ("counter", "Time spent in database queries by route.", None),
+    "external_call_duration_seconds": ("histogram", "Latency of calls to external services.", LATENCY_BUCKETS),
+    "external_call_errors_total": ("counter", "Failed calls to external services.", None),
+    "channels_connections": ("gauge", "Open websocket connections.", None),
+    "db_pool_connections": ("gauge", "Connections held by the pool.", None),
+    "db_pool_available": ("gauge", "Idle connections in the pool.", None),
+    "db_pool_requests_waiting": ("gauge", "Requests waiting for a pooled connection.", None),
+    "db_pool_wait_seconds_total": ("counter", "Time spent waiting for a pooled connection.", None),
+    "password_hashing_in_flight": ("gauge", "Password hashes running or queued.", None),
+    "password_hashing_queued": ("gauge", "Password hashes waiting for a hashing worker.", None),
+    "password_hashing_completed_total": ("counter", "Password hashes completed.", None),
+    "password_hashing_rejected_total": ("counter", "Password hashes refused because the queue was full.", None),
+    "password_hashing_wait_seconds_total": ("counter", "Time password hashes spent queued.", None),
+    "password_hashing_run_seconds_total": ("counter", "Time spent hashing passwords.", None),
+}
+
+
+class Shard:
+    def __init__(self):
+        self.values = defaultdict(float)
+        self.histograms = {}
+
+
+_local = threading.local()
+_shards = []
+_shards_lock = threading.Lock()
+
+
+def _shard():
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = _local.shard = Shard()
+        with _shards_lock:
+            _shards.append(shard)
+    return shard
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """
+    Add to a counter, or to a gauge when value may be negative.
+    """
+    _shard().values[(name, _labels(labels))] += value
+
+
+def observe(name, value, **labels):
+    buckets = METRICS[name][2]
+    key = (name, _labels(labels))
+    histograms = _shard().histograms
+    counts = histograms.get(key)
+    if counts is None:
+        # One slot per bucket, then +Inf, sum.
+        counts = histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+    counts[bisect_left(buckets, value)] += 1
+    counts[-1] += value
+
+
+@contextmanager
+def timed_call(service):
+    """
+    Time a call to an external service such as FCM, Razorpay or Google.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc("external_call_errors_total", service=service)
+        raise
+    finally:
+        observe("external_call_duration_seconds", time.perf_counter() - started, service=service)
+
+
+# [queries, seconds] for the request being served, shared with the threads
+# its sync parts run on.
+_request_queries = ContextVar("request_queries", default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    stats = _request_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+
+def _install_query_counter(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+connection_created.connect(_install_query_counter, dispatch_uid="snicko.metrics.query_counter")
+
+
+def _record(request, response, started, stats):
+    match = getattr(request, "resolver_match", None)
+    route = match.route if match else "unmatched"
+    observe(
+        "http_request_duration_seconds", time.perf_counter() - started,
+        route=route, method=request.method, status=str(response.status_code),
+    )
+    inc("db_queries_total", stats[0], route=route)
+    inc("db_query_seconds_total", stats[1], route=route)
+    if not response.streaming:
+        inc("http_response_bytes_total", len(response.content), route=route)
+
+
+@sync_and_async_middleware
+def MetricsMiddleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started, stats = time.perf_counter(), [0, 0.0]
+            token = _request_queries.set(stats)
+            try:
+                response = await get_response(request)
+            finally:
+                _request_queries.reset(token)
+            _record(request, response, started, stats)
+            return response
+    else:
+        def middleware(request):
+            started, stats = time.perf_counter(), [0, 0.0]
+            token = _request_queries.set(stats)
+            try:
+                response = get_response(request)
+            finally:
+                _request_queries.reset(token)
+            _record(request, response, started, stats)
+            return response
+    return middleware
+
+
+def _pool_values():
+    from .db import get_pool
+
+    values = {}
+    for alias in connections:
+        pool = get_pool(alias)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        labels = (("alias", alias),)
+        values[("db_pool_connections", labels)] = stats.get("pool_size", 0)
+        values[("db_pool_available", labels)] = stats.get("pool_available", 0)
+        values[("db_pool_requests_waiting", labels)] = stats.get("requests_waiting", 0)
+        values[("db_pool_wait_seconds_total", labels)] = stats.get("requests_wait_ms", 0) / 1000
+    return values
+
+
+def _hashing_values():
+    from users.hashing import get_hashing_executor
+
+    stats = get_hashing_executor().stats()
+    return {
+        ("password_hashing_in_flight", ()): stats["in_flight"],
+        ("password_hashing_queued", ()): stats["queued"],
+        ("password_hashing_completed_total", ()): stats["completed"],
+        ("password_hashing_rejected_total", ()): stats["rejected"],
+        ("password_hashing_wait_seconds_total", ()): stats["wait_seconds_total"],
+        ("password_hashing_run_seconds_total", ()): stats["run_seconds_total"],
+    }
+
+
+def collect():
+    """
+    Sum every thread's shard. Returns (values, histograms).
+    """
+    values, histograms = defaultdict(float), {}
+    with _shards_lock:
+        shards = list(_shards)
+    for shard in shards:
+        for key, value in list(shard.values.items()):
+            values[key] += value
+        for key, counts in list(shard.histograms.items()):
+            total = histograms.setdefault(key, [0] * len(counts))
+            for i, count in enumerate(list(counts)):
+                total[i] += count
+    values.update(_pool_values())
+    values.update(_hashing_values())
+    return values, histograms
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def render():
+    values, histograms = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "histogram":
+            for (metric, labels), counts in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {counts[-1]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        else:
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
@@ -1,17 +1,25 @@
-"""Authentication classes for channels."""
+"""Authentication classes for channels, and HTTP response compression."""
+import re
+import zlib
 from urllib.parse import parse_qs
 
+import brotli
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from channels.auth import AuthMiddlewareStack
 from channels.db import database_sync_to_async
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
-from django.db import close_old_connections
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
 from jwt import InvalidSignatureError, ExpiredSignatureError, DecodeError
 from jwt import decode as jwt_decode
 
 User = get_user_model()
 
+gzip_re = re.compile(r"\bgzip\b")
+brotli_re = re.compile(r"\bbr\b")
+
 
 class JWTAuthMiddleware:
     """Middleware to authenticate user for channels"""
@@ -22,7 +30,8 @@ class JWTAuthMiddleware:
 
     async def __call__(self, scope, receive, send):
         """Authenticate the user based on jwt."""
-        close_old_connections()
+        # get_user runs through database_sync_to_async, which already closes
+        # stale connections (or returns them to the pool) around the query.
         try:
             # Decode the query string and get token parameter from it.
             token = parse_qs(scope["query_string"].decode("utf8")).get('token', None)[0]
@@ -48,4 +57,107 @@ class JWTAuthMiddleware:
 
 def JWTAuthMiddlewareStack(app):
     """This function wrap channels authentication stack with JWTAuthMiddleware."""
-    return JWTAuthMiddleware(AuthMiddlewareStack(app))
\ No newline at end of file
+    return JWTAuthMiddleware(AuthMiddlewareStack(app))
+
+class StreamCompressor:
+    """
+    Incremental gzip or brotli encoder. Each chunk is flushed as it is
+    compressed, so a streamed response keeps streaming.
+    """
+
+    def __init__(self, encoding):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self.compress = lambda chunk: compressor.process(chunk) + compressor.flush()
+            self.finish = compressor.finish
+        else:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress = lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = compressor.flush
+
+    def wrap(self, chunks):
+        for chunk in chunks:
+            data = self.compress(chunk)
+            if data:
+                yield data
+        yield self.finish()
+
+    async def awrap(self, chunks):
+        async for chunk in chunks:
+            data = self.compress(chunk)
+            if data:
+                yield data
+        yield self.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses of at least COMPRESSION_MIN_SIZE bytes with brotli,
+    when the client accepts it, or gzip. Small bodies are sent as is, since
+    compressing them costs more than it saves. Streamed responses, sync or
+    async, are compressed chunk by chunk.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    @staticmethod
+    def encoding(request):
+        accepted = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if brotli_re.search(accepted):
+            return "br"
+        if gzip_re.search(accepted):
+            return "gzip"
+        return None
+
+    def compress(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = self.encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            compressor = StreamCompressor(encoding)
+            if response.is_async:
+                response.streaming_content = compressor.awrap(response.streaming_content)
+            else:
+                response.streaming_content = compressor.wrap(response.streaming_content)
+            del response["Content-Length"]
+            self._mark(response, encoding)
+            return response
+
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        if encoding == "br":
+            content = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            content = compress_string(response.content)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response["Content-Length"] = str(len(content))
+        self._mark(response, encoding)
+        return response
+
+    @staticmethod
+    def _mark(response, encoding):
+        # The compressed bytes differ from the uncompressed ones, so a strong
+        # ETag no longer describes them.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
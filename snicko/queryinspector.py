@@ -0,0 +1,215 @@
+"""
+Development aid that watches the queries a request runs.
+
+Enable with QUERY_INSPECTOR_ENABLED. Repeated queries of the same shape are
+reported as likely N+1 patterns together with the line of our code that
+issued them, and queries slower than QUERY_INSPECTOR_SLOW_MS are logged
+with their EXPLAIN plan. Views may declare `query_budget = <n>`; with
+QUERY_INSPECTOR_STRICT a request over budget, or with an N+1 pattern,
+raises QueryBudgetExceeded instead of only logging, which is what tests use.
+"""
+import logging
+import re
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Collapses IN (%s, %s, ...) and VALUES lists so their length does not make
+# otherwise identical queries look different.
+PLACEHOLDER_LIST_RE = re.compile(r"%s(?:\s*,\s*%s)+")
+SKIPPED_PATHS = ("/site-packages/", "/dist-packages/", "/django/", __file__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class QueryShape:
+    sql: str
+    count: int = 0
+    seconds: float = 0.0
+    frame: str = ""
+
+
+@dataclass
+class QueryInspector:
+    slow_ms: float = 100.0
+    threshold: int = 5
+    shapes: dict = field(default_factory=dict)
+    total: int = 0
+    explaining: bool = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.record(sql, elapsed)
+            if elapsed * 1000 >= self.slow_ms and sql.lstrip().upper().startswith("SELECT"):
+                self.log_slow(context["connection"], sql, params, elapsed)
+
+    def record(self, sql, elapsed):
+        key = PLACEHOLDER_LIST_RE.sub("%s, ...", sql)
+        shape = self.shapes.get(key)
+        if shape is None:
+            shape = self.shapes[key] = QueryShape(key, frame=origin())
+        shape.count += 1
+        shape.seconds += elapsed
+        self.total += 1
+
+    def log_slow(self, connection, sql, params, elapsed):
+        self.explaining = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN {sql}", params)
+                plan = "\n".join(" ".join(map(str, row)) for row in cursor.fetchall())
+        except Exception as exc:
+            plan = f"(EXPLAIN failed: {exc})"
+        finally:
+            self.explaining = False
+        logger.warning("Slow query (%.1f ms) at %s:\n%s\n%s", elapsed * 1000, origin(), sql, plan)
+
+    def repeated(self):
+        """
+        Return the shapes run at least `threshold` times, most frequent first.
+        """
+        shapes = [shape for shape in self.shapes.values() if shape.count >= self.threshold]
+        return sorted(shapes, key=lambda shape: shape.count, reverse=True)
+
+    def report(self):
+        lines = [f"{self.total} queries"]
+        for shape in self.repeated():
+            lines.append(f"  {shape.count}x at {shape.frame}: {shape.sql}")
+        return "\n".join(lines)
+
+
+def origin():
+    """
+    Return "file:line in function" for the innermost stack frame in our
+    own code, skipping Django, third-party packages and this module.
+    """
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        if not any(path in frame.filename for path in SKIPPED_PATHS):
+            return f"{frame.filename}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+@contextmanager
+def inspect_queries(**kwargs):
+    """
+    Run the block with a QueryInspector attached to every database.
+    """
+    inspector = QueryInspector(
+        slow_ms=kwargs.pop("slow_ms", settings.QUERY_INSPECTOR_SLOW_MS),
+        threshold=kwargs.pop("threshold", settings.QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD),
+        **kwargs,
+    )
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(inspector))
+        yield inspector
+
+
+def check(inspector, label, budget=None, strict=False):
+    problems = []
+    if budget is not None and inspector.total > budget:
+        problems.append(f"{label} ran {inspector.total} queries, over its budget of {budget}")
+    if inspector.repeated():
+        problems.append(f"{label} looks like it has an N+1 query pattern")
+    if not problems:
+        return
+    message = "\n".join(problems + [inspector.report()])
+    if strict:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+# The inspector for the request being served, shared with the threads its
+# sync parts run on.
+_request_inspector = ContextVar("request_inspector", default=None)
+
+
+def _inspect_query(execute, sql, params, many, context):
+    inspector = _request_inspector.get()
+    if inspector is None:
+        return execute(sql, params, many, context)
+    return inspector(execute, sql, params, many, context)
+
+
+def _install_inspector(sender, connection, **kwargs):
+    if _inspect_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_inspect_query)
+
+
+class QueryInspectorMiddleware:
+    """
+    Inspects every request's queries. Left out of the middleware chain
+    entirely unless QUERY_INSPECTOR_ENABLED.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSPECTOR_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Connections are per thread, so the inspector is reached through a
+        # context variable rather than wrappers on this thread's connections.
+        connection_created.connect(_install_inspector, dispatch_uid="snicko.queryinspector.install")
+        for alias in connections:
+            _install_inspector(None, connections[alias])
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inspector = self.start(request)
+        token = _request_inspector.set(inspector)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_inspector.reset(token)
+        self.finish(request, inspector)
+        return response
+
+    async def __acall__(self, request):
+        inspector = self.start(request)
+        token = _request_inspector.set(inspector)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_inspector.reset(token)
+        self.finish(request, inspector)
+        return response
+
+    def start(self, request):
+        request.query_budget = None
+        return QueryInspector(
+            slow_ms=settings.QUERY_INSPECTOR_SLOW_MS, threshold=settings.QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD,
+        )
+
+    def finish(self, request, inspector):
+        check(
+            inspector, f"{request.method} {request.path}",
+            budget=request.query_budget, strict=settings.QUERY_INSPECTOR_STRICT,
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, "cls", view_func)
+        request.query_budget = getattr(view, "query_budget", None)
+        return None
@@ -0,0 +1,53 @@
+"""
+Faster renderers for API responses.
+
+ORJSONRenderer produces the same JSON as DRF's JSONRenderer, using orjson
+for the common types and DRF's encoder for everything else, so Decimal,
+datetime, lazy strings and querysets come out exactly as before.
+MessagePackRenderer serves application/msgpack to clients that ask for it.
+"""
+import json
+
+import msgpack
+import orjson
+from django.contrib.gis.geos import GEOSGeometry
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+
+def encode_default(obj):
+    if isinstance(obj, GEOSGeometry):
+        return json.loads(obj.geojson)
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    # Datetimes go through DRF's encoder for its millisecond/"Z" format.
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        ret = orjson.dumps(data, default=encode_default, option=self.options)
+        # Like DRF, escape the separators that are valid JSON but not valid JavaScript.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
@@ -0,0 +1,186 @@
+"""
+Read-replica routing.
+
+Views opt in with a `read_replica = True` attribute. For safe requests to
+those views, ReplicaMiddleware marks the request and ReplicaRouter then
+sends its reads to a healthy replica. Everything else, including any read
+inside a transaction on the primary, stays on the primary.
+
+The router finds the request through a context variable, which the
+middleware sets and resets within one call. Under ASGI each sync step runs
+in its own copy of the context, so the flag itself lives on the request
+object that all of those copies share.
+
+After a user's own write their reads are pinned to the primary for
+REPLICA_STICKY_SECONDS, so they never read a replica that has not caught up
+with what they just changed.
+"""
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_request = ContextVar("replica_request", default=None)
+
+
+class ReplicaHealth:
+    """
+    Remembers whether each replica answered its last check, rechecking at
+    most every REPLICA_HEALTH_CHECK_INTERVAL seconds per process.
+    """
+
+    def __init__(self):
+        self.checked = {}
+        self.lock = threading.Lock()
+
+    def check(self, alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except DatabaseError:
+            connections[alias].close()
+            return False
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        healthy, checked_at = self.checked.get(alias, (True, None))
+        if checked_at is not None and now - checked_at < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+            return healthy
+        healthy = self.check(alias)
+        with self.lock:
+            self.checked[alias] = (healthy, now)
+        return healthy
+
+
+health = ReplicaHealth()
+
+
+def choose_replica():
+    """
+    Return a healthy replica alias, or the primary if none is available.
+    """
+    replicas = [alias for alias in settings.DATABASE_REPLICAS if health.is_healthy(alias)]
+    return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        request = _request.get()
+        if request is None or not request.use_replica or not settings.DATABASE_REPLICAS:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def read_replica(view):
+    """
+    Mark a function view as safe to serve from a replica, like setting
+    `read_replica = True` on a class-based view.
+    """
+    view.read_replica = True
+    return view
+
+
+def _pin_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    cache.set(_pin_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(_pin_key(user_id)) is not None
+
+
+def _token_user_id(request):
+    """
+    Return the user id from the request's access token without touching the
+    database, or None for anonymous or invalid tokens.
+    """
+    header = request.META.get("HTTP_AUTHORIZATION", "").split()
+    if len(header) != 2 or header[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(header[1]).get(api_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.use_replica = False
+        token = _request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+
+        user_id = self.written_by(request, response)
+        if user_id is not None:
+            pin_to_primary(user_id)
+        return response
+
+    async def __acall__(self, request):
+        request.use_replica = False
+        token = _request.set(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request.reset(token)
+
+        user_id = self.written_by(request, response)
+        if user_id is not None:
+            await cache.aset(_pin_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    @staticmethod
+    def written_by(request, response):
+        """
+        The user whose successful write this response is, if any.
+        """
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return None
+        return _token_user_id(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, "cls", view_func)
+        if request.method not in SAFE_METHODS or not getattr(view, "read_replica", False):
+            return None
+        user_id = _token_user_id(request)
+        if user_id is not None and is_pinned(user_id):
+            return None
+        request.use_replica = True
+        return None
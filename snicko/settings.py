@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 from datetime import timedelta
 
@@ -78,6 +79,8 @@ AUTH_USER_MODEL = "users.CustomUser"
 
 
 MIDDLEWARE = [
+    "snicko.metrics.MetricsMiddleware",
+    "snicko.middlewares.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -86,6 +89,9 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "snicko.queryinspector.QueryInspectorMiddleware",
+    "snicko.throttling.LoadSheddingMiddleware",
+    "snicko.routers.ReplicaMiddleware",
 ]
 
 ROOT_URLCONF = "snicko.urls"
@@ -121,11 +127,11 @@ CHANNEL_LAYERS = {
 DATABASES = {
     "default": {
         "ENGINE": "django.contrib.gis.db.backends.postgis",
-        "NAME": "rental_db",
-        "USER": "postgres",
-        "PASSWORD": "1922",
-        "HOST": "localhost",
-        "PORT": "5432",
+        "NAME": os.environ.get("DB_NAME", "rental_db"),
+        "USER": os.environ.get("DB_USER", "postgres"),
+        "PASSWORD": os.environ.get("DB_PASSWORD", "1922"),
+        "HOST": os.environ.get("DB_HOST", "localhost"),
+        "PORT": os.environ.get("DB_PORT", "5432"),
     }
     # 'default': {
     #     'ENGINE': 'django.db.backends.sqlite3',
@@ -133,12 +139,148 @@ DATABASES = {
     # }
 }
 
+# Connection reuse
+# By default each process keeps a psycopg 3 connection pool and requests
+# borrow from it; DB_POOL_TIMEOUT is how long a request may wait for a free
+# connection. With DB_POOL_ENABLED=false connections are opened per request,
+# or persist per thread for DB_CONN_MAX_AGE seconds. Only set that under
+# WSGI: under ASGI (snicko.asgi, how production runs) every request may run
+# on a new thread, and persistent connections leak.
+
+DB_POOL_ENABLED = os.environ.get("DB_POOL_ENABLED", "true").lower() in ("1", "true", "yes")
+
+if DB_POOL_ENABLED:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            "max_idle": float(os.environ.get("DB_POOL_MAX_IDLE", 300)),
+            "max_lifetime": float(os.environ.get("DB_POOL_MAX_LIFETIME", 1800)),
+            "check": ConnectionPool.check_connection,
+        },
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("DB_CONN_MAX_AGE", 0))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# Read replicas
+# DB_REPLICAS is a comma-separated list of host[:port][/name] entries, e.g.
+# "replica1.internal,localhost:5433/rental_db_replica". Safe requests to views
+# marked `read_replica = True` read from them; see snicko/routers.py.
+
+DATABASE_REPLICAS = []
+for index, entry in enumerate(filter(None, os.environ.get("DB_REPLICAS", "").split(",")), start=1):
+    address, _, name = entry.strip().partition("/")
+    host, _, port = address.partition(":")
+    alias = f"replica{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "NAME": name or DATABASES["default"]["NAME"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["snicko.routers.ReplicaRouter"]
+
+# Seconds a user's reads stay on the primary after they write.
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", 10))
+REPLICA_HEALTH_CHECK_INTERVAL = int(os.environ.get("REPLICA_HEALTH_CHECK_INTERVAL", 5))
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    )
+        "users.authentication.ClaimsJWTAuthentication",
+    ),
+    # orjson renders and parses JSON; msgpack adds application/msgpack for
+    # clients that send it or list it in Accept.
+    "DEFAULT_RENDERER_CLASSES": [
+        "snicko.renderers.ORJSONRenderer",
+        "snicko.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "snicko.parsers.ORJSONParser",
+        "snicko.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # Token buckets for the expensive public endpoints; see snicko/throttling.py.
+    "DEFAULT_THROTTLE_RATES": {
+        "search": os.environ.get("THROTTLE_SEARCH_RATE", "60/min"),
+        "catalog": os.environ.get("THROTTLE_CATALOG_RATE", "120/min"),
+    },
+}
+
+# "local" keeps throttle buckets per process; "postgres" shares them between
+# workers through an unlogged table.
+THROTTLE_STORE = os.environ.get("THROTTLE_STORE", "local")
+THROTTLE_ENABLED = os.environ.get("THROTTLE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Views marked shed_under_load answer 503 while the average wait for a pooled
+# connection over the last sample exceeds LOAD_SHED_WAIT_MS, or more than
+# LOAD_SHED_MAX_WAITING requests are queued for one.
+LOAD_SHED_WAIT_MS = float(os.environ.get("LOAD_SHED_WAIT_MS", 200))
+LOAD_SHED_MAX_WAITING = int(os.environ.get("LOAD_SHED_MAX_WAITING", 20))
+LOAD_SHED_SAMPLE_INTERVAL = float(os.environ.get("LOAD_SHED_SAMPLE_INTERVAL", 1))
+LOAD_SHED_RETRY_AFTER = int(os.environ.get("LOAD_SHED_RETRY_AFTER", 2))
+
+# Delta sync (api/rentals/sync/): watermarks are moved back by
+# SYNC_OVERLAP_SECONDS to cover app server clock skew and transactions that
+# commit late; tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS are pruned
+# by the prune_tombstones command and older watermarks force a full resync.
+SYNC_OVERLAP_SECONDS = int(os.environ.get("SYNC_OVERLAP_SECONDS", 60))
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get("SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+
+# Resumable chunked uploads (api/rentals/uploads/). Partial files live in
+# UPLOAD_TEMP_DIR, which every worker handling uploads must share; sessions
+# idle for UPLOAD_SESSION_TTL_HOURS are removed by purge_uploads.
+UPLOAD_TEMP_DIR = os.environ.get("UPLOAD_TEMP_DIR", os.path.join(tempfile.gettempdir(), "snicko-uploads"))
+UPLOAD_MAX_SIZE = int(os.environ.get("UPLOAD_MAX_SIZE", 25 * 1024 * 1024))
+UPLOAD_CHUNK_MAX_SIZE = int(os.environ.get("UPLOAD_CHUNK_MAX_SIZE", 4 * 1024 * 1024))
+UPLOAD_SESSION_TTL_HOURS = int(os.environ.get("UPLOAD_SESSION_TTL_HOURS", 24))
+
+# Similar-item recommendations (rentals/services/recommendations.py), kept
+# fresh by the refresh_recommendations command.
+RECOMMENDATION_TOP_K = int(os.environ.get("RECOMMENDATION_TOP_K", 10))
+RECOMMENDATION_POOL_SIZE = int(os.environ.get("RECOMMENDATION_POOL_SIZE", 200))
+RECOMMENDATION_RADIUS_KM = float(os.environ.get("RECOMMENDATION_RADIUS_KM", 25))
+RECOMMENDATION_DISTANCE_SCALE_KM = float(os.environ.get("RECOMMENDATION_DISTANCE_SCALE_KM", 5))
+RECOMMENDATION_WEIGHTS = {"category": 0.35, "distance": 0.25, "price": 0.15, "text": 0.25}
+
+# Popularity ranking (sort=popular): per-worker counters flushed by a
+# background thread every POPULARITY_FLUSH_SECONDS, decaying with
+# POPULARITY_HALF_LIFE_DAYS.
+POPULARITY_HALF_LIFE_DAYS = float(os.environ.get("POPULARITY_HALF_LIFE_DAYS", 7))
+POPULARITY_FLUSH_SECONDS = float(os.environ.get("POPULARITY_FLUSH_SECONDS", 30))
+POPULARITY_WEIGHTS = {"views": 1.0, "requests": 5.0, "completions": 20.0}
+
+# Search facets (rentals/services/search.py): lower bounds of the price
+# bands, per day, and the distance rings in km. Rings beyond the search
+# radius are dropped.
+SEARCH_PRICE_BANDS = [0, 250, 500, 1000, 2500]
+SEARCH_DISTANCE_RINGS_KM = [1, 2, 5, 10, 25]
+
+# Cache shared by the workers. The default local-memory cache is per
+# process; replica pinning and per-owner dashboard invalidation need a
+# shared backend (e.g. django.core.cache.backends.redis.RedisCache) once
+# more than one worker runs.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
 }
 
+# Owner dashboard (api/rentals/dashboard/).
+DASHBOARD_CACHE_SECONDS = int(os.environ.get("DASHBOARD_CACHE_SECONDS", 300))
+DASHBOARD_UTILISATION_DAYS = int(os.environ.get("DASHBOARD_UTILISATION_DAYS", 30))
+DASHBOARD_UPCOMING_DAYS = int(os.environ.get("DASHBOARD_UPCOMING_DAYS", 7))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -159,6 +301,57 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Responses at least this large are compressed (brotli if accepted, else
+# gzip). Streamed responses are always compressed.
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 4))
+
+# Bearer token required to scrape /metrics; leave empty to allow any client
+# (e.g. when only the internal network can reach it).
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+
+# Query inspector (development and tests): logs N+1 patterns, i.e. the same
+# query shape run QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD times in one request,
+# and EXPLAINs queries slower than QUERY_INSPECTOR_SLOW_MS. In strict mode
+# they, and requests over a view's query_budget, raise instead.
+QUERY_INSPECTOR_ENABLED = os.environ.get("QUERY_INSPECTOR_ENABLED", "false").lower() in ("1", "true", "yes")
+QUERY_INSPECTOR_STRICT = os.environ.get("QUERY_INSPECTOR_STRICT", "false").lower() in ("1", "true", "yes")
+QUERY_INSPECTOR_SLOW_MS = float(os.environ.get("QUERY_INSPECTOR_SLOW_MS", 100))
+QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD = int(os.environ.get("QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD", 5))
+
+
+# Geocoding of pickup spot addresses. GEOCODER_CLASS must provide
+# geocode(address) returning a Point or None; results are cached.
+
+GEOCODER_CLASS = os.environ.get("GEOCODER_CLASS", "users.services.geocoding.GazetteerGeocoder")
+GEOCODER_GAZETTEER_PATH = os.environ.get("GEOCODER_GAZETTEER_PATH", str(BASE_DIR / "users" / "data" / "gazetteer.csv"))
+GEOCODER_CACHE_TIMEOUT = int(os.environ.get("GEOCODER_CACHE_TIMEOUT", 60 * 60 * 24 * 7))
+
+
+# Password hashing
+# New hashes use Argon2 (argon2-cffi). The remaining hashers only verify, and
+# then upgrade, older stored hashes, including scrypt ones written before
+# argon2-cffi was a requirement.
+
+PASSWORD_HASHERS = [
+    "users.hashers.TunableArgon2PasswordHasher",
+    "users.hashers.TunableScryptPasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get("PASSWORD_ARGON2_TIME_COST", 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get("PASSWORD_ARGON2_MEMORY_COST", 102400))
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get("PASSWORD_ARGON2_PARALLELISM", 8))
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.environ.get("PASSWORD_SCRYPT_WORK_FACTOR", 2**14))
+
+# Dedicated thread pool for password hashing in login/register, and how many
+# requests may wait for it before new ones are turned away with a 503.
+PASSWORD_HASHING_WORKERS = int(os.environ.get("PASSWORD_HASHING_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASHING_QUEUE_SIZE = int(os.environ.get("PASSWORD_HASHING_QUEUE_SIZE", 64))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -181,6 +374,16 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Item and handover photos go through "media", which stores each distinct
+# file once (rentals/storage.py). Photos whose dHash differs from another
+# listing's by at most MEDIA_NEAR_DUPLICATE_DISTANCE bits are flagged.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "media": {"BACKEND": "rentals.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+MEDIA_NEAR_DUPLICATE_DISTANCE = int(os.environ.get("MEDIA_NEAR_DUPLICATE_DISTANCE", 6))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -188,6 +391,10 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 RAZORPAY_KEY_ID = os.environ.get("RAZORPAY_KEY_ID")
 RAZORPAY_KEY_SECRET = os.environ.get("RAZORPAY_KEY_SECRET")
+RAZORPAY_WEBHOOK_SECRET = os.environ.get("RAZORPAY_WEBHOOK_SECRET")
+PAYMENT_GATEWAY_CLASS = os.environ.get(
+    "PAYMENT_GATEWAY_CLASS", "payments.services.gateway.RazorpayGateway"
+)
 
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -199,7 +406,19 @@ EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = f'no-reply@{os.environ.get("EMAIL_HOST_USER")}'  # or your provider
 
 
+# OAuth client ids whose Google ID tokens are accepted by GoogleLoginView.
+GOOGLE_OAUTH_CLIENT_IDS = os.environ.get(
+    "GOOGLE_OAUTH_CLIENT_IDS",
+    "431947796542-v5n1pf7srtpfifdqsvf8jvjia32c3ejg.apps.googleusercontent.com",
+).split(",")
+
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=2),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=5),
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.ClaimsTokenObtainPairSerializer",
 }
+
+# How long a user's token version is cached by ClaimsJWTAuthentication. A
+# revoked token keeps working on other workers for at most this many seconds.
+TOKEN_VERSION_CACHE_TIMEOUT = int(os.environ.get("TOKEN_VERSION_CACHE_TIMEOUT", 60))
@@ -0,0 +1,75 @@
+"""Shared helpers for the test suites."""
+import json
+from contextlib import contextmanager
+
+from django.db import connection
+
+from .queryinspector import QueryBudgetExceeded, check, inspect_queries
+
+
+def explain(query, params=None):
+    """
+    Return the root plan node of `query`, which is either a queryset or raw
+    SQL as captured by CaptureQueriesContext.
+    """
+    if hasattr(query, 'explain'):
+        output = query.explain(format='json')
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+            output = cursor.fetchone()[0]
+    if isinstance(output, str):
+        output = json.loads(output)
+    return output[0]['Plan']
+
+
+def iter_plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from iter_plan_nodes(child)
+
+
+class QueryPlanAssertionsMixin:
+    """
+    Assertions on PostgreSQL query plans. Seed enough rows and ANALYZE the
+    tables first, otherwise the planner rightly prefers sequential scans.
+    """
+
+    def assertUsesIndex(self, query, table, params=None):
+        plan = explain(query, params)
+        scans = [node for node in iter_plan_nodes(plan) if node.get('Relation Name') == table]
+        self.assertTrue(scans, f"{table} does not appear in the plan:\n{json.dumps(plan, indent=2)}")
+        for node in scans:
+            self.assertNotEqual(
+                node['Node Type'], 'Seq Scan',
+                f"Sequential scan on {table}:\n{json.dumps(plan, indent=2)}",
+            )
+
+    def captured_query(self, queries, table, verb='SELECT'):
+        """
+        Return the first captured statement of the given kind whose target
+        is `table`.
+        """
+        target = f'UPDATE "{table}"' if verb == 'UPDATE' else f'FROM "{table}"'
+        for query in queries:
+            sql = query['sql']
+            if sql.startswith(verb) and target in sql:
+                return sql
+        self.fail(f"No {verb} on {table} was executed")
+
+
+class QueryBudgetMixin:
+    """
+    Fails a test when a block runs more queries than it declares, or runs
+    the same query shape `threshold` times or more (an N+1 pattern). The
+    failure lists each repeated shape with the line that issued it.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget, threshold=5):
+        with inspect_queries(threshold=threshold, slow_ms=float('inf')) as inspector:
+            yield inspector
+        try:
+            check(inspector, "Block", budget=budget, strict=True)
+        except QueryBudgetExceeded as exc:
+            self.fail(str(exc))
@@ -0,0 +1,237 @@
+import datetime
+import threading
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.hashing import HashingExecutor
+from . import metrics
+from .middlewares import CompressionMiddleware
+from .queryinspector import QueryInspectorMiddleware, _request_inspector
+from .routers import ReplicaMiddleware, ReplicaRouter, _request, health
+from .throttling import LoadSheddingMiddleware, LocalBucketStore, pressure
+
+
+class ReadOnlyView:
+    read_replica = True
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        token = AccessToken()
+        token['user_id'] = 7
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def route_read(self, request, view=ReadOnlyView):
+        """
+        Run `request` through the middleware and return where a read made by
+        the view would go.
+        """
+        routed = []
+
+        def get_response(request):
+            ReplicaMiddleware(None).process_view(request, view, (), {})
+            routed.append(self.router.db_for_read(None))
+            return HttpResponse()
+
+        ReplicaMiddleware(get_response)(request)
+        return routed[0]
+
+    def test_reads_use_replicas_only_for_marked_views(self):
+        with mock.patch.object(health, 'is_healthy', return_value=True):
+            self.assertIn(self.route_read(self.factory.get('/')), ['replica1', 'replica2'])
+            self.assertIsNone(self.route_read(self.factory.get('/'), view=object))
+            self.assertIsNone(self.route_read(self.factory.post('/')))
+        self.assertIsNone(_request.get())
+
+    def test_unhealthy_replicas_fail_over_to_primary(self):
+        with mock.patch.object(health, 'is_healthy', side_effect=lambda alias: alias == 'replica2'):
+            self.assertEqual(self.route_read(self.factory.get('/')), 'replica2')
+        with mock.patch.object(health, 'is_healthy', return_value=False):
+            self.assertEqual(self.route_read(self.factory.get('/')), 'default')
+
+    async def test_async_requests_route_reads_made_in_sync_steps(self):
+        # Under ASGI, process_view and sync views each run in a copy of the
+        # request's context.
+        routed = []
+
+        async def get_response(request):
+            await sync_to_async(ReplicaMiddleware(None).process_view)(request, ReadOnlyView, (), {})
+            routed.append(await sync_to_async(self.router.db_for_read)(None))
+            return HttpResponse()
+
+        with mock.patch.object(health, 'is_healthy', return_value=True):
+            await ReplicaMiddleware(get_response)(self.factory.get('/'))
+        self.assertIn(routed[0], ['replica1', 'replica2'])
+        self.assertIsNone(_request.get())
+
+    def test_reads_stay_on_primary_after_own_write(self):
+        ReplicaMiddleware(lambda request: HttpResponse(status=201))(self.factory.post('/', **self.auth))
+
+        with mock.patch.object(health, 'is_healthy', return_value=True):
+            self.assertIsNone(self.route_read(self.factory.get('/', **self.auth)))
+            self.assertIsNotNone(self.route_read(self.factory.get('/')))
+
+
+class QueryInspectorMiddlewareTestCase(SimpleTestCase):
+    @override_settings(QUERY_INSPECTOR_ENABLED=False)
+    def test_disabled_inspector_leaves_the_chain(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryInspectorMiddleware(lambda request: HttpResponse())
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=True)
+    async def test_async_requests_are_inspected(self):
+        inspectors = []
+
+        async def get_response(request):
+            inspectors.append(_request_inspector.get())
+            return HttpResponse()
+
+        await QueryInspectorMiddleware(get_response)(RequestFactory().get('/'))
+        self.assertIsNotNone(inspectors[0])
+        self.assertIsNone(_request_inspector.get())
+
+
+class TokenBucketTestCase(SimpleTestCase):
+    def test_bucket_refills_at_the_configured_rate(self):
+        store = LocalBucketStore()
+        with mock.patch('snicko.throttling.time.monotonic', return_value=100.0):
+            results = [store.take('search:ip:1', capacity=2, rate=1)[0] for _ in range(3)]
+            self.assertTrue(store.take('search:ip:2', capacity=2, rate=1)[0])
+        self.assertEqual(results, [True, True, False])
+
+        with mock.patch('snicko.throttling.time.monotonic', return_value=101.0):
+            self.assertTrue(store.take('search:ip:1', capacity=2, rate=1)[0])
+            self.assertFalse(store.take('search:ip:1', capacity=2, rate=1)[0])
+
+
+class LoadSheddingTestCase(SimpleTestCase):
+    class ExpensiveView:
+        shed_under_load = True
+
+    def test_marked_views_are_refused_under_pressure(self):
+        middleware = LoadSheddingMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get('/')
+
+        with mock.patch.object(pressure, 'overloaded', return_value=True):
+            response = middleware.process_view(request, self.ExpensiveView, (), {})
+            self.assertIsNone(middleware.process_view(request, object, (), {}))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+        with mock.patch.object(pressure, 'overloaded', return_value=False):
+            self.assertIsNone(middleware.process_view(request, self.ExpensiveView, (), {}))
+
+
+class MetricsTestCase(SimpleTestCase):
+    def test_thread_shards_are_summed_on_scrape(self):
+        def record():
+            metrics.inc('db_queries_total', 3, route='test/shards/')
+            metrics.observe('external_call_duration_seconds', 0.02, service='test-shards')
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        text = metrics.render()
+        self.assertIn('db_queries_total{route="test/shards/"} 12', text)
+        self.assertIn('external_call_duration_seconds_bucket{service="test-shards",le="0.025"} 4', text)
+        self.assertIn('external_call_duration_seconds_count{service="test-shards"} 4', text)
+
+    def test_middleware_records_route_latency_and_bytes(self):
+        request = RequestFactory().get('/')
+        request.resolver_match = mock.Mock(route='test/middleware/')
+        metrics.MetricsMiddleware(lambda request: HttpResponse(b'x' * 10))(request)
+
+        text = metrics.render()
+        self.assertIn('http_response_bytes_total{route="test/middleware/"} 10', text)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="test/middleware/",status="200"} 1', text)
+
+    def test_password_hashing_queue_is_exported(self):
+        executor = HashingExecutor(max_workers=1, max_queue=0)
+        executor.rejected = 3
+        with mock.patch('users.hashing.get_hashing_executor', return_value=executor):
+            text = metrics.render()
+        self.assertIn('password_hashing_rejected_total 3', text)
+        self.assertIn('password_hashing_in_flight 0', text)
+
+
+class ORJSONRendererTestCase(SimpleTestCase):
+    DATA = {
+        'id': 1,
+        'name': 'Café tent \u2028',
+        'price': Decimal('120.50'),
+        'created_at': datetime.datetime(2026, 10, 19, 9, 30, 0, 123456, tzinfo=datetime.timezone.utc),
+        'start_date': datetime.date(2026, 11, 1),
+        'tags': ('camping', 'outdoor'),
+        'owner': None,
+    }
+
+    def test_output_matches_drf_json_renderer(self):
+        from .renderers import ORJSONRenderer
+
+        self.assertEqual(ORJSONRenderer().render(self.DATA), JSONRenderer().render(self.DATA))
+
+    def test_parser_round_trips_and_rejects_nan(self):
+        import io
+
+        from rest_framework.exceptions import ParseError
+
+        from .parsers import ORJSONParser
+        from .renderers import ORJSONRenderer
+
+        body = ORJSONRenderer().render({'booking_id': 3, 'amount': '300.00'})
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(body)), {'booking_id': 3, 'amount': '300.00'})
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"amount": NaN}'))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTestCase(SimpleTestCase):
+    def respond(self, body, **headers):
+        middleware = CompressionMiddleware(lambda request: HttpResponse(body, content_type='application/json'))
+        return middleware(RequestFactory().get('/', **headers))
+
+    def test_large_responses_are_gzipped(self):
+        import gzip
+
+        body = b'{"name": "Cordless drill"}' * 20
+        response = self.respond(body, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), body)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_small_or_unaccepted_responses_are_left_alone(self):
+        self.assertFalse(self.respond(b'{}', HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+        self.assertFalse(self.respond(b'x' * 500).has_header('Content-Encoding'))
+
+    async def test_async_streams_are_compressed(self):
+        import gzip
+
+        async def lines():
+            for n in range(3):
+                yield f'{{"n": {n}}}\n'.encode()
+
+        async def get_response(request):
+            return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = await CompressionMiddleware(get_response)(request)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(gzip.decompress(body), b'{"n": 0}\n{"n": 1}\n{"n": 2}\n')
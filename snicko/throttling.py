@@ -0,0 +1,255 @@
+"""
+Token-bucket throttling and load shedding for expensive endpoints.
+
+Each (scope, user or IP) pair owns a bucket holding up to N tokens for a
+DRF rate of "N/period", refilled continuously at N per period. A request
+takes one token or is refused with 429 and a Retry-After of the time until
+the next token. Buckets live in process memory by default; set
+THROTTLE_STORE = "postgres" to share them between workers through an
+unlogged table.
+
+LoadSheddingMiddleware refuses requests to views marked
+`shed_under_load = True` with 503 while requests wait too long for a
+database connection, so their queries are never started. Async function
+views get both through aprotect().
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import JsonResponse
+from rest_framework.throttling import SimpleRateThrottle
+
+from .db import get_pool
+
+
+class LocalBucketStore:
+    """
+    Buckets for this process only, least recently used evicted first.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.buckets = OrderedDict()
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """
+        Take a token from `key`'s bucket. Return (allowed, tokens_left).
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated_at = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class PostgresBucketStore:
+    """
+    Buckets shared by every worker, kept in an unlogged table: writes skip
+    the WAL, and losing the table on a crash only resets the limits. Refill
+    uses the database clock, so workers with skewed clocks agree.
+    """
+    TABLE = "throttle_bucket"
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.created = False
+
+    def create_table(self, cursor):
+        cursor.execute(
+            f"CREATE UNLOGGED TABLE IF NOT EXISTS {self.TABLE} ("
+            " key text PRIMARY KEY,"
+            " tokens double precision NOT NULL,"
+            " allowed boolean NOT NULL,"
+            " updated_at double precision NOT NULL)"
+        )
+        self.created = True
+
+    def take(self, key, capacity, rate):
+        with connections[self.using].cursor() as cursor:
+            if not self.created:
+                self.create_table(cursor)
+            cursor.execute(
+                f"""
+                WITH now AS (SELECT extract(epoch FROM clock_timestamp())::double precision AS ts)
+                INSERT INTO {self.TABLE} AS bucket (key, tokens, allowed, updated_at)
+                SELECT %(key)s, %(capacity)s - 1, true, now.ts FROM now
+                ON CONFLICT (key) DO UPDATE SET
+                    allowed = LEAST(%(capacity)s, bucket.tokens + (EXCLUDED.updated_at - bucket.updated_at) * %(rate)s) >= 1,
+                    tokens = LEAST(%(capacity)s, bucket.tokens + (EXCLUDED.updated_at - bucket.updated_at) * %(rate)s)
+                        - CASE WHEN LEAST(%(capacity)s, bucket.tokens + (EXCLUDED.updated_at - bucket.updated_at) * %(rate)s) >= 1
+                               THEN 1 ELSE 0 END,
+                    updated_at = EXCLUDED.updated_at
+                RETURNING allowed, tokens
+                """,
+                {"key": key, "capacity": float(capacity), "rate": float(rate)},
+            )
+            return cursor.fetchone()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PostgresBucketStore() if settings.THROTTLE_STORE == "postgres" else LocalBucketStore()
+    return _store
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    DRF throttle whose `scope` names a rate in DEFAULT_THROTTLE_RATES.
+    Requests are keyed by user id when authenticated, by client IP otherwise.
+    """
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        return f"throttle:{self.scope}:{ident}"
+
+    def allow_request(self, request, view):
+        if self.rate is None or not settings.THROTTLE_ENABLED:
+            return True
+        return self.take(self.get_cache_key(request, view))
+
+    def take(self, key):
+        self.key = key
+        self.refill_rate = self.num_requests / self.duration
+        allowed, self.tokens = get_bucket_store().take(self.key, self.num_requests, self.refill_rate)
+        return allowed
+
+    def wait(self):
+        return max(0.0, (1 - self.tokens) / self.refill_rate)
+
+
+class SearchThrottle(TokenBucketThrottle):
+    scope = "search"
+
+
+class CatalogThrottle(TokenBucketThrottle):
+    scope = "catalog"
+
+
+class PoolPressure:
+    """
+    Average time requests waited for a pooled connection over the last
+    sampling interval, recomputed at most once per interval.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.lock = threading.Lock()
+        self.sampled_at = 0.0
+        self.last = (0, 0)
+        self.wait_ms = 0.0
+        self.waiting = 0
+
+    def sample(self):
+        now = time.monotonic()
+        if now - self.sampled_at < settings.LOAD_SHED_SAMPLE_INTERVAL:
+            return
+        with self.lock:
+            if now - self.sampled_at < settings.LOAD_SHED_SAMPLE_INTERVAL:
+                return
+            pool = get_pool(self.using)
+            if pool is None:
+                self.sampled_at = now
+                return
+            stats = pool.get_stats()
+            current = (stats.get("requests_num", 0), stats.get("requests_wait_ms", 0))
+            requests = current[0] - self.last[0]
+            self.wait_ms = (current[1] - self.last[1]) / requests if requests else 0.0
+            self.waiting = stats.get("requests_waiting", 0)
+            self.last = current
+            self.sampled_at = now
+
+    def overloaded(self):
+        self.sample()
+        return self.wait_ms > settings.LOAD_SHED_WAIT_MS or self.waiting > settings.LOAD_SHED_MAX_WAITING
+
+
+pressure = PoolPressure()
+
+
+def shed_response():
+    """
+    A 503 to return instead of running an expensive view, or None when the
+    database pool is keeping up.
+    """
+    if not pressure.overloaded():
+        return None
+    response = JsonResponse({"error": "Server is busy, please retry shortly."}, status=503)
+    response["Retry-After"] = str(settings.LOAD_SHED_RETRY_AFTER)
+    return response
+
+
+async def aprotect(request, throttle_class):
+    """
+    Load shedding and a token bucket for async function views, which DRF
+    throttles and LoadSheddingMiddleware's view attributes do not reach.
+    Returns the 503 or 429 to send instead of running the view, or None.
+
+    Requests are keyed by the user id in a bearer token, read without
+    touching the database, or by client IP.
+    """
+    from .routers import _token_user_id
+
+    def check():
+        response = shed_response()
+        if response is not None:
+            return response
+        throttle = throttle_class()
+        if throttle.rate is None or not settings.THROTTLE_ENABLED:
+            return None
+        user_id = _token_user_id(request)
+        ident = f"user:{user_id}" if user_id is not None else f"ip:{throttle.get_ident(request)}"
+        if throttle.take(f"throttle:{throttle.scope}:{ident}"):
+            return None
+        wait = math.ceil(throttle.wait())
+        response = JsonResponse({"detail": f"Request was throttled. Expected available in {wait} seconds."}, status=429)
+        response["Retry-After"] = str(wait)
+        return response
+
+    # The Postgres bucket store queries the database.
+    return await sync_to_async(check)()
+
+
+class LoadSheddingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, "cls", view_func)
+        if not getattr(view, "shed_under_load", False):
+            return None
+        return shed_response()
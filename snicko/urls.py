@@ -23,6 +23,7 @@ from rest_framework_simplejwt.views import (
 from django.conf import settings
 from django.conf.urls.static import static
 from django.conf import settings
+from .views import DatabasePoolStatsView, metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -31,6 +32,8 @@ urlpatterns = [
     path('api/users/', include('users.urls')),
     path('api/rentals/', include('rentals.urls')),
     path('api/payments/', include('payments.urls')),
+    path('api/admin/db-pool/', DatabasePoolStatsView.as_view(), name='db_pool_stats'),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
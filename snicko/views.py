@@ -0,0 +1,32 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import metrics
+from .db import get_pool_stats
+
+
+class DatabasePoolStatsView(APIView):
+    """
+    Connection pool size, checkout counts and wait times per database.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response([get_pool_stats(alias) for alias in settings.DATABASES])
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. When METRICS_TOKEN is set the scraper must
+    send it as a bearer token.
+    """
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.META.get("HTTP_AUTHORIZATION", ""), expected):
+            return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,58 @@
+from asgiref.sync import sync_to_async
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ClaimsUser
+from .tokens import TOKEN_VERSION_CLAIM, get_token_version
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds request.user from the token claims.
+
+    The only lookup per request is the user's token version, which is served
+    from the cache so that revoke_tokens() still takes effect. Tokens issued
+    before the claims were added fall back to loading the user row.
+    """
+
+    def get_user(self, validated_token):
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if not validated_token.get('is_active', False):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        version = get_token_version(user_id)
+        if version is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if version != validated_token[TOKEN_VERSION_CLAIM]:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        return ClaimsUser.from_claims(
+            id=user_id,
+            name=validated_token.get('name', ''),
+            is_active=True,
+            token_version=version,
+        )
+
+
+async def aauthenticate(request):
+    """
+    Authenticate a plain Django request from async views.
+
+    Returns the user, or None if the request carries no valid token. The
+    token version lookup may hit the cache or database, so it runs in the
+    sync thread pool.
+    """
+    try:
+        result = await sync_to_async(ClaimsJWTAuthentication().authenticate)(request)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    return result[0] if result else None
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 with its cost parameters taken from settings. Raising them makes
+    existing hashes report must_update, so they are upgraded on next login.
+    """
+    time_cost = settings.PASSWORD_ARGON2_TIME_COST
+    memory_cost = settings.PASSWORD_ARGON2_MEMORY_COST
+    parallelism = settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class TunableScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    scrypt with its work factor taken from settings. Verifies hashes stored
+    before Argon2 became the default.
+    """
+    work_factor = settings.PASSWORD_SCRYPT_WORK_FACTOR
@@ -0,0 +1,109 @@
+"""
+Password hashing off the event loop.
+
+Hashing is deliberately slow and CPU bound. Running it inline in a view ties
+up the worker serving that request, and under ASGI a burst of logins would
+occupy every sync thread and stall unrelated requests. The hashing executor
+gives password work its own small thread pool with a bounded queue, so a
+login storm queues (or is turned away) without starving the rest of the app.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+
+class HashingQueueFull(Exception):
+    pass
+
+
+class HashingExecutor:
+    def __init__(self, max_workers, max_queue):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self.slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def run(self, fn, *args):
+        """
+        Run fn(*args) on the hashing pool and await its result.
+
+        Raises HashingQueueFull when every worker is busy and the queue is
+        full, instead of letting the backlog grow without bound.
+        """
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise HashingQueueFull()
+
+        enqueued = time.monotonic()
+        with self.lock:
+            self.in_flight += 1
+
+        def task():
+            started = time.monotonic()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.monotonic()
+                with self.lock:
+                    self.wait_seconds += started - enqueued
+                    self.run_seconds += finished - started
+                    self.completed += 1
+
+        try:
+            return await asyncio.wrap_future(self.executor.submit(task))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            self.slots.release()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.max_workers,
+                "queue_limit": self.max_queue,
+                "in_flight": self.in_flight,
+                "queued": max(self.in_flight - self.max_workers, 0),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_seconds_total": self.wait_seconds,
+                "run_seconds_total": self.run_seconds,
+            }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hashing_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = HashingExecutor(
+                    settings.PASSWORD_HASHING_WORKERS, settings.PASSWORD_HASHING_QUEUE_SIZE
+                )
+    return _executor
+
+
+def verify_password(password, encoded):
+    """
+    Check a password and return (valid, new_hash).
+
+    new_hash is set when the stored hash uses an older hasher or weaker
+    parameters than the current preferred hasher, so the caller can store
+    the upgraded hash.
+    """
+    upgraded = []
+    valid = check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return valid, upgraded[0] if upgraded else None
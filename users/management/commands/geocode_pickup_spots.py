@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from users.models import PickUpSpot
+from users.services.geocoding import ADDRESS_FIELDS, geocode_address
+
+
+class Command(BaseCommand):
+    help = "Geocode pickup spots that have no location yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Also re-geocode spots that already have a location.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        spots = PickUpSpot.objects.only('id', 'location', *ADDRESS_FIELDS).order_by('id')
+        if not options['all']:
+            spots = spots.filter(location__isnull=True)
+
+        batch, updated, missed = [], 0, 0
+        for spot in spots.iterator(chunk_size=options['batch_size']):
+            spot.location = geocode_address({field: getattr(spot, field) for field in ADDRESS_FIELDS})
+            if spot.location is None:
+                missed += 1
+                continue
+            batch.append(spot)
+            if len(batch) >= options['batch_size']:
+                PickUpSpot.objects.bulk_update(batch, ['location'])
+                updated += len(batch)
+                batch = []
+        PickUpSpot.objects.bulk_update(batch, ['location'])
+        updated += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"Geocoded {updated} pickup spots, {missed} could not be resolved"))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-19 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_customuser_fcm_token'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pickupspot',
+            index=models.Index(fields=['user', 'is_default'], name='pickupspot_user_default_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-19 13:05
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_customuser_token_version_claimsuser'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pickupspot',
+            name='location',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, geography=True, null=True, srid=4326),
+        ),
+    ]
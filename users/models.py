@@ -1,3 +1,4 @@
+from django.contrib.gis.db import models as gis_models
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from .managers import CustomUserManager  # Import the manager from the new file
@@ -12,6 +13,8 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     fcm_token = models.CharField(max_length=255, blank=True, null=True)  # Add the FCM token field
+    # Bumped to invalidate every token issued to the user so far.
+    token_version = models.PositiveIntegerField(default=0)
 
     objects = CustomUserManager()
 
@@ -20,7 +23,52 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.email
-    
+
+
+class ClaimsUser(CustomUser):
+    """
+    A user built from access token claims without touching the database.
+
+    Fields carried by the token are set directly; every other field is
+    deferred, and the first access to any of them loads the rest of the row
+    in a single query. A plain save() writes a field taken from the token
+    only if it was changed since, as the token may be older than the row.
+    """
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, **claims):
+        field_names = [f.attname for f in cls._meta.concrete_fields if f.attname in claims]
+        user = cls.from_db(None, field_names, [claims[name] for name in field_names])
+        user._claimed = {name: claims[name] for name in field_names}
+        return user
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # Reloaded fields hold the row's values, not the token's.
+        claimed = getattr(self, '_claimed', {})
+        for name in list(claimed) if fields is None else fields:
+            claimed.pop(name, None)
+
+    def save(self, *args, **kwargs):
+        claimed = getattr(self, '_claimed', {})
+        if kwargs.get('update_fields') is None and not self._state.adding:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.attname for f in self._meta.concrete_fields
+                if not f.primary_key and f.attname not in deferred
+                and (f.attname not in claimed or getattr(self, f.attname) != claimed[f.attname])
+            ]
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        for name in list(claimed) if update_fields is None else update_fields:
+            claimed.pop(name, None)
+
 
 
 class PickUpSpot(models.Model):
@@ -33,7 +81,14 @@ class PickUpSpot(models.Model):
     postal_code = models.CharField(max_length=20)
     country = models.CharField(max_length=100)
     is_default = models.BooleanField(default=False)
+    # Geocoded from the address fields; PointFields get a GiST index.
+    location = gis_models.PointField(geography=True, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_default'], name='pickupspot_user_default_idx'),
+        ]
+
     def __str__(self):
         return f"{self.full_name}, {self.street_address}, {self.city}"
@@ -1,8 +1,14 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from .models import PickUpSpot
+from .services.geocoding import ADDRESS_FIELDS, geocode_address
+from .tokens import ClaimsRefreshToken
 
 
 class AddressSerializer(serializers.ModelSerializer):
+    latitude = serializers.SerializerMethodField()
+    longitude = serializers.SerializerMethodField()
+
     class Meta:
         model = PickUpSpot
         fields = [
@@ -16,6 +22,45 @@ class AddressSerializer(serializers.ModelSerializer):
             "postal_code",
             "country",
             "is_default",
+            "latitude",
+            "longitude",
             "created_at",
         ]
         read_only_fields = ["id", "created_at"]
+
+    def get_latitude(self, obj):
+        return obj.location.y if obj.location else None
+
+    def get_longitude(self, obj):
+        return obj.location.x if obj.location else None
+
+    def create(self, validated_data):
+        validated_data["location"] = geocode_address(validated_data)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        if any(field in validated_data for field in ADDRESS_FIELDS):
+            address = {field: validated_data.get(field, getattr(instance, field)) for field in ADDRESS_FIELDS}
+            validated_data["location"] = geocode_address(address)
+        return super().update(instance, validated_data)
+
+
+class NearbyPickUpSpotSerializer(serializers.ModelSerializer):
+    """
+    Pickup spot as shown to other users: the area and distance, without the
+    contact details.
+    """
+    latitude = serializers.FloatField(source="location.y")
+    longitude = serializers.FloatField(source="location.x")
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PickUpSpot
+        fields = ["id", "city", "state", "postal_code", "country", "latitude", "longitude", "distance_km"]
+
+    def get_distance_km(self, obj):
+        return round(obj.distance / 1000, 3)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
@@ -0,0 +1,112 @@
+import csv
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_FIELDS = ("street_address", "city", "state", "postal_code", "country")
+
+
+def _normalize(value):
+    return " ".join(str(value or "").lower().split())
+
+
+class GazetteerGeocoder:
+    """
+    Resolves addresses offline from a CSV gazetteer with the columns
+    country, state, city, postal_code, latitude, longitude.
+
+    A postal code match wins; otherwise the first row for the city is used.
+    Matches within the given country are tried first, then any country, so
+    "India" and "IN" both resolve. Street addresses are not resolved, so points are accurate to the postal
+    area, which is enough to rank pickup spots by distance.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.GEOCODER_GAZETTEER_PATH
+        self.by_postal_code = None
+        self.by_city = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        by_postal_code, by_city = {}, {}
+        try:
+            with open(self.path, newline="", encoding="utf-8") as fileobj:
+                for row in csv.DictReader(fileobj):
+                    point = Point(float(row["longitude"]), float(row["latitude"]), srid=4326)
+                    country = _normalize(row["country"])
+                    postal_code, city = _normalize(row["postal_code"]), _normalize(row["city"])
+                    for key in ((country, postal_code), (None, postal_code)):
+                        by_postal_code.setdefault(key, point)
+                    for key in ((country, city), (None, city)):
+                        by_city.setdefault(key, point)
+        except FileNotFoundError:
+            logger.warning("Gazetteer %s not found; pickup spots will not be geocoded", self.path)
+        self.by_postal_code, self.by_city = by_postal_code, by_city
+
+    def geocode(self, address):
+        if self.by_postal_code is None:
+            with self.lock:
+                if self.by_postal_code is None:
+                    self.load()
+        postal_code, city = _normalize(address.get("postal_code")), _normalize(address.get("city"))
+        for country in (_normalize(address.get("country")), None):
+            point = self.by_postal_code.get((country, postal_code)) or self.by_city.get((country, city))
+            if point is not None:
+                return point
+        return None
+
+
+class CachedGeocoder:
+    """
+    Wraps a geocoder with the Django cache. Misses are cached too, so an
+    unknown address is not looked up again on every save.
+    """
+
+    MISS = "miss"
+
+    def __init__(self, geocoder, timeout=None):
+        self.geocoder = geocoder
+        self.timeout = timeout if timeout is not None else settings.GEOCODER_CACHE_TIMEOUT
+
+    def cache_key(self, address):
+        text = "|".join(_normalize(address.get(field)) for field in ADDRESS_FIELDS)
+        return "geocode:" + hashlib.sha1(text.encode()).hexdigest()
+
+    def geocode(self, address):
+        key = self.cache_key(address)
+        cached = cache.get(key)
+        if cached is not None:
+            return None if cached == self.MISS else Point(cached, srid=4326)
+        point = self.geocoder.geocode(address)
+        cache.set(key, self.MISS if point is None else point.coords, self.timeout)
+        return point
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    """
+    Return the process-wide cached geocoder, built from GEOCODER_CLASS.
+    """
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                _geocoder = CachedGeocoder(import_string(settings.GEOCODER_CLASS)())
+    return _geocoder
+
+
+def geocode_address(address):
+    """
+    Return a Point for a mapping of the PickUpSpot address fields, or None.
+    """
+    return get_geocoder().geocode(address)
@@ -0,0 +1,142 @@
+import re
+import threading
+import time
+
+from django.conf import settings
+from google.auth import jwt
+
+from snicko.metrics import timed_call
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class InvalidAudienceError(ValueError):
+    pass
+
+
+class HttpCertSource:
+    """
+    Fetches Google's signing certificates over a pooled HTTP session and
+    reports how long they may be cached for.
+    """
+
+    def __init__(self, url=GOOGLE_CERTS_URL, session=None, timeout=5):
+        import requests
+
+        self.url = url
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+    def fetch(self):
+        with timed_call("google"):
+            response = self.session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        match = MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        return response.json(), int(match.group(1)) if match else 0
+
+
+class StaticCertSource:
+    """
+    Serves a fixed set of certificates, for tests and offline development.
+    """
+
+    def __init__(self, certs, max_age=3600):
+        self.certs = certs
+        self.max_age = max_age
+        self.fetch_count = 0
+
+    def fetch(self):
+        self.fetch_count += 1
+        return self.certs, self.max_age
+
+
+class CertCache:
+    """
+    Keeps the latest certificates until their max-age runs out.
+
+    Only one thread refetches at a time; if a refetch fails while older
+    certificates are still in memory, those keep being used.
+    """
+
+    # Minimum seconds between refetches forced by an unknown key id, so a
+    # flood of forged tokens cannot turn into a flood of requests to Google.
+    FORCED_REFRESH_INTERVAL = 60
+
+    def __init__(self, source):
+        self.source = source
+        self.certs = None
+        self.expires_at = 0
+        self.fetched_at = 0
+        self.lock = threading.Lock()
+
+    def get(self, force=False):
+        now = time.monotonic()
+        if force and now - self.fetched_at < self.FORCED_REFRESH_INTERVAL:
+            force = False
+        if self.certs is not None and now < self.expires_at and not force:
+            return self.certs
+
+        with self.lock:
+            if self.certs is not None and time.monotonic() < self.expires_at and not force:
+                return self.certs
+            try:
+                certs, max_age = self.source.fetch()
+            except Exception:
+                if self.certs is None:
+                    raise
+                return self.certs
+            self.certs = certs
+            self.fetched_at = time.monotonic()
+            self.expires_at = self.fetched_at + max_age
+            return certs
+
+
+class GoogleTokenVerifier:
+    """
+    Verifies Google ID tokens against cached signing certificates, so most
+    logins are checked without leaving the process.
+    """
+
+    def __init__(self, cert_source=None, audience=None, clock_skew=10):
+        self.certs = CertCache(cert_source or HttpCertSource())
+        self.audience = audience
+        self.clock_skew = clock_skew
+
+    def get_audience(self):
+        return self.audience if self.audience is not None else settings.GOOGLE_OAUTH_CLIENT_IDS
+
+    def verify(self, token):
+        """
+        Return the token's claims, or raise ValueError if it is invalid.
+        """
+        key_id = jwt.decode_header(token).get("kid")
+        certs = self.certs.get()
+        if key_id and key_id not in certs:
+            # Google rotated its keys before our cached copy expired.
+            certs = self.certs.get(force=True)
+
+        idinfo = jwt.decode(token, certs=certs, clock_skew_in_seconds=self.clock_skew)
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {idinfo.get('iss')}")
+        if idinfo.get("aud") not in self.get_audience():
+            raise InvalidAudienceError(f"Wrong audience: {idinfo.get('aud')}")
+        return idinfo
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_verifier():
+    """
+    Return the process-wide verifier, creating it on first use.
+    """
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                _verifier = GoogleTokenVerifier()
+    return _verifier
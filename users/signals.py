@@ -0,0 +1,32 @@
+"""
+Revoke a user's tokens when their account is deactivated or reactivated, so
+no token carries a stale is_active claim (see users/tokens.py).
+"""
+from django.db.models.signals import post_init, post_save
+
+from users.models import ClaimsUser, CustomUser
+from users.tokens import revoke_tokens
+
+
+def remember_is_active(sender, instance, **kwargs):
+    # Read the raw value so a deferred field is not loaded from the database.
+    instance._saved_is_active = instance.__dict__.get('is_active')
+
+
+def revoke_on_activation_change(sender, instance, created, update_fields=None, **kwargs):
+    previous = instance._saved_is_active
+    instance._saved_is_active = instance.__dict__.get('is_active', previous)
+    if created or previous is None or instance._saved_is_active == previous:
+        return
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    revoke_tokens(instance)
+    # revoke_tokens() bumps the version in the database only; keep a later
+    # save() of this instance from writing the old version back.
+    instance.refresh_from_db(fields=['token_version'])
+
+
+# ClaimsUser is a proxy, and signals are sent with the proxy as the sender.
+for model in (CustomUser, ClaimsUser):
+    post_init.connect(remember_is_active, sender=model)
+    post_save.connect(revoke_on_activation_change, sender=model)
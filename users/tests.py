@@ -1,5 +1,21 @@
-from django.test import TestCase, Client
-from .models import CustomUser
+import datetime
+import time
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from rest_framework.test import APIClient
+from rentals.models import Item
+from google.auth import crypt, jwt
+from .hashing import get_hashing_executor
+from .models import ClaimsUser, CustomUser, PickUpSpot
+from .services.google_auth import GoogleTokenVerifier, InvalidAudienceError, StaticCertSource
+from .tokens import ClaimsRefreshToken, revoke_tokens
 
 class UserAPITestCase(TestCase):
     def setUp(self):
@@ -26,3 +42,195 @@ class UserAPITestCase(TestCase):
     def test_login_user_invalid_credentials(self):
         response = self.client.post(self.login_url, self.user_data, content_type='application/json')
         self.assertEqual(response.status_code, 401)
+
+
+class GoogleTokenVerifierTestCase(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'test')])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(1).not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256())
+        )
+        private_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        cls.signer = crypt.RSASigner.from_string(private_pem, key_id='key-1')
+        cls.certs = {'key-1': cert.public_bytes(serialization.Encoding.PEM).decode()}
+
+    def make_token(self, **claims):
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com', 'aud': 'client-1', 'email': 'test@example.com',
+            'iat': now, 'exp': now + 300,
+        }
+        payload.update(claims)
+        return jwt.encode(self.signer, payload)
+
+    def test_valid_token_is_verified_from_cached_certs(self):
+        source = StaticCertSource(self.certs)
+        verifier = GoogleTokenVerifier(cert_source=source, audience=['client-1'])
+
+        for _ in range(3):
+            idinfo = verifier.verify(self.make_token())
+
+        self.assertEqual(idinfo['email'], 'test@example.com')
+        self.assertEqual(source.fetch_count, 1)
+
+    def test_wrong_audience_is_rejected(self):
+        verifier = GoogleTokenVerifier(cert_source=StaticCertSource(self.certs), audience=['client-1'])
+        with self.assertRaises(InvalidAudienceError):
+            verifier.verify(self.make_token(aud='someone-else'))
+
+    def test_expired_token_is_rejected(self):
+        verifier = GoogleTokenVerifier(cert_source=StaticCertSource(self.certs), audience=['client-1'])
+        with self.assertRaises(ValueError):
+            verifier.verify(self.make_token(iat=int(time.time()) - 7200, exp=int(time.time()) - 3600))
+
+
+class ClaimsJWTAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = CustomUser.objects.create_user(email='test@example.com', password='password123', name='Test')
+        access = ClaimsRefreshToken.for_user(self.user).access_token
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {access}'}
+
+    def test_read_endpoints_do_not_load_the_user(self):
+        self.client.get('/api/users/get_user_id/', **self.auth)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/get_user_name/', **self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'name': 'Test'})
+
+    def test_revoked_tokens_are_rejected(self):
+        revoke_tokens(self.user)
+
+        response = self.client.get('/api/users/get_user_id/', **self.auth)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_claims_user_save_writes_only_changed_claims(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(name='Renamed')
+        user = ClaimsUser.from_claims(id=self.user.pk, name='Test', is_active=True, token_version=0)
+
+        user.fcm_token = 'device'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.name, self.user.fcm_token), ('Renamed', 'device'))
+
+        user.name = 'Changed'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'Changed')
+
+    def test_deactivation_revokes_tokens(self):
+        self.user.is_active = False
+        self.user.save()
+        self.user.is_active = True
+        self.user.name = 'Back'
+        self.user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_version, 2)
+        response = self.client.get('/api/users/get_user_id/', **self.auth)
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'users.hashers.TunableScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+])
+class PasswordHashingTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    def test_login_upgrades_legacy_hash(self):
+        legacy = make_password('password123', hasher='pbkdf2_sha256')
+        user = CustomUser.objects.create(email='test@example.com', name='Test', password=legacy)
+
+        response = self.client.post(
+            '/api/users/login/', {'email': 'test@example.com', 'password': 'password123'},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(user.check_password('password123'))
+
+    def test_register_hashes_on_the_hashing_pool(self):
+        completed = get_hashing_executor().stats()['completed']
+
+        response = self.client.post(
+            '/api/users/register/', {'email': 'new@example.com', 'password': 'password123'},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(get_hashing_executor().stats()['completed'], completed + 1)
+        self.assertTrue(CustomUser.objects.get(email='new@example.com').password.startswith('scrypt$'))
+
+
+class PickUpSpotGeocodingTestCase(TestCase):
+    ADDRESS = {
+        'full_name': 'Home', 'phone_number': '9999999999', 'street_address': '1 Main St',
+        'city': 'Pune', 'state': 'MH', 'postal_code': '411001', 'country': 'India',
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='renter@example.com', password='password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_spot(self, user, city, longitude, latitude):
+        return PickUpSpot.objects.create(
+            user=user, full_name=city, phone_number='9999999999', street_address='1 Main St',
+            city=city, state='', postal_code='', country='IN', location=Point(longitude, latitude, srid=4326),
+        )
+
+    def test_new_spots_are_geocoded(self):
+        response = self.client.post('/api/users/address/', self.ADDRESS, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertAlmostEqual(response.data['latitude'], 18.5204)
+        self.assertAlmostEqual(response.data['longitude'], 73.8567)
+
+    def test_nearest_own_spots_come_first(self):
+        self.add_spot(self.user, 'Mumbai', 72.8354, 18.9388)
+        self.add_spot(self.user, 'Delhi', 77.2090, 28.6139)
+        self.add_spot(self.user, 'Pune', 73.8567, 18.5204)
+
+        response = self.client.get('/api/users/address/nearest/', {'latitude': 18.52, 'longitude': 73.85})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([spot['city'] for spot in response.data], ['Pune', 'Mumbai', 'Delhi'])
+        self.assertLess(response.data[0]['distance_km'], 1)
+
+    def test_nearest_rejects_a_limit_below_one(self):
+        for limit in (0, -1):
+            response = self.client.get('/api/users/address/nearest/', {'latitude': 18.52, 'longitude': 73.85, 'limit': limit})
+            self.assertEqual(response.status_code, 400)
+
+    def test_owner_spots_near_renter_hide_contact_details(self):
+        owner = CustomUser.objects.create_user(email='owner@example.com', password='password123')
+        self.add_spot(owner, 'Bengaluru', 77.5946, 12.9716)
+        self.add_spot(owner, 'Pune', 73.8567, 18.5204)
+        item = Item.objects.create(
+            owner=owner, name='Drill', description='Cordless drill', price_per_day=100,
+            image='item_images/seed.jpg', location=Point(77.5946, 12.9716, srid=4326),
+        )
+
+        response = self.client.get('/api/users/address/nearest/', {'item': item.pk, 'latitude': 18.52, 'longitude': 73.85})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([spot['city'] for spot in response.data], ['Pune', 'Bengaluru'])
+        self.assertNotIn('phone_number', response.data[0])
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import CustomUser
+
+TOKEN_VERSION_CLAIM = 'tv'
+
+
+def token_version_cache_key(user_id):
+    return f"users:token_version:{user_id}"
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token that also carries the claims ClaimsJWTAuthentication needs
+    to build request.user without a query. Access tokens derived from it
+    copy these claims.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['name'] = user.name
+        token['is_active'] = user.is_active
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+def get_token_version(user_id):
+    """
+    Return the user's current token version, or None if the user no longer
+    exists. Served from the cache for TOKEN_VERSION_CACHE_TIMEOUT seconds.
+    """
+    key = token_version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = CustomUser.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is None:
+            return None
+        cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def revoke_tokens(user):
+    """
+    Invalidate every token issued to `user` so far.
+    """
+    CustomUser.objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    cache.delete(token_version_cache_key(user.pk))
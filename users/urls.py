@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import register_user, login_user, UpdateAddressView, get_user_name, get_user_id, PickUpSpotView, GoogleLoginView, FCMTokenView
+from .views import register_user, login_user, UpdateAddressView, get_user_name, get_user_id, PickUpSpotView, GoogleLoginView, FCMTokenView, RevokeTokensView, NearestPickUpSpotView
 
 urlpatterns = [
     path('register/', register_user, name='register_user'),
@@ -9,6 +9,8 @@ urlpatterns = [
     path('get_user_id/', get_user_id, name='get_user_id'),
     path('address/', PickUpSpotView.as_view(), name='address_list'),
     path('address/<int:pk>/', PickUpSpotView.as_view(), name='address_detail'),
+    path('address/nearest/', NearestPickUpSpotView.as_view(), name='address_nearest'),
     path('google-login/', GoogleLoginView.as_view(), name='google_login'),
     path('fcm_token/', FCMTokenView.as_view(), name='fcm_token'),
+    path('logout_all/', RevokeTokensView.as_view(), name='logout_all'),
 ]
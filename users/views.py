@@ -1,8 +1,8 @@
 from django.shortcuts import render
-from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework_simplejwt.tokens import RefreshToken
 
 # from users.serializers import EmailSerializer
 from .models import CustomUser
@@ -15,9 +15,13 @@ from django.contrib.auth import get_user_model
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
 from .models import PickUpSpot
-from .serializers import AddressSerializer
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from .serializers import AddressSerializer, NearbyPickUpSpotSerializer
+from .hashing import HashingQueueFull, get_hashing_executor, verify_password
+from .services.google_auth import InvalidAudienceError, get_verifier
+from .tokens import ClaimsRefreshToken, revoke_tokens
+from django.contrib.gis.geos import Point
+from rentals.models import Item
+from snicko.gis import KNNDistance
 
 User = get_user_model()
 
@@ -29,11 +33,7 @@ class GoogleLoginView(APIView):
             return Response({'error': 'Token not provided'}, status=400)
 
         try:
-            idinfo = id_token.verify_oauth2_token(token, requests.Request())
-
-            # Check audience (YOUR_CLIENT_ID should be from Google Developer Console)
-            if idinfo['aud'] != '431947796542-v5n1pf7srtpfifdqsvf8jvjia32c3ejg.apps.googleusercontent.com':
-                return Response({'error': 'Invalid audience'}, status=403)
+            idinfo = get_verifier().verify(token)
 
             email = idinfo['email']
             name = idinfo.get('name')
@@ -43,7 +43,7 @@ class GoogleLoginView(APIView):
             user, created = User.objects.get_or_create(email=email, defaults={'email': email, 'name': name})
             
             # Generate tokens for the user
-            refresh = RefreshToken.for_user(user)
+            refresh = ClaimsRefreshToken.for_user(user)
 
             # Return tokens along with other details
             return Response({
@@ -54,11 +54,13 @@ class GoogleLoginView(APIView):
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
             })
+        except InvalidAudienceError:
+            return Response({'error': 'Invalid audience'}, status=403)
         except ValueError:
             return Response({'error': 'Invalid token'}, status=403)
 
 @csrf_exempt
-def register_user(request):
+async def register_user(request):
     if request.method == 'POST':
         data = json.loads(request.body)
         email = data.get('email')
@@ -69,12 +71,22 @@ def register_user(request):
             print("Email and password are required")
             return JsonResponse({'error': 'Email and password are required'}, status=400)
 
-        if CustomUser.objects.filter(email=email).exists():
+        try:
+            hashed = await get_hashing_executor().run(make_password, password)
+        except HashingQueueFull:
+            return JsonResponse({'error': 'Server busy, please retry'}, status=503)
+
+        # A single insert; the unique constraint on email decides duplicates,
+        # so two concurrent sign-ups cannot both pass an exists() check.
+        try:
+            user = await CustomUser.objects.acreate(
+                email=CustomUser.objects.normalize_email(email), name=name or '', password=hashed,
+            )
+        except IntegrityError:
             print("User with this email already exists")
             return JsonResponse({'error': 'User with this email already exists'}, status=400)
 
-        user = CustomUser.objects.create_user(email=email, password=password, name=name)
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         return JsonResponse({
             'message': 'User registered successfully',
             'refresh': str(refresh),
@@ -99,8 +111,19 @@ class FCMTokenView(APIView):
 
         return Response({"message": "FCM token updated successfully"}, status=200)
 
+class RevokeTokensView(APIView):
+    """
+    Sign the authenticated user out everywhere by invalidating all of their
+    access and refresh tokens.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revoke_tokens(request.user)
+        return Response({"message": "All sessions have been signed out"}, status=200)
+
 @csrf_exempt
-def login_user(request):
+async def login_user(request):
     if request.method == 'POST':
         data = json.loads(request.body)
         email = data.get('email')
@@ -109,17 +132,30 @@ def login_user(request):
         if not email or not password:
             return JsonResponse({'error': 'Email and password are required'}, status=400)
 
-        user = authenticate(email=email, password=password)
-        if user is not None:
-            refresh = RefreshToken.for_user(user)
-            return JsonResponse({
-                'message': 'Login successful',
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-                'user_id': user.id,
-            }, status=200)
-        else:
+        executor = get_hashing_executor()
+        try:
+            try:
+                user = await CustomUser.objects.aget(email=email)
+            except CustomUser.DoesNotExist:
+                # Hash anyway so unknown emails take as long as wrong passwords.
+                await executor.run(make_password, password)
+                return JsonResponse({'error': 'Invalid credentials'}, status=401)
+            valid, new_hash = await executor.run(verify_password, password, user.password)
+        except HashingQueueFull:
+            return JsonResponse({'error': 'Server busy, please retry'}, status=503)
+
+        if not valid or not user.is_active:
             return JsonResponse({'error': 'Invalid credentials'}, status=401)
+        if new_hash:
+            await CustomUser.objects.filter(pk=user.pk).aupdate(password=new_hash)
+
+        refresh = ClaimsRefreshToken.for_user(user)
+        return JsonResponse({
+            'message': 'Login successful',
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+            'user_id': user.id,
+        }, status=200)
     
 
 class PickUpSpotView(APIView):
@@ -219,6 +255,65 @@ class PickUpSpotView(APIView):
         except PickUpSpot.DoesNotExist:
             return Response({"error": "Pickup spot not found or not authorized"}, status=status.HTTP_404_NOT_FOUND)
 
+class NearestPickUpSpotView(APIView):
+    """
+    Pickup spots ordered nearest first, using the spatial index.
+
+    - ?latitude=&longitude=: the user's own spots nearest to that point.
+    - ?item=: the user's own spots nearest to the item.
+    - ?item=&latitude=&longitude=: the item owner's spots nearest to that
+      point, i.e. where the renter can collect the item closest to them.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_LIMIT = 50
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            limit = min(int(params.get('limit', 5)), self.MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "Limit must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"error": "Limit must be at least 1."}, status=status.HTTP_400_BAD_REQUEST)
+
+        point = None
+        if params.get('latitude') or params.get('longitude'):
+            try:
+                latitude, longitude = float(params['latitude']), float(params['longitude'])
+            except (KeyError, ValueError):
+                return Response({"error": "Latitude and longitude must be valid numbers."}, status=status.HTTP_400_BAD_REQUEST)
+            if not (-90 <= latitude <= 90) or not (-180 <= longitude <= 180):
+                return Response({"error": "Latitude must be between -90 and 90 and longitude between -180 and 180."}, status=status.HTTP_400_BAD_REQUEST)
+            point = Point(longitude, latitude, srid=4326)
+
+        owner_id = request.user.id
+        if params.get('item'):
+            try:
+                item = Item.objects.only('owner_id', 'location').get(pk=params['item'])
+            except (Item.DoesNotExist, ValueError):
+                return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
+            if point is not None:
+                owner_id = item.owner_id
+            elif item.location is None:
+                return Response({"error": "Item has no location"}, status=status.HTTP_400_BAD_REQUEST)
+            else:
+                point = item.location
+        elif point is None:
+            return Response({"error": "Provide latitude and longitude, or an item."}, status=status.HTTP_400_BAD_REQUEST)
+
+        spots = (
+            PickUpSpot.objects.filter(user_id=owner_id, location__isnull=False)
+            .annotate(distance=KNNDistance('location', point))
+            .order_by('distance')[:limit]
+        )
+        if owner_id != request.user.id:
+            return Response(NearbyPickUpSpotSerializer(spots, many=True).data, status=status.HTTP_200_OK)
+        data = [
+            {**AddressSerializer(spot).data, 'distance_km': round(spot.distance / 1000, 3)}
+            for spot in spots
+        ]
+        return Response(data, status=status.HTTP_200_OK)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_name(request):